@@ -13,6 +13,9 @@ class BaseAgent:
         name (str): Nombre único del agente dentro del sistema.
         system (System): Referencia al sistema multiagente, que provee el entorno
                          de comunicación entre agentes.
+        concurrent (bool): Si es True, cada mensaje se maneja en su propia tarea y el
+                           agente puede atender varias peticiones a la vez (su estado
+                           por petición debe estar indexado por `request_id`).
 
     Métodos:
         handle(message): Método que debe ser sobrescrito por agentes hijos para 
@@ -21,6 +24,8 @@ class BaseAgent:
         receive(): Espera y recibe un mensaje dirigido a este agente.
     """
     
+    concurrent = False
+
     def __init__(self, name, system):
         """
         Inicializa el agente.
@@ -32,12 +37,13 @@ class BaseAgent:
         self.name = name
         self.system = system
         self.inbox = asyncio.Queue()
+        self._tasks = set()
 
-    async def send(self, to_agent, content):
+    async def send(self, to_agent, content, request_id=None):
         """
-        Envía un mensaje a otro agente.
+        Envía un mensaje a otro agente, identificando la petición a la que pertenece.
         """
-        await self.system.send_message(self.name, to_agent, content)
+        await self.system.send_message(self.name, to_agent, content, request_id)
 
     async def receive(self):
         """
@@ -51,7 +57,13 @@ class BaseAgent:
         """
         while True:
             message = await self.receive()
-            await self.handle(message)
+            if self.concurrent:
+                # Guardar la referencia para que la tarea no se recolecte antes de terminar
+                task = asyncio.create_task(self.handle(message))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            else:
+                await self.handle(message)
 
     async def handle(self, message):
         """
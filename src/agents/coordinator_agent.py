@@ -1,6 +1,7 @@
 import json
 import re
 from agents.base_agent import BaseAgent
+from llm.client import agenerate
 
 TEST = False
 
@@ -19,7 +20,12 @@ class CoordinatorAgent(BaseAgent):
     - Consolidar la información y controlar el ciclo de validación.
     - Reenviar la respuesta final al usuario.
 
+    El estado de cada consulta (pregunta traducida, idioma, queries del embedding) se guarda
+    en un contexto indexado por `request_id`, así que varias consultas pueden estar en
+    curso a la vez.
     """
+    concurrent = True
+
     
     def __init__(self, name, system, model):
         """
@@ -32,9 +38,11 @@ class CoordinatorAgent(BaseAgent):
         """
         super().__init__(name, system)
         self.model = model
-        self.lang = "en"
-        self.query = "Empty query"
-        self.embedding_query = []
+        self.requests = {}
+
+    def _context(self, request_id) -> dict:
+        """Estado de la consulta `request_id` (uno vacío si no se conoce)."""
+        return self.requests.get(request_id, {"query": "Empty query", "lang": "en", "embedding_query": []})
 
     async def handle(self, message):
         """
@@ -47,6 +55,7 @@ class CoordinatorAgent(BaseAgent):
             message (dict): Mensaje recibido, debe incluir 'from' y 'content'.
         """
         sender = message["from"]
+        request_id = message.get("request_id")
         if sender == "user":
 
             content = message["content"]
@@ -59,15 +68,23 @@ class CoordinatorAgent(BaseAgent):
                 data = json.loads(cleaned)
             except json.JSONDecodeError as e:
                 print(f"[Coordinator] JSON inválido: {e}")
+                await self.send("user", {
+                    "type": "respuesta_final",
+                    "content": "Sorry, I could not understand the request. Please try again.",
+                    "intencion": "error"
+                }, request_id=request_id)
                 return
         
-            self.query = data.get("translated_prompt", "unknown query")
-            self.embedding_query = data.get("embedding_query", "")
-            self.lang = data.get("original_language", "en")
+            ctx = {
+                "query": data.get("translated_prompt", "unknown query"),
+                "embedding_query": data.get("embedding_query", ""),
+                "lang": data.get("original_language", "en"),
+            }
+            self.requests[request_id] = ctx
 
             if data["online"] == True:
-                await self.send_response([], [], "Debes mencionar explícitamente que se está realizando una búsqueda online respecto a la pregunta del usuario y que este debe esperar.", "await")
-                await self.send("crawler", self.embedding_query)
+                await self.send_response([], [], "Debes mencionar explícitamente que se está realizando una búsqueda online respecto a la pregunta del usuario y que este debe esperar.", "await", request_id)
+                await self.send("crawler", ctx["embedding_query"], request_id=request_id)
                 return
 
             cocktails = data.get("cocktails", [])
@@ -91,7 +108,7 @@ class CoordinatorAgent(BaseAgent):
 
             # Construir payload común
             payload_ontology = {"cocktails": cocktail_names, "fields": field_sets}
-            payload_embedding = {"query": self.embedding_query}
+            payload_embedding = {"query": ctx["embedding_query"]}
 
             expected_sources = ["ontology", "embedding"]
             flavors = data.get("flavors", [])
@@ -103,19 +120,20 @@ class CoordinatorAgent(BaseAgent):
                 await self.send("validator", {
                     "type": "expectation",
                     "sources": expected_sources,
-                    "query": self.query  # útil para que el validador sepa qué validar
-                })
+                    "query": ctx["query"]  # útil para que el validador sepa qué validar
+                }, request_id=request_id)
 
             if flavors is not []:
                 print("[CONSULTANDO AGENTE DE SABORES]")
-                await self.send("flavor", {"flavors": flavors, "ammount": 5})
-            await self.send("ontology", payload_ontology)
-            await self.send("embedding", payload_embedding)
+                await self.send("flavor", {"flavors": flavors, "ammount": 5}, request_id=request_id)
+            await self.send("ontology", payload_ontology, request_id=request_id)
+            await self.send("embedding", payload_embedding, request_id=request_id)
             
         elif sender=="validator":
             if 'error' in message["content"]:
                 print("[EMITIENDO RESPUESTA]\n")
-                await self.send_response([], [], "Información al respecto no encontrada", "error")
+                await self.send_response([], [], "Información al respecto no encontrada", "error", request_id)
+                self.requests.pop(request_id, None)
             else:
                 content = message["content"]["suficiencia"]
                 drinks = message["content"]["drinks"]
@@ -128,26 +146,27 @@ class CoordinatorAgent(BaseAgent):
                     
                     # Enviando respuesta
                     print("[EMITIENDO RESPUESTA]\n")
-                    await self.send_response(drinks, extra, razonamiento, "final")
+                    await self.send_response(drinks, extra, razonamiento, "final", request_id)
 
                     # Limpiando memoria
-                    self.lang = "en"
-                    self.query = "Empty query"
+                    self.requests.pop(request_id, None)
                 
                 elif online:
                     print("[EMITIENDO RESPUESTA]\n")
-                    await self.send_response([], [], "Información al respecto no encontrada. Debes mencionar explícitamente que se está realizando una búsqueda online respecto a la pregunta del usuario y que este debe esperar.", "await")
-                    await self.send("crawler", self.embedding_query)
+                    await self.send_response([], [], "Información al respecto no encontrada. Debes mencionar explícitamente que se está realizando una búsqueda online respecto a la pregunta del usuario y que este debe esperar.", "await", request_id)
+                    await self.send("crawler", self._context(request_id)["embedding_query"], request_id=request_id)
 
                 else:
                     print("[EMITIENDO RESPUESTA]\n")
-                    await self.send_response(drinks, extra, "Intenta responder con lo que tengas", "final")
+                    await self.send_response(drinks, extra, "Intenta responder con lo que tengas", "final", request_id)
+                    self.requests.pop(request_id, None)
 
         elif sender=="crawler":
             
-            await self.send_response(message["content"]["results"], [], "Resultado de realizar la busqueda online.", "final")
+            await self.send_response(message["content"]["results"], [], "Resultado de realizar la busqueda online.", "final", request_id)
+            self.requests.pop(request_id, None)
                     
-    async def send_response(self, respuesta, complementos, razonamiento, intencion):
+    async def send_response(self, respuesta, complementos, razonamiento, intencion, request_id=None):
         """
         Construye y envía la respuesta final al usuario.
 
@@ -159,26 +178,28 @@ class CoordinatorAgent(BaseAgent):
             complementos (Any): Datos adicionales útiles para enriquecer la respuesta.
             razonamiento (str): Justificación para haber elegido esa respuesta.
             intencion (str): Tipo de respuesta ("final", "await", "error", etc.).
+            request_id (str): Consulta a la que se responde.
         """
+        ctx = self._context(request_id)
         
         prompt = f"""
     You are an expert bartender assistant.
     Answer the following user query in a clear, helpful, and friendly way
-    Query: "{self.query}"
+    Query: "{ctx['query']}"
     You previously selected the following answer as most relevant:
     \"\"\"{respuesta}\"\"\"
     Additional helpful data:
     \"\"\"{complementos}\"\"\"
     The reasoning used to choose this answer:
     \"\"\"{razonamiento}\"\"\"
-    Now, write a final answer in {self.lang.upper()} to send to the user, using the selected data and reasoning. Do not mention that it came from a model or that it was selected. Just provide the final, helpful answer.
+    Now, write a final answer in {ctx['lang'].upper()} to send to the user, using the selected data and reasoning. Do not mention that it came from a model or that it was selected. Just provide the final, helpful answer.
     If you see in the reasoning something like "Información al respecto no encontrada. Realizando búsqueda online." You should mention to the user that his request is being searched online and that he should wait.
     On that case, the user should wait for your answer and will not be able to insert an input, so don't try to tell him to do anything else but wait.
     """
 
         try:
             # Enviar el prompt al modelo (asumiendo método generate)
-            output = self.model.generate_content(prompt)
+            output = await agenerate(self.model, prompt)
 
             # Extraer texto limpio
             final_answer = output.text.strip() if hasattr(output, 'text') else str(output).strip()
@@ -188,11 +209,12 @@ class CoordinatorAgent(BaseAgent):
                 "type": "respuesta_final",
                 "content": final_answer,
                 "intencion": intencion
-            })
+            }, request_id=request_id)
 
         except Exception as e:
             await self.send("user", {
                 "type": "respuesta_final",
-                "content": f"Sorry, I was unable to generate a final answer due to an internal error: {str(e)}"
-            })
+                "content": f"Sorry, I was unable to generate a final answer due to an internal error: {str(e)}",
+                "intencion": "error"
+            }, request_id=request_id)
 
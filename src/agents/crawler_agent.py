@@ -51,9 +51,12 @@ class Crawler_Agent(BaseAgent):
         """
         queries = message["content"]
         results = self.crawl_scrap(queries)
+        if isinstance(results, list) and results:
+            # Avisar al agente de embeddings para que cargue los segmentos nuevos
+            await self.send("embedding", {"type": "refresh"})
         if len(results) == 0:
-            await self.send("coordinator", {"source": "crawler", "results": "No se ha encontrado información relevante respecto a la consulta."})
-        await self.send("coordinator", {"source": "crawler", "results": results})
+            await self.send("coordinator", {"source": "crawler", "results": "No se ha encontrado información relevante respecto a la consulta."}, request_id=message.get("request_id"))
+        await self.send("coordinator", {"source": "crawler", "results": results}, request_id=message.get("request_id"))
 
 
     def crawl_scrap(self, messages: list[str]) -> str|list[dict]:
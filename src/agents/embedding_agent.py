@@ -1,5 +1,17 @@
+import asyncio
+import os
 import pickle
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, BrokenExecutor
+from pathlib import Path
 from agents.base_agent import BaseAgent
+from embedding.embedder import get_embeddings
+from embedding.vector_store import VectorStore
+from embedding.segment_log import SegmentLog, MANIFEST_FILE
+from embedding.ann_index import IVFIndex
+from embedding.quantization import QuantizedIndex
+from embedding.bm25 import BM25Index, BM25_DIR
 
 class EmbeddingAgent(BaseAgent):
     """
@@ -14,8 +26,13 @@ class EmbeddingAgent(BaseAgent):
     - Consultar una base vectorial local.
     - Devolver los documentos más similares.
 
+    La inferencia del modelo y la búsqueda son trabajo de CPU, así que se ejecutan en un
+    pool de hilos o de procesos para no bloquear el bucle de asyncio (y con él al resto de
+    agentes). Las consultas que llegan casi a la vez se agrupan en un solo lote.
     """
-    def __init__(self, name, system, embedding_fn):
+    def __init__(self, name, system, embedding_fn, store_path="src/embedding/store", legacy_path="src/embedding/embeddings.pkl",
+                 index="exact", nprobe=8, nlist=None, quantization=None, rerank_factor=4, lexical=False,
+                 executor="thread", max_workers=1, batch_window=0.005):
         """
         Inicializa el agente de recuperación por embeddings.
 
@@ -28,25 +45,201 @@ class EmbeddingAgent(BaseAgent):
             system (System): Referencia al sistema multiagente.
             embedding_fn (Callable): Función que toma una consulta y un embedding indexado,
                                      y devuelve los documentos más relevantes.
+            store_path (str): Carpeta del repositorio vectorial en formato columnar.
+            legacy_path (str): Antiguo `embeddings.pkl`, que se convierte al nuevo formato
+                               si el repositorio aún no existe.
+            index (str): Tipo de búsqueda: "exact" (fuerza bruta) o "ivf" (aproximada).
+            nprobe (int): Listas visitadas por consulta en el índice IVF. Más listas dan
+                          mejor recall y más latencia.
+            nlist (int): Cantidad de listas del índice IVF (por defecto, raíz de N).
+            quantization (str): Para la búsqueda exacta, "int8" o "float16" mantiene en memoria
+                                una copia cuantizada de la matriz para la primera pasada; None
+                                usa directamente los vectores float32.
+            rerank_factor (int): Candidatos por resultado que se re-puntúan con float32.
+            lexical (bool): Combinar la búsqueda densa con un índice BM25 sobre los mismos
+                            chunks (búsqueda híbrida). `embedding_fn` debe aceptar entonces
+                            el argumento `lexical`, como `retrieve_fused`.
+                            `embedding_fn` recibe además los embeddings ya calculados
+                            de cada consulta (`query_embeddings`), como `retrieve`.
+            executor (str): Dónde se ejecuta la recuperación: "thread" (pool de hilos),
+                            "process" (pool de procesos, cada uno con su propio modelo y
+                            repositorio; `embedding_fn` debe poder serializarse con pickle)
+                            o None (dentro del bucle de asyncio, bloqueándolo).
+            max_workers (int): Hilos o procesos del pool.
+            batch_window (float): Segundos que se espera a otras consultas antes de lanzar
+                                  un lote; todas las queries del lote se codifican juntas.
         """
         super().__init__(name, system)
         self.embedding_fn = embedding_fn
-        # Declarar vectores del embedding y asignarlos
-        with open("src/embedding/embeddings.pkl", 'rb') as f:
-            self.data = pickle.load(f)
+        self.store_path = store_path
+        self.legacy_path = legacy_path
+        self.index = index
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self.lexical = lexical
+        self.executor = executor
+        self.max_workers = max_workers
+        self.batch_window = batch_window
+        self._pool = None
+        self._pending = []
+        self._flush_task = None
+        self.stats = {"batches": 0, "queries": 0, "errors": 0, "offloaded_seconds": 0.0, "loop_blocked_seconds": 0.0}
+        self._data = None
+        self._log = None
+        self._lexical_index = None
+
+    @property
+    def data(self):
+        """
+        Repositorio vectorial, abierto de forma perezosa en la primera consulta.
+
+        Los vectores se mapean desde disco, por lo que abrirlo es casi instantáneo y las
+        páginas se comparten con cualquier otro proceso que use el mismo repositorio.
+        """
+        if self._data is None:
+            store_dir = Path(self.store_path)
+            is_empty = not (store_dir / MANIFEST_FILE).exists() and not VectorStore.exists(store_dir)
+            if is_empty and os.path.exists(self.legacy_path):
+                print("[EmbeddingAgent] Convirtiendo embeddings.pkl al formato columnar...")
+                with open(self.legacy_path, 'rb') as f:
+                    VectorStore.from_records(pickle.load(f)).save(store_dir)
+            self._log = self._data = SegmentLog.open(store_dir)
+            if self.index == "ivf":
+                self._data = IVFIndex(self._data, nlist=self.nlist, nprobe=self.nprobe)
+            elif self.quantization:
+                self._data = QuantizedIndex(self._data, self.quantization, self.rerank_factor)
+        return self._data
+
+    @property
+    def lexical_index(self):
+        """
+        Índice BM25 del repositorio, al día con la generación actual de los segmentos.
+        Cuando cambia la generación sólo se tokenizan los segmentos nuevos; los términos
+        de los demás se reutilizan (de memoria o de disco, junto al repositorio).
+        """
+        if self._log is None:
+            self.data  # abre el repositorio
+        if self._lexical_index is None or self._lexical_index.key != BM25Index.store_key(self._log):
+            self._lexical_index = BM25Index.for_store(self._log, Path(self.store_path) / BM25_DIR,
+                                                      previous=self._lexical_index)
+        return self._lexical_index
+
+    def _worker_config(self) -> dict:
+        return {
+            "embedding_fn": self.embedding_fn, "store_path": self.store_path, "legacy_path": self.legacy_path,
+            "index": self.index, "nprobe": self.nprobe, "nlist": self.nlist, "quantization": self.quantization,
+            "rerank_factor": self.rerank_factor, "lexical": self.lexical, "executor": None,
+        }
+
+    @property
+    def pool(self):
+        """Pool donde se ejecuta la recuperación, creado en el primer lote."""
+        if self._pool is None:
+            if self.executor == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_process_worker,
+                                                 initargs=(self._worker_config(),))
+            elif self.executor == "thread":
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+            else:
+                raise ValueError(f"Tipo de executor no soportado: {self.executor}")
+        return self._pool
+
+    def retrieve_batch(self, queries: list) -> list:
+        """
+        Recupera los resultados de varias consultas (cada una, una query o lista de queries).
+        Todas las queries del lote se codifican con una sola llamada al modelo y cada
+        búsqueda recibe sus embeddings, sin volver a consultar la caché: cada query cuenta
+        una sola vez en los aciertos y fallos de `query_cache`.
+        """
+        self.data.refresh()
+        query_lists = [[query] if isinstance(query, str) else list(query) for query in queries]
+        texts = list(dict.fromkeys(text for query_list in query_lists for text in query_list))
+        encoded = get_embeddings(texts) if texts else None
+        vectors = dict(zip(texts, encoded)) if encoded is not None else {}
+
+        results = []
+        for query, query_list in zip(queries, query_lists):
+            kwargs = {"lexical": self.lexical_index} if self.lexical else {}
+            if query_list and all(text in vectors for text in query_list):
+                kwargs["query_embeddings"] = np.stack([vectors[text] for text in query_list])
+            results.append(self.embedding_fn(query, self.data, **kwargs))
+        return results
+
+    async def _flush_after_window(self):
+        """Espera `batch_window` para acumular consultas y procesa el lote fuera del bucle."""
+        await asyncio.sleep(self.batch_window)
+        pending, self._pending = self._pending, []
+        self._flush_task = None
+        queries = [query for query, _ in pending]
+
+        print(f"[CONSULTANDO AL REPOSITORIO VECTORIAL] {len(queries)} consulta(s)")
+        start = time.perf_counter()
+        try:
+            if self.executor is None:
+                results = self.retrieve_batch(queries)
+                self.stats["loop_blocked_seconds"] += time.perf_counter() - start
+            elif self.executor == "process":
+                results = await asyncio.get_running_loop().run_in_executor(self.pool, _retrieve_in_worker, queries)
+            else:
+                results = await asyncio.get_running_loop().run_in_executor(self.pool, self.retrieve_batch, queries)
+        except Exception as e:
+            # Las peticiones del lote ya salieron de `_pending`: sin respuesta el validador las esperaría para siempre
+            print(f"[EmbeddingAgent] Error al recuperar el lote de {len(queries)} consulta(s): {e}")
+            self.stats["errors"] += 1
+            if isinstance(e, BrokenExecutor):
+                self._pool = None  # Un pool roto no acepta más trabajo: se recrea en el próximo lote
+            results = [[] for _ in pending]
+        elapsed = time.perf_counter() - start
+
+        self.stats["batches"] += 1
+        self.stats["queries"] += len(queries)
+        if self.executor is not None:
+            self.stats["offloaded_seconds"] += elapsed
+        print(f"[EmbeddingAgent] Lote de {len(queries)} consulta(s) en {elapsed * 1000:.1f} ms "
+              f"({'fuera del bucle' if self.executor else 'bloqueando el bucle'}; "
+              f"bucle bloqueado en total: {self.stats['loop_blocked_seconds'] * 1000:.1f} ms)")
+
+        for result, (_, request_id) in zip(results, pending):
+            await self.send("validator", {"source": "embedding", "results": result, "type": "result"}, request_id=request_id)
 
     async def handle(self, message):
         """
         Maneja una consulta enviada al agente embedding.
 
-        Extrae la consulta del mensaje, realiza la búsqueda vectorial y envía los 
-        resultados al agente validador.
+        Encola la consulta del mensaje y, pasado `batch_window`, la procesa en lote con las
+        demás consultas recibidas; los resultados se envían al agente validador. Un mensaje
+        de tipo "refresh" (enviado por el crawler tras indexar un documento) recarga los
+        segmentos nuevos del repositorio (los procesos trabajadores recargan en cada lote).
 
         Args:
             message (dict): Mensaje con el campo "content.query" como texto para consultar.
         """
-        query = message["content"]["query"]
-        # Preprocesar la query
-        print("[CONSULTANDO AL REPOSITORIO VECTORIAL]")
-        results = self.embedding_fn(query, self.data)
-        await self.send("validator", {"source": "embedding", "results": results, "type": "result"})
\ No newline at end of file
+        if message["content"].get("type") == "refresh":
+            if self.executor == "process":
+                return
+            if self.executor is None:
+                refreshed = self.data.refresh()
+            else:
+                refreshed = await asyncio.get_running_loop().run_in_executor(self.pool, lambda: self.data.refresh())
+            if refreshed:
+                print(f"[EmbeddingAgent] Repositorio actualizado ({len(self.data)} chunks)")
+            return
+
+        self._pending.append((message["content"]["query"], message.get("request_id")))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+
+# ==== Pool de procesos ====
+
+_worker_agent = None
+
+def _init_process_worker(config: dict):
+    """Crea en cada proceso trabajador su propio agente (modelo y repositorio incluidos)."""
+    global _worker_agent
+    _worker_agent = EmbeddingAgent("embedding", None, **config)
+    _worker_agent.data
+
+def _retrieve_in_worker(queries: list) -> list:
+    return _worker_agent.retrieve_batch(queries)
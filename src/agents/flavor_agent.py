@@ -1,4 +1,6 @@
 import json
+from collections import OrderedDict
+import numpy as np
 from sympy import to_dnf, And, Or
 from agents.base_agent import BaseAgent
 import os
@@ -6,6 +8,16 @@ from owlready2 import get_ontology
 from agents.base_agent import BaseAgent
 from utils.softmax import softmax, select_k_without_replace
 
+PLAN_CACHE_SIZE = 256  # Fórmulas compiladas que se conservan
+
+# Versiones vectorizadas de `Flavor_Agent.categories`: las mismas funciones de pertenencia,
+# aplicadas a una columna completa de la matriz de sabores
+FUZZY_CATEGORIES = {
+    "nada": lambda x: np.where(x <= 0.1, 1.0, 0.0),
+    "poco": lambda x: np.maximum(np.minimum((x - 0.1) / 0.15, (0.4 - x) / 0.15), 0.0),
+    "medio": lambda x: np.maximum(np.minimum((x - 0.3) / 0.2, (0.7 - x) / 0.2), 0.0),
+    "muy": lambda x: np.where(x >= 0.8, 1.0, np.maximum(0.0, (x - 0.6) / 0.2)),
+}
 
 class Flavor_Agent(BaseAgent):
     """
@@ -61,6 +73,12 @@ class Flavor_Agent(BaseAgent):
         with open(self.DATA_FILE, "r", encoding="utf-8") as f:
             self.data = json.load(f)
 
+        # Catálogo como matriz (N x 5) para evaluar una fórmula sobre todos los cócteles a la vez.
+        # En float64: muchos sabores valen 0.1 + epsilon y en float32 pasarían a cumplir "nada"
+        self.names = list(self.data)
+        self.vectors = np.asarray([self.data[name] for name in self.names], dtype=np.float64).reshape(len(self.names), len(self.flavor_map))
+        self._plans = OrderedDict()
+
     def query_to_dnf(self, query):
         """
         Convierte una fórmula lógica textual a su Forma Normal Disyuntiva (DNF).
@@ -120,25 +138,86 @@ class Flavor_Agent(BaseAgent):
             float: Valor de pertenencia en el rango [0.0, 1.0].
         """
 
-        term_str = str(term)
-        
-        parts = term_str.split('_')
-        
+        parsed = self.parse_term(term)
+        if parsed is None:
+            return 0.0
+        modifier, flavor_idx = parsed
+        return self.categories[modifier](cocktail_vector[flavor_idx])
+
+    def parse_term(self, term):
+        """
+        Separa un término lingüístico (ej. 'muy_dulce') en su modificador y el índice del sabor.
+
+        Args:
+            term (sympy.Symbol): Término a interpretar.
+
+        Returns:
+            tuple[str, int] | None: (modificador, índice del sabor), o None si el término no es
+                                    válido (su pertenencia es siempre 0.0).
+        """
+
+        parts = str(term).split('_')
+
         if len(parts) == 2:
             modifier, flavor = parts
         else:
             modifier, flavor = "muy", parts[0]
-        
-        if flavor not in self.flavor_map:
-            return 0.0  
-        
-        flavor_idx = self.flavor_map[flavor]
-        flavor_value = cocktail_vector[flavor_idx]
-        
-        if modifier in self.categories:
-            return self.categories[modifier](flavor_value)
-        else:
-            return 0.0
+
+        if flavor not in self.flavor_map or modifier not in self.categories:
+            return None
+        return modifier, self.flavor_map[flavor]
+
+    def compile_query(self, query):
+        """
+        Compila una fórmula a un plan: una tupla de cláusulas (OR), cada una una tupla de
+        términos (AND) ya interpretados como (modificador, índice del sabor), o None para los
+        términos inválidos. La conversión a DNF es lo más caro, así que los planes se guardan.
+
+        Args:
+            query (str): Fórmula lógica de sabores.
+
+        Returns:
+            tuple: Plan de la fórmula.
+        """
+
+        plan = self._plans.get(query)
+        if plan is not None:
+            self._plans.move_to_end(query)
+            return plan
+        dnf = self.query_to_dnf(query)
+        plan = tuple(
+            tuple(self.parse_term(term) for term in self.get_terms(clause))
+            for clause in self.get_clauses(dnf)
+        )
+        self._plans[query] = plan
+        while len(self._plans) > PLAN_CACHE_SIZE:
+            self._plans.popitem(last=False)
+        return plan
+
+    def evaluate_plan(self, plan):
+        """
+        Evalúa un plan sobre todo el catálogo: pertenencia por columna, mínimo sobre los
+        términos de cada cláusula y máximo sobre las cláusulas.
+
+        Args:
+            plan (tuple): Plan devuelto por `compile_query`.
+
+        Returns:
+            np.ndarray: Valor de la fórmula para cada cóctel, en el orden de `self.names`.
+        """
+
+        n = len(self.names)
+        scores = np.zeros(n)
+        for clause in plan:
+            clause_values = np.ones(n)
+            for term in clause:
+                if term is None:
+                    clause_values = np.zeros(n)
+                    break
+                modifier, flavor_idx = term
+                clause_values = np.minimum(clause_values, FUZZY_CATEGORIES[modifier](self.vectors[:, flavor_idx]))
+            scores = np.maximum(scores, clause_values)
+        return scores
     
     def es_formula_valida(self, expresion: str) -> bool:
         """
@@ -177,31 +256,15 @@ class Flavor_Agent(BaseAgent):
         """
 
         if message["content"]["flavors"] == "" or message["content"]["flavors"] is None:
-            await self.send("validator", {"source": "flavor", "results": [], "type": "result"})
+            await self.send("validator", {"source": "flavor", "results": [], "type": "result"}, request_id=message.get("request_id"))
             return
 
         if (not self.es_formula_valida(message["content"]["flavors"])):
-            await self.send("validator", {"source": "flavor", "results": [], "type": "result"})
+            await self.send("validator", {"source": "flavor", "results": [], "type": "result"}, request_id=message.get("request_id"))
             return
 
-        response = []
-        message_dnf = self.query_to_dnf(message["content"]["flavors"])
-
-        for cocktail in self.data:
-            cocktail_vector = self.data[cocktail]
-            max_value = 0.0  
-
-            for clause in self.get_clauses(message_dnf):
-                min_value = 1.0  
-                
-                for term in self.get_terms(clause):
-                    term_value = self.evaluate_term(term, cocktail_vector)
-                    min_value = min(min_value, term_value)
-                
-                max_value = max(max_value, min_value)
-
-            if max_value >= 0.7:
-                response.append((cocktail, max_value))
+        scores = self.evaluate_plan(self.compile_query(message["content"]["flavors"]))
+        response = [(self.names[i], float(scores[i])) for i in np.flatnonzero(scores >= 0.7)]
 
         probs = softmax(response)
         drinks = select_k_without_replace(probs, message["content"]["ammount"])
@@ -216,4 +279,4 @@ class Flavor_Agent(BaseAgent):
         for result in results:
             if "Error" not in result:
                 filtered_results.append(result)
-        await self.send("validator", {"source": "flavor", "results": filtered_results, "type": "result"})
\ No newline at end of file
+        await self.send("validator", {"source": "flavor", "results": filtered_results, "type": "result"}, request_id=message.get("request_id"))
\ No newline at end of file
@@ -0,0 +1,57 @@
+import asyncio
+from agents.base_agent import BaseAgent
+from environment.agent_system import new_request_id
+
+class GatewayAgent(BaseAgent):
+    """
+    Agente de entrada para clientes remotos (servidor HTTP, pruebas de carga).
+
+    Ocupa el lugar de `UserAgent` en el sistema (se registra como "user"), pero en lugar
+    de leer de la terminal recibe consultas de muchos clientes a la vez. Cada consulta
+    tiene su propio `request_id` y su propia cola, por la que llegan las respuestas
+    intermedias ("await") y la final.
+
+    Atributos:
+        streams (dict[str, asyncio.Queue]): Cola de respuestas de cada consulta en curso.
+    """
+
+    def __init__(self, name, system):
+        super().__init__(name, system)
+        self.streams = {}
+
+    async def submit(self, text: str):
+        """
+        Envía una consulta al sistema y va devolviendo sus respuestas.
+        Args:
+            text (str): Consulta del usuario en lenguaje natural.
+        Yields:
+            dict: Respuestas del coordinador ("content" e "intencion"); la última es la
+                  primera cuya intención no sea "await".
+        """
+        request_id = new_request_id()
+        queue = asyncio.Queue()
+        self.streams[request_id] = queue
+        try:
+            await self.send("intent_detector", {"text": text}, request_id=request_id)
+            while True:
+                response = await queue.get()
+                yield response
+                if response.get("intencion") != "await":
+                    break
+        finally:
+            self.streams.pop(request_id, None)
+
+    async def handle(self, message):
+        """
+        Reenvía la intención detectada al coordinador y entrega las respuestas del
+        coordinador a la consulta correspondiente. Los mensajes de consultas cuyo cliente
+        ya se desconectó se descartan.
+        """
+        request_id = message.get("request_id")
+        queue = self.streams.get(request_id)
+        if queue is None:
+            return
+        if message["from"] == "intent_detector":
+            await self.send("coordinator", message["content"], request_id=request_id)
+        else:
+            await queue.put(message["content"])
@@ -1,4 +1,5 @@
 from agents.base_agent import BaseAgent
+from llm.client import agenerate
 
 class IntentDetectorAgent(BaseAgent):
     """
@@ -7,7 +8,10 @@ class IntentDetectorAgent(BaseAgent):
     Este agente se comunica con un modelo de lenguaje para analizar la consulta, identificar
     menciones de cócteles, campos requeridos, sabores, posibles búsquedas por embedding o en línea,
     y devuelve una estructura JSON con la interpretación detallada de la intención.
+    Atiende varias consultas a la vez, cada una en su propia tarea.
     """
+    concurrent = True
+
     def __init__(self, name, system, model):
         """
         Inicializa el agente detector de intenciones.
@@ -20,21 +24,23 @@ class IntentDetectorAgent(BaseAgent):
         super().__init__(name, system)
         self.model = model
 
-    async def run(self):
+    async def handle(self, msg):
         """
-        Bucle principal del agente.
-
-        Escucha mensajes entrantes, ejecuta el análisis de intención sobre la consulta recibida,
-        y reenvía el resultado (en formato JSON) al agente que originó la consulta.
+        Ejecuta el análisis de intención sobre la consulta recibida y reenvía el resultado
+        (en formato JSON) al agente que originó la consulta.
         """
-        while True:
-            msg = await self.receive()
-            query = msg["content"]
-            sender = msg["from"]
+        query = msg["content"]
+        sender = msg["from"]
 
+        try:
             intent_json = await self.detect_intent(query)
+        except Exception as e:
+            # Se responde igualmente para que la consulta no quede esperando; el coordinador
+            # rechaza el JSON vacío y avisa al usuario
+            print(f"[IntentDetector] Error detectando la intención: {e!r}")
+            intent_json = ""
 
-            await self.send(sender, intent_json)
+        await self.send(sender, intent_json, request_id=msg.get("request_id"))
 
     async def detect_intent(self, query):
         """
@@ -81,5 +87,5 @@ class IntentDetectorAgent(BaseAgent):
         NOTA: Si el usuario no menciona nada respecto a un trago, más que su nombre, asume que quiere saber sus ingredientes y su preparación, pero no dejes todos los datos del trago en false.
         """
         print("\n[DETECTANDO INTENCIONES DE LA CONSULTA]")
-        response = self.model.generate_content(prompt)
+        response = await agenerate(self.model, prompt)
         return response.text
\ No newline at end of file
@@ -43,4 +43,4 @@ class OntologyAgent(BaseAgent):
         for result in results:
             if "Error" not in result:
                 filtered_results.append(result)
-        await self.send("validator", {"source": "ontology", "results": filtered_results, "type": "result"})
\ No newline at end of file
+        await self.send("validator", {"source": "ontology", "results": filtered_results, "type": "result"}, request_id=message.get("request_id"))
\ No newline at end of file
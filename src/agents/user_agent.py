@@ -1,4 +1,6 @@
+import asyncio
 from agents.base_agent import BaseAgent
+from environment.agent_system import new_request_id
 from ui import user_interface as ui
 
 class UserAgent(BaseAgent):
@@ -25,21 +27,25 @@ class UserAgent(BaseAgent):
         ui.show_welcome_message()
 
         while True:
-            user_input = ui.get_user_input()
+            # input() es bloqueante: se lee en un hilo para no congelar al resto de agentes
+            user_input = await asyncio.to_thread(ui.get_user_input)
 
             if user_input.lower() in ['salir', 'exit', 'quit']:
                 ui.show_exit_message()
                 break
 
+            # Cada consulta lleva su propio identificador durante todo el recorrido
+            request_id = new_request_id()
+
             # Enviar input al detector de intención
-            await self.send("intent_detector", {"text": user_input})
+            await self.send("intent_detector", {"text": user_input}, request_id=request_id)
 
             # Esperar respuesta del detector
             intent_response = await self.receive()
             intent_data = intent_response["content"]
 
             # Enviar datos al coordinator
-            await self.send("coordinator", intent_data)
+            await self.send("coordinator", intent_data, request_id=request_id)
 
             # Esperar respuesta final del coordinator
             
@@ -3,7 +3,18 @@ import json
 import re
 import ast
 import asyncio
-from utils.metaheuristic import TabuSearchSelector
+import time
+from collections import deque
+import numpy as np
+from utils.metaheuristic import ExactCoverSelector, EXACT_MAX_RESTRICTIONS
+from utils.portfolio import PortfolioRunner
+from llm.client import agenerate
+
+TRACE_SIZE = 256  # Trazas de latencia que se conservan (las más recientes)
+MAX_CANDIDATES = 200  # Candidatos evaluados como mucho en la matriz de cumplimiento
+MATRIX_BATCH = 10  # Candidatos por consulta al modelo en la matriz de cumplimiento
+MATRIX_CONCURRENCY = 4  # Consultas de la matriz en curso a la vez por petición
+MATRIX_RETRIES = 2  # Reintentos de un lote de la matriz con salida malformada
 
 class ValidationAgent(BaseAgent):
     """
@@ -13,11 +24,22 @@ class ValidationAgent(BaseAgent):
     Su trabajo principal es:
     - Esperar resultados desde múltiples fuentes.
     - Aplicar restricciones semánticas (fuertes y débiles) derivadas de la consulta del usuario.
-    - Evaluar subconjuntos de candidatos con una metaheurística (Tabu Search).
+    - Evaluar subconjuntos de candidatos: de forma exacta si hay pocas restricciones, o con metaheurísticas (Tabu Search y ACO).
     - Verificar la suficiencia de los elementos seleccionados antes de enviarlos al Coordinador.
+
+    Las fuentes esperadas, los resultados recibidos y la consulta de cada petición se guardan
+    en un contexto indexado por `request_id`, de modo que puede validar varias consultas a la vez.
+
+    Las restricciones sólo dependen de la consulta, así que se extraen de forma especulativa en
+    cuanto llega la expectativa, mientras las fuentes buscan; cuando el conjunto de candidatos
+    está completo sólo hay que esperar lo que quede de esa llamada al modelo. Cada petición
+    deja en `traces` los instantes (ms desde la expectativa) en que se completaron las fuentes,
+    terminó la extracción, estuvieron disponibles las restricciones y se envió el resultado.
     """
+    concurrent = True
 
-    def __init__(self, name, system, model):
+    def __init__(self, name, system, model, prefetch_constraints=True,
+                 matrix_batch=MATRIX_BATCH, matrix_concurrency=MATRIX_CONCURRENCY, prefilter=None, portfolio=None):
         """
     Inicializa el agente validador.
 
@@ -30,12 +52,39 @@ class ValidationAgent(BaseAgent):
         gamma (int): Peso de las restricciones débiles.
         num_ants (int): Cantidad de agentes en metaheurísticas basadas en colonia (no usado aquí).
         max_iters (int): Número máximo de iteraciones para búsqueda de soluciones.
+        prefetch_constraints (bool): Empezar a extraer las restricciones en cuanto llega la
+                                     expectativa, mientras las fuentes todavía buscan,
+                                     en lugar de esperar a tener todos los resultados.
+        matrix_batch (int | None): Candidatos por consulta al verificar la matriz de
+                                   cumplimiento; None los evalúa todos en una consulta.
+        matrix_concurrency (int): Consultas de la matriz en curso a la vez.
+        prefilter (ConstraintPrefilter | None): Evaluación local que descarta candidatos y
+                                                decide las celdas evidentes de la matriz
+                                                antes de consultar al modelo.
+        portfolio (PortfolioRunner | None): Búsquedas Tabu/ACO en paralelo y con tiempo acotado
+                                            para las instancias con muchas restricciones;
+                                            None crea uno con los valores por defecto.
     """
         super().__init__(name, system)
         self.model = model
-        self.expected_sources = set()
-        self.received_data = {}
-        self.query = None
+        self.prefetch_constraints = prefetch_constraints
+        self.matrix_batch = matrix_batch
+        self.matrix_concurrency = matrix_concurrency
+        self.prefilter = prefilter
+        self.portfolio = portfolio if portfolio is not None else PortfolioRunner(alpha=10, beta=1, gamma=2)
+        self.requests = {}
+        self.traces = deque(maxlen=TRACE_SIZE)
+
+    async def run(self):
+        """Atiende mensajes hasta que se cancela la tarea y, al terminar, libera el portafolio."""
+        try:
+            await super().run()
+        finally:
+            self.close()
+
+    def close(self):
+        """Detiene el pool de procesos del portafolio (se vuelve a crear si se usa otra vez)."""
+        self.portfolio.shutdown()
 
     async def handle(self, message):
         """
@@ -48,21 +97,31 @@ class ValidationAgent(BaseAgent):
             - Elimina duplicados.
             - Extraen restricciones fuertes y débiles desde el modelo.
             - Verifica subconjuntos válidos usando una matriz de cumplimiento.
-            - Ejecuta Tabu Search para encontrar el subconjunto óptimo.
+            - Busca el subconjunto óptimo: de forma exacta si hay pocas restricciones, o con un
+              portafolio de búsquedas Tabu/ACO en paralelo y con tiempo acotado.
             - Verifica la suficiencia semántica de la respuesta final.
             - Envía el resultado final al Coordinador.
 
         En caso de error, se notifica al Coordinador con un mensaje de error.
         """
         
+        request_id = message.get("request_id")
         try:
             content = message.get("content", {})
             msg_type = content.get("type")
 
             if msg_type == "expectation":
-                self.expected_sources = set(content.get("sources", []))
-                self.received_data.clear()
-                self.query = content.get("query")
+                self._clear_state(request_id)
+                query = content.get("query")
+                trace = {"request_id": request_id, "prefetch": self.prefetch_constraints, "start": time.perf_counter()}
+                self.requests[request_id] = {
+                    "expected_sources": set(content.get("sources", [])),
+                    "received_data": {},
+                    "query": query,
+                    "trace": trace,
+                    # Las restricciones sólo dependen de la consulta: se piden ya, en paralelo con las fuentes
+                    "constraints": asyncio.create_task(self._timed_constraints(query, trace)) if self.prefetch_constraints else None,
+                }
                 return
 
             if msg_type != "result":
@@ -72,87 +131,106 @@ class ValidationAgent(BaseAgent):
             results = content.get("results", [])
 
             # Guardar resultados solo si son de una fuente esperada
-            if source not in self.expected_sources:
+            ctx = self.requests.get(request_id)
+            if ctx is None or source not in ctx["expected_sources"]:
                 return
 
-            self.received_data[source] = results
+            ctx["received_data"][source] = results
 
             # Si aún no recibimos todos, esperar
-            if not self.expected_sources.issubset(self.received_data.keys()):
+            if not ctx["expected_sources"].issubset(ctx["received_data"].keys()):
                 return
+            # A partir de aquí la petición está completa y deja de aceptar resultados
+            self._clear_state(request_id, cancel=False)
+            trace = ctx["trace"]
+            _mark(trace, "fuentes")
 
             print("[CONFORMANDO CONJUNTO DE DATOS PARA LA RESPUESTA]")
 
             # Recolectar y normalizar candidatos
             candidates = []
-            for src in self.expected_sources:
-                for result in self.received_data.get(src, []):
+            for src in ctx["expected_sources"]:
+                for result in ctx["received_data"].get(src, []):
                     candidates.append(self.stringify_candidate(result))
 
             if not candidates:
-                await self.send("coordinator", {"error": "No se encontraron candidatos para evaluar."})
-                self._clear_state()
+                if ctx["constraints"]:
+                    ctx["constraints"].cancel()
+                await self.send("coordinator", {"error": "No se encontraron candidatos para evaluar."}, request_id=request_id)
                 return
 
             candidates = eliminar_repetidos(candidates)
 
             # Extraer restricciones
-            restrictions = self.extract_constraints(self.query)
+            if ctx["constraints"]:
+                restrictions = await ctx["constraints"]
+            else:
+                restrictions = await self._timed_constraints(ctx["query"], trace)
+            _mark(trace, "restricciones_disponibles")
             if not restrictions.get("fuertes"):
-                await self.send("coordinator", {"error": "No se pudieron extraer restricciones fuertes válidas."})
-                self._clear_state()
+                await self.send("coordinator", {"error": "No se pudieron extraer restricciones fuertes válidas."}, request_id=request_id)
                 return
 
             # Crear matriz de verificación
             all_restrictions = restrictions["fuertes"] + restrictions["débiles"]
-            matriz = self.verifica_matriz(candidates, all_restrictions)
+            known = values = None
+            if self.prefilter is not None:
+                # Descartar candidatos irrelevantes y decidir las celdas evidentes sin el modelo
+                known, values = await asyncio.to_thread(self.prefilter.prefill, candidates, all_restrictions)
+                keep = self.prefilter.keep(known, values)
+                candidates = [candidates[i] for i in keep]
+                known, values = known[keep], values[keep]
+            matriz = await self.verifica_matriz(candidates, all_restrictions, known, values)
             filtered_candidates, _ = divide(candidates, len(matriz))
             
-            while True:
+            # Con pocas restricciones la selección óptima es exacta y más rápida que cualquier búsqueda;
+            # si no, un portafolio de búsquedas Tabu/ACO con tiempo acotado
+            selected = None
+            if len(all_restrictions) <= EXACT_MAX_RESTRICTIONS:
                 try:
-                    selector = TabuSearchSelector(alpha=10, beta=1, gamma=2, max_iters=200)
-                    selected, puntaje = selector.select(filtered_candidates, restrictions, matriz)
-                    break  # Éxito, salimos del bucle
+                    selected, puntaje = ExactCoverSelector(alpha=10, beta=1, gamma=2).select(filtered_candidates, restrictions, matriz)
                 except Exception as e:
-                    print(f"[ACO] Error durante la ejecución: {e}. Reintentando...")
-                    await asyncio.sleep(0.1)  # Pequeña pausa opcional para evitar bucles frenéticos
-            
-            # Metaheurística descartada.
-            # while True:
-            #     try:
-            #         selected, score = self.ant_colony_optimization(candidates, restrictions, matriz)
-            #         break  # Éxito, salimos del bucle
-            #     except Exception as e:
-            #         print(f"[ACO] Error durante la ejecución: {e}. Reintentando...")
-            #         await asyncio.sleep(0.1)  # Pequeña pausa opcional para evitar bucles frenéticos
+                    print(f"[ValidationAgent] Error en la selección exacta: {e}. Se usa el portafolio...")
+            if selected is None:
+                selected, puntaje = await asyncio.to_thread(self.portfolio.select, filtered_candidates, restrictions, matriz)
 
             # Verificar suficiencia
             restricciones_conjuntas = restrictions.get("conjuntas", [])
             print("[VALIDANDO CONTENIDO DE LA RESPUESTA]")
-            suficiencia = self.verifica_suficiencia(self.query, selected, candidates, restricciones_conjuntas)
+            suficiencia = await self.verifica_suficiencia(ctx["query"], selected, candidates, restricciones_conjuntas)
 
             # Enviar resultado final al coordinator
-            await self.send("coordinator", {"suficiencia": suficiencia, "drinks": selected, "extra": candidates})
-
-            self._clear_state()
+            await self.send("coordinator", {"suficiencia": suficiencia, "drinks": selected, "extra": candidates}, request_id=request_id)
+            _mark(trace, "fin")
+            self.traces.append(trace)
 
         except Exception as e:
-            await self.send("coordinator", {"error": f"Error inesperado en ValidationAgent: {str(e)}"})
+            self._clear_state(request_id)
+            await self.send("coordinator", {"error": f"Error inesperado en ValidationAgent: {str(e)}"}, request_id=request_id)
 
-    def _clear_state(self):
+    def _clear_state(self, request_id=None, cancel=True):
         """
-        Limpia el estado interno del agente entre consultas.
-
-        Se eliminan:
+        Elimina el estado de la petición `request_id`:
         - Fuentes esperadas.
         - Datos recibidos.
         - Consulta en curso.
+        - Extracción de restricciones en curso (se cancela si `cancel` es True).
         """
-        self.expected_sources.clear()
-        self.received_data.clear()
-        self.query = None
+        ctx = self.requests.pop(request_id, None)
+        if cancel and ctx and ctx["constraints"]:
+            task = ctx["constraints"]
+            if task.done() and not task.cancelled():
+                task.exception()  # Da por recuperado un posible error: ya nadie esperará el resultado
+            task.cancel()
+
+    async def _timed_constraints(self, query, trace):
+        """Extrae las restricciones de `query` y anota en `trace` cuándo terminó la llamada."""
+        try:
+            return await self.extract_constraints(query)
+        finally:
+            _mark(trace, "restricciones")
 
-    def extract_constraints(self, query):
+    async def extract_constraints(self, query):
 
         """
         Genera restricciones semánticas a partir de la consulta original del usuario.
@@ -192,7 +270,7 @@ débiles: [Lista o conjunto de restricciones débiles. Esto debe ser una lista d
 conjuntas: [Conjunto de restricciones que se debe cumplir en general, y depende de la cantidad de tragos y especificación de los mismos que requiere la pregunta.]
 NOTA: Ninguna de las restricciones extraidas debe ser algo ambiguo, tienen que ser afirmaciones fácilmente verificables y explícitas. Además, ignora restricciones que no traten explícitamente sobre la bebida en cuestión.
 """
-        response = self.model.generate_content(prompt)
+        response = await agenerate(self.model, prompt)
         
         if not response or not getattr(response, "text", None):
             raise ValueError("La salida del modelo está vacía o malformada")
@@ -214,7 +292,7 @@ NOTA: Ninguna de las restricciones extraidas debe ser algo ambiguo, tienen que s
             print(f"[ValidationAgent] Error parsing restricciones:\n{response.text}\n{e}")
             return {"restricciones_fuertes": [], "restricciones_debiles": []}
 
-    def verifica_matriz(self, respuestas, restricciones):
+    async def verifica_matriz(self, respuestas, restricciones, known=None, values=None):
         """
         Evalúa una lista de respuestas candidatas contra un conjunto de restricciones
         (fuertes y/o débiles) y devuelve una matriz booleana indicando el cumplimiento.
@@ -222,17 +300,80 @@ NOTA: Ninguna de las restricciones extraidas debe ser algo ambiguo, tienen que s
         Cada fila representa una respuesta candidata y cada columna una restricción.
         El valor en [i][j] es True si la respuesta i cumple la restricción j, False en caso contrario.
 
-        La evaluación se realiza mediante una consulta a un modelo de lenguaje, que responde
-        en formato JSON indicando "sí"/"no" para cada par respuesta-restricción.
+        Las respuestas se evalúan en lotes de `matrix_batch` candidatos, cada uno con su propia
+        consulta al modelo (como mucho `matrix_concurrency` a la vez): los prompts son cortos y
+        una salida malformada sólo invalida su lote. Los lotes fallidos se reintentan hasta
+        `MATRIX_RETRIES` veces; los que siguen fallando se consideran incumplidos.
+
+        Si se indican celdas ya decididas (`known`, por ejemplo con `ConstraintPrefilter`), al
+        modelo sólo llegan las respuestas con alguna celda incierta y, en cada lote, sólo las
+        restricciones inciertas para alguna de ellas.
 
         Args:
             respuestas (list of str): Lista de respuestas candidatas normalizadas.
             restricciones (list of str): Lista de restricciones a verificar.
+            known (np.ndarray | None): Celdas ya decididas (respuestas x restricciones).
+            values (np.ndarray | None): Valor de las celdas decididas.
 
         Returns:
-            list of list of bool: Matriz de cumplimiento (True/False) por respuesta y restricción.
+            np.ndarray: Matriz booleana (respuestas x restricciones) de cumplimiento, con
+                        una fila por cada una de las primeras `MAX_CANDIDATES` respuestas.
+        """
+        respuestas = respuestas[:MAX_CANDIDATES]
+        shape = (len(respuestas), len(restricciones))
+        if known is None:
+            known = np.zeros(shape, dtype=bool)
+            values = np.zeros(shape, dtype=bool)
+        known = known[:len(respuestas)]
+        matriz = values[:len(respuestas)] & known
+        # Las respuestas con las mismas celdas inciertas van juntas: así cada lote pregunta por menos restricciones
+        inciertas = sorted((i for i in range(len(respuestas)) if not known[i].all()), key=lambda i: known[i].tobytes())
+        if not inciertas or not restricciones:
+            return matriz
+
+        size = self.matrix_batch or len(inciertas)
+        pendientes = [inciertas[inicio:inicio + size] for inicio in range(0, len(inciertas), size)]
+        semaphore = asyncio.Semaphore(self.matrix_concurrency)
+
+        async def evaluar(filas, intento):
+            columnas = np.flatnonzero(~known[filas].all(axis=0))
+            async with semaphore:
+                bloque = await self._verifica_lote([respuestas[i] for i in filas], [restricciones[j] for j in columnas], intento)
+            return columnas, bloque
+
+        for intento in range(MATRIX_RETRIES + 1):
+            bloques = await asyncio.gather(*(evaluar(filas, intento) for filas in pendientes))
+            fallidos = []
+            for filas, (columnas, bloque) in zip(pendientes, bloques):
+                if bloque is None:
+                    fallidos.append(filas)
+                    continue
+                # Sólo se copian las celdas inciertas: las decididas localmente se conservan
+                celdas = np.ix_(filas, columnas)
+                matriz[celdas] = np.where(known[celdas], matriz[celdas], bloque)
+            pendientes = fallidos
+            if not pendientes:
+                break
+
+        if pendientes:
+            print(f"[ValidationAgent] {len(pendientes)} lote(s) de la matriz sin evaluar; se consideran incumplidos")
+        return matriz
+
+    async def _verifica_lote(self, respuestas, restricciones, intento=0):
         """
+        Evalúa un lote de respuestas con una sola consulta al modelo.
 
+        Args:
+            respuestas (list of str): Respuestas del lote.
+            restricciones (list of str): Restricciones a verificar.
+            intento (int): Número de reintento; a partir del primero el prompt pide
+                           explícitamente la forma de la salida (y, al ser distinto, no
+                           reutiliza una respuesta malformada guardada en la caché).
+
+        Returns:
+            np.ndarray | None: Bloque booleano (len(respuestas) x len(restricciones)), o None
+                               si la salida del modelo no tiene esa forma.
+        """
         prompt = f"""
         Tenemos una lista de respuestas candidatas y una lista de restricciones.
         Para cada respuesta, indica si cumple cada restricción (sí o no). 
@@ -240,44 +381,38 @@ NOTA: Ninguna de las restricciones extraidas debe ser algo ambiguo, tienen que s
         Cada objeto debe tener esta estructura: 
         {{"respuesta": "texto", "cumple": ["sí", "no", "sí", ...]}}
         Respuestas:
-        {json.dumps(respuestas[:200], ensure_ascii=False)}
+        {json.dumps(respuestas, ensure_ascii=False)}
         Restricciones:
         {json.dumps(restricciones, ensure_ascii=False)}
         """
+        if intento:
+            prompt += (f"\n        IMPORTANTE (reintento {intento}): responde sólo con la lista JSON, con exactamente "
+                       f"{len(respuestas)} objetos en el mismo orden y {len(restricciones)} valores en cada \"cumple\".\n")
+
+        def valida(text):
+            try:
+                parse_cumplimiento(text, len(respuestas), len(restricciones))
+                return True
+            except Exception:
+                return False
 
+        output = None
         try:
-            output = self.model.generate_content(prompt)
+            # Una salida malformada no se guarda en la caché: el reintento de otra petición
+            # con el mismo lote vuelve a preguntar al modelo en lugar de repetir el fallo
+            output = await agenerate(self.model, prompt, validate=valida)
 
             if not output or not getattr(output, "text", None):
                 raise ValueError("La salida del modelo está vacía o malformada")
 
-            text = output.text.strip().replace("“", "\"").replace("”", "\"")
-
-            # Intentar extraer bloque JSON con regex
-            match = re.search(r"```(?:json)?\s*(\[.*?\])\s*```", text, re.DOTALL)
-            if match:
-                text = match.group(1)
-
-            # parsed = json.loads(text)
-            parsed = extraer_respuestas_crudas(text)
-
-            cumplimientos = []
-
-            for obj in parsed:
-                cumple = obj.get("cumple", [])
-
-                # Convertir cada "sí"/"no" en bool
-                vector_bool = ["sí" in estado.lower() for estado in cumple]
-                cumplimientos.append(vector_bool)
-
-            return cumplimientos
+            return parse_cumplimiento(output.text, len(respuestas), len(restricciones))
 
         except Exception as e:
-            print(f"[ValidationAgent] Error en verifica_matriz:\n{e}")
+            print(f"[ValidationAgent] Error en verifica_matriz (lote de {len(respuestas)}, intento {intento}):\n{e}")
             print(f"[ValidationAgent] Output del modelo:\n{getattr(output, 'text', '')}")
-            return {(r, c): False for c in respuestas for r in restricciones}
+            return None
 
-    def verifica_suficiencia(self, pregunta, respuestas, candidates, restricciones_grupales):
+    async def verifica_suficiencia(self, pregunta, respuestas, candidates, restricciones_grupales):
         """
         Evalúa si el conjunto seleccionado de respuestas contiene información suficiente
         para responder la pregunta del usuario de forma completa y válida, según un conjunto
@@ -329,7 +464,7 @@ Tu respuesta debe ser un OBJETO JSON con la siguiente estructura exacta, usando
 }}
 """
 
-        response = self.model.generate_content(prompt)
+        response = await agenerate(self.model, prompt)
 
         if not response or not getattr(response, "text", None):
             raise ValueError("La salida del modelo está vacía o malformada")
@@ -346,6 +481,7 @@ Tu respuesta debe ser un OBJETO JSON con la siguiente estructura exacta, usando
 
         Si el candidato es un diccionario, se transforma a una cadena en formato:
         "clave1: valor1 | clave2: valor2 | ...", con listas también representadas como strings.
+        Los resultados de `retrieve_fused` ("text", "score", "source", "sources") se reducen a su texto.
 
         Args:
             candidate (str or dict): Fragmento de información sobre un trago.
@@ -357,6 +493,10 @@ Tu respuesta debe ser un OBJETO JSON con la siguiente estructura exacta, usando
         if isinstance(candidate, str):
             return candidate
 
+        if isinstance(candidate, dict) and set(candidate) == {"text", "score", "source", "sources"}:
+            # Resultado de la recuperación fusionada: la puntuación y el archivo no aportan al LLM
+            return candidate["text"]
+
         if isinstance(candidate, dict):
             parts = []
             for key, value in candidate.items():
@@ -372,6 +512,35 @@ Tu respuesta debe ser un OBJETO JSON con la siguiente estructura exacta, usando
 
         return str(candidate)
 
+def parse_cumplimiento(text, num_respuestas, num_restricciones):
+    """
+    Convierte la respuesta del modelo a la matriz de cumplimiento de un lote.
+    Returns:
+        np.ndarray: Bloque booleano (num_respuestas x num_restricciones).
+    Raises:
+        ValueError: Si la salida no tiene una fila por respuesta y un valor por restricción.
+    """
+    text = text.strip().replace("“", "\"").replace("”", "\"")
+
+    # Intentar extraer bloque JSON con regex
+    match = re.search(r"```(?:json)?\s*(\[.*?\])\s*```", text, re.DOTALL)
+    if match:
+        text = match.group(1)
+
+    parsed = extraer_respuestas_crudas(text)[:num_respuestas]
+    if len(parsed) != num_respuestas:
+        raise ValueError(f"Se esperaban {num_respuestas} respuestas y llegaron {len(parsed)}")
+
+    cumplimientos = []
+    for obj in parsed:
+        cumple = obj.get("cumple", [])
+        if len(cumple) != num_restricciones:
+            raise ValueError(f"Se esperaban {num_restricciones} valores en \"cumple\" y llegaron {len(cumple)}")
+        # Convertir cada "sí"/"no" en bool
+        cumplimientos.append(["sí" in str(estado).lower() for estado in cumple])
+
+    return np.array(cumplimientos, dtype=bool).reshape(num_respuestas, num_restricciones)
+
 def extraer_respuestas_crudas(texto):
     """
     Extrae manualmente los pares respuesta + cumple de un texto tipo JSON malformado.
@@ -485,3 +654,7 @@ def divide(lista, n):
     primera_parte = lista[:n]
     resto = lista[n:]
     return primera_parte, resto
+
+def _mark(trace, event):
+    """Anota en `trace` el instante de `event`, en milisegundos desde que llegó la expectativa."""
+    trace[event] = (time.perf_counter() - trace["start"]) * 1000
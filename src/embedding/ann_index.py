@@ -0,0 +1,162 @@
+import time
+import numpy as np
+from embedding.vector_store import normalize_rows, top_k_indices
+from embedding.segment_log import appended_segments
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iters: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    K-means sobre la esfera unidad: asigna cada vector al centroide de mayor similitud
+    coseno y recalcula los centroides como la media normalizada de su grupo.
+    Args:
+        vectors (np.ndarray): Matriz (N x d) de vectores normalizados.
+        k (int): Cantidad de centroides.
+        iters (int): Iteraciones de Lloyd.
+        seed (int): Semilla del generador aleatorio.
+    Returns:
+        np.ndarray: Matriz (k x d) de centroides normalizados.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=k)
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            # Re-sembrar los grupos vacíos con vectores aleatorios
+            sums[empty] = vectors[rng.choice(len(vectors), size=len(empty), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+class IVFIndex:
+    """
+    Índice aproximado de vecinos más cercanos de tipo IVF (inverted file).
+
+    Los vectores del repositorio se agrupan con k-means en `nlist` listas. Una consulta
+    sólo compara contra los vectores de las `nprobe` listas cuyos centroides son más
+    similares, en lugar de contra todo el repositorio. Subir `nprobe` mejora el recall a
+    costa de latencia; con `nprobe == nlist` la búsqueda es exacta.
+
+    Envuelve un repositorio (`VectorStore` o `SegmentLog`) y expone su misma interfaz de
+    búsqueda, así que `retrieve` puede usarlo sin cambios.
+
+    Atributos:
+        store: Repositorio vectorial indexado.
+        nlist (int): Cantidad de listas (centroides).
+        nprobe (int): Listas visitadas por consulta.
+    """
+
+    def __init__(self, store, nlist: int = None, nprobe: int = 8, iters: int = 20, seed: int = 0, train_size: int = 64):
+        self.store = store
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iters = iters
+        self.seed = seed
+        self.train_size = train_size
+        self.centroids = None
+        self.list_offsets = None
+        self.list_ids = None
+        self.assignments = None
+        self.segment_names = []
+        self.build()
+
+    def build(self):
+        """Entrena los centroides con una muestra del repositorio y asigna todos los vectores."""
+        start = time.perf_counter()
+        self.segment_names = list(getattr(self.store, "segment_names", ()))
+        vectors = np.asarray(self.store.vectors)
+        n = len(vectors)
+        if n == 0:
+            self.centroids = np.zeros((0, 0), dtype=np.float32)
+            self._set_assignments(np.empty(0, dtype=np.int64))
+            return
+        nlist = min(self.nlist or max(1, int(np.sqrt(n))), n)
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(n, nlist * self.train_size)
+        sample = vectors[np.sort(rng.choice(n, size=sample_size, replace=False))]
+        self.centroids = spherical_kmeans(sample, nlist, self.iters, self.seed)
+        self._set_assignments(self._assign(vectors))
+        print(f"[IVFIndex] {n} vectores en {nlist} listas ({time.perf_counter() - start:.2f}s)")
+
+    def _assign(self, vectors: np.ndarray, block: int = 8192) -> np.ndarray:
+        assign = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), block):
+            part = np.asarray(vectors[start:start + block])
+            assign[start:start + block] = np.argmax(part @ self.centroids.T, axis=1)
+        return assign
+
+    def _set_assignments(self, assignments: np.ndarray):
+        """Construye las listas invertidas en formato CSR (offsets + ids ordenados por lista)."""
+        self.assignments = assignments
+        nlist = len(self.centroids)
+        self.list_ids = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=nlist)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def refresh(self) -> bool:
+        """
+        Propaga `refresh` al repositorio. Si sólo se añadieron segmentos al final, sus vectores
+        se asignan a su centroide más cercano; si el repositorio se reconstruyó o se compactó
+        (cambian los segmentos ya indexados), se reentrena el índice.
+        """
+        refresh = getattr(self.store, "refresh", None)
+        if refresh is None or not refresh():
+            return False
+        n_old = len(self.assignments)
+        if n_old > 0 and appended_segments(self.segment_names, self.store):
+            tail = np.asarray(self.store.vectors[n_old:len(self.store)])
+            self._set_assignments(np.concatenate([self.assignments, self._assign(tail)]))
+            self.segment_names = list(self.store.segment_names)
+        else:
+            self.build()
+        return True
+
+    def __len__(self):
+        return len(self.store)
+
+    def chunk(self, i: int) -> str:
+        return self.store.chunk(i)
+
+    def source(self, i: int) -> str:
+        return self.store.source(i)
+
+    def sources_of(self, i: int) -> list[str]:
+        return self.store.sources_of(i)
+
+    @property
+    def vectors(self):
+        return self.store.vectors
+
+    def rows(self, indices) -> np.ndarray:
+        return self.store.rows(indices)
+
+    def search(self, query_vectors: np.ndarray, top_k: int = 5, nprobe: int = None):
+        """
+        Busca los `top_k` vecinos aproximados de cada consulta.
+        Args:
+            query_vectors (np.ndarray): Matriz (consultas x d) de embeddings.
+            top_k (int): Resultados por consulta.
+            nprobe (int): Listas a visitar (por defecto `self.nprobe`).
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Índices y similitudes (consultas x k), de mayor a menor.
+                                           Si hay menos candidatos que `top_k`, se rellena con -1.
+        """
+        queries = normalize_rows(query_vectors)
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        indices = np.full((len(queries), top_k), -1, dtype=np.int64)
+        scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        if nprobe == 0:
+            return indices, scores
+
+        probes = top_k_indices(queries @ self.centroids.T, nprobe)
+        for q, lists in enumerate(probes):
+            candidates = np.concatenate([self.list_ids[self.list_offsets[l]:self.list_offsets[l + 1]] for l in lists])
+            if len(candidates) == 0:
+                continue
+            candidates.sort()
+            cand_scores = self.store.rows(candidates) @ queries[q]
+            best = top_k_indices(cand_scores[None, :], top_k)[0]
+            indices[q, :len(best)] = candidates[best]
+            scores[q, :len(best)] = cand_scores[best]
+        return indices, scores
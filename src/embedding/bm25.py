@@ -0,0 +1,314 @@
+import json
+import os
+import re
+import shutil
+import time
+import unicodedata
+import uuid
+from pathlib import Path
+import numpy as np
+from embedding.vector_store import top_k_indices
+
+BM25_DIR = "bm25"
+POSTINGS_FILE = "postings.npz"
+VOCAB_FILE = "vocab.json"
+BM25_META_FILE = "meta.json"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str) -> list[str]:
+    """
+    Divide un texto en términos para BM25: minúsculas, sin tildes y separando por
+    caracteres no alfanuméricos ("Lustau Jarana Fino" -> ["lustau", "jarana", "fino"]).
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _TOKEN_RE.findall(text)
+
+def _publish_dir(tmp: Path, path: Path):
+    """
+    Sustituye la carpeta `path` por `tmp`, ya escrita por completo. Un lector nunca ve
+    archivos de dos versiones mezclados: ve la carpeta anterior, la nueva o ninguna (y
+    entonces reconstruye).
+    """
+    old = path.with_name(f".{path.name}.old-{uuid.uuid4().hex}")
+    try:
+        os.replace(path, old)
+    except FileNotFoundError:
+        old = None
+    os.replace(tmp, path)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+def _temp_dir(path: Path) -> Path:
+    tmp = path.with_name(f".{path.name}.tmp-{uuid.uuid4().hex}")
+    tmp.mkdir(parents=True)
+    return tmp
+
+class SegmentPostings:
+    """
+    Términos de los chunks de un segmento, sin pesos: vocabulario local y, por cada
+    aparición, (término, chunk, frecuencia). Los pesos BM25 dependen de estadísticas de
+    todo el repositorio (idf, longitud media), así que se calculan al unir los segmentos;
+    lo caro (tokenizar los textos) se hace una sola vez por segmento. Como los segmentos
+    son inmutables, sus términos se guardan en disco y no se vuelven a escribir.
+    """
+
+    def __init__(self, terms, term_ids, doc_ids, tfs, doc_len):
+        self.terms = list(terms)
+        self.term_ids = np.asarray(term_ids, dtype=np.int32)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        self.tfs = np.asarray(tfs, dtype=np.float32)
+        self.doc_len = np.asarray(doc_len, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    @classmethod
+    def build(cls, store) -> "SegmentPostings":
+        """Tokeniza los chunks de `store` (cualquier objeto con `chunk` y `__len__`)."""
+        n = len(store)
+        vocab = {}
+        term_ids, doc_ids, tfs = [], [], []
+        doc_len = np.zeros(n, dtype=np.float32)
+        for i in range(n):
+            tokens = tokenize(store.chunk(i))
+            doc_len[i] = len(tokens)
+            counts = {}
+            for token in tokens:
+                tid = vocab.setdefault(token, len(vocab))
+                counts[tid] = counts.get(tid, 0) + 1
+            term_ids.extend(counts)
+            doc_ids.extend([i] * len(counts))
+            tfs.extend(counts.values())
+        return cls(vocab, term_ids, doc_ids, tfs, doc_len)
+
+    def save(self, path):
+        """Escribe los términos en una carpeta temporal y la publica en `path` de una vez."""
+        path = Path(path)
+        tmp = _temp_dir(path)
+        np.savez(tmp / POSTINGS_FILE, term_ids=self.term_ids, doc_ids=self.doc_ids, tfs=self.tfs, doc_len=self.doc_len)
+        with open(tmp / VOCAB_FILE, "w", encoding="utf-8") as f:
+            json.dump(self.terms, f, ensure_ascii=False)
+        _publish_dir(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> "SegmentPostings":
+        path = Path(path)
+        with open(path / VOCAB_FILE, "r", encoding="utf-8") as f:
+            terms = json.load(f)
+        with np.load(path / POSTINGS_FILE) as postings:
+            return cls(terms, postings["term_ids"], postings["doc_ids"], postings["tfs"], postings["doc_len"])
+
+class BM25Index:
+    """
+    Índice léxico BM25 sobre los mismos chunks del repositorio vectorial.
+
+    Los embeddings densos captan bien el significado pero mal los nombres propios
+    (cócteles, marcas de licores); BM25 premia exactamente esas coincidencias literales.
+
+    Las listas invertidas se guardan en formato CSR: `offsets[t]:offsets[t + 1]` delimita,
+    dentro de `doc_ids` y `weights`, los chunks que contienen el término `t`. El peso BM25
+    de cada aparición se calcula al construir el índice, así que una consulta sólo suma
+    pesos precalculados.
+
+    Sobre un `SegmentLog` el índice se arma con los términos de cada segmento
+    (`SegmentPostings`): tras añadir un documento sólo se tokeniza el segmento nuevo y
+    se recalculan los pesos con numpy.
+
+    Atributos:
+        k1 (float): Saturación de la frecuencia del término.
+        b (float): Normalización por longitud del chunk.
+        vocab (dict[str, int]): Término -> identificador.
+        num_docs (int): Cantidad de chunks indexados.
+        key (dict): Identifica el estado del repositorio del que se construyó (cantidad de
+                    chunks y generación), para saber si el índice persistido sigue vigente.
+        segments (dict[str, SegmentPostings]): Términos de cada segmento usado, para
+                                               reutilizarlos en la próxima generación.
+        tokenized (int): Segmentos que hubo que tokenizar al construirlo.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.num_docs = 0
+        self.key = {}
+        self.segments = {}
+        self.tokenized = 0
+
+    @staticmethod
+    def store_key(store) -> dict:
+        return {"count": len(store), "generation": getattr(store, "generation", None)}
+
+    @classmethod
+    def build(cls, store, k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """
+        Construye el índice a partir de los chunks de `store` (`VectorStore`, `SegmentLog`
+        o cualquier índice que exponga `chunk` y `__len__`).
+        """
+        start = time.perf_counter()
+        index = cls.from_postings([SegmentPostings.build(store)], k1, b)
+        index.tokenized = 1
+        index.key = cls.store_key(store)
+        print(f"[BM25Index] {index.num_docs} chunks, {len(index.vocab)} términos, {len(index.doc_ids)} postings "
+              f"({time.perf_counter() - start:.2f}s)")
+        return index
+
+    @classmethod
+    def from_postings(cls, parts, k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """Une los términos de varios segmentos (en orden) y calcula los pesos BM25."""
+        index = cls(k1, b)
+        vocab = {}
+        term_ids, doc_ids, tfs, doc_len = [], [], [], []
+        offset = 0
+        for part in parts:
+            mapping = np.array([vocab.setdefault(term, len(vocab)) for term in part.terms], dtype=np.int64)
+            term_ids.append(mapping[part.term_ids] if len(part.term_ids) else np.zeros(0, dtype=np.int64))
+            doc_ids.append(part.doc_ids.astype(np.int32) + offset)
+            tfs.append(part.tfs)
+            doc_len.append(part.doc_len)
+            offset += len(part)
+
+        n = offset
+        term_ids = np.concatenate(term_ids) if term_ids else np.zeros(0, dtype=np.int64)
+        doc_ids = np.concatenate(doc_ids) if doc_ids else np.zeros(0, dtype=np.int32)
+        tfs = np.concatenate(tfs) if tfs else np.zeros(0, dtype=np.float32)
+        doc_len = np.concatenate(doc_len) if doc_len else np.zeros(0, dtype=np.float32)
+        order = np.argsort(term_ids, kind="stable")
+        term_ids, doc_ids, tfs = term_ids[order], doc_ids[order], tfs[order]
+
+        df = np.bincount(term_ids, minlength=len(vocab)).astype(np.float32)
+        idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+        avgdl = doc_len.mean() if n else 1.0
+        norm = k1 * (1 - b + b * doc_len[doc_ids] / max(avgdl, 1e-9))
+
+        index.vocab = vocab
+        index.offsets = np.concatenate([[0], np.cumsum(df, dtype=np.int64)])
+        index.doc_ids = doc_ids
+        index.weights = (idf[term_ids] * tfs * (k1 + 1) / (tfs + norm)).astype(np.float32)
+        index.num_docs = n
+        return index
+
+    # ==== Persistencia ====
+
+    def save(self, path):
+        """Guarda el índice en la carpeta `path`, sustituyéndola entera de una vez."""
+        path = Path(path)
+        tmp = _temp_dir(path)
+        np.savez(tmp / POSTINGS_FILE, offsets=self.offsets, doc_ids=self.doc_ids, weights=self.weights)
+        with open(tmp / VOCAB_FILE, "w", encoding="utf-8") as f:
+            json.dump(list(self.vocab), f, ensure_ascii=False)
+        with open(tmp / BM25_META_FILE, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "num_docs": self.num_docs, "key": self.key}, f)
+        _publish_dir(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> "BM25Index":
+        path = Path(path)
+        with open(path / BM25_META_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(path / VOCAB_FILE, "r", encoding="utf-8") as f:
+            terms = json.load(f)
+        index = cls(meta["k1"], meta["b"])
+        with np.load(path / POSTINGS_FILE) as postings:
+            index.offsets = postings["offsets"]
+            index.doc_ids = postings["doc_ids"]
+            index.weights = postings["weights"]
+        index.vocab = {term: i for i, term in enumerate(terms)}
+        index.num_docs = meta["num_docs"]
+        index.key = meta["key"]
+        return index
+
+    @classmethod
+    def for_store(cls, store, path=None, previous=None) -> "BM25Index":
+        """
+        Índice BM25 del estado actual de `store`.
+
+        Sobre un `SegmentLog` reutiliza los términos de cada segmento: los de `previous`
+        (el índice de la generación anterior), los guardados en `path/<segmento>` o, si no
+        hay, tokeniza el segmento y los guarda; después une todos los segmentos. Para
+        otros repositorios carga el índice persistido en `path` si corresponde al estado
+        actual de `store`; si no existe o quedó desactualizado, lo reconstruye y lo guarda.
+        """
+        if hasattr(store, "segment_names"):
+            return cls._for_segments(store, path, previous)
+        if path and (Path(path) / BM25_META_FILE).exists():
+            try:
+                index = cls.load(path)
+                if index.key == cls.store_key(store):
+                    return index
+            except Exception as e:
+                print(f"[BM25Index] No se pudo cargar {path}: {e}")
+        index = cls.build(store)
+        if path:
+            index.save(path)
+        return index
+
+    @classmethod
+    def _for_segments(cls, log, path=None, previous=None) -> "BM25Index":
+        start = time.perf_counter()
+        known = previous.segments if previous is not None else {}
+        segments, tokenized = {}, 0
+        for name in log.segment_names:
+            segment = log.segment(name)
+            postings = known.get(name)
+            if postings is None and path and (Path(path) / name).exists():
+                try:
+                    postings = SegmentPostings.load(Path(path) / name)
+                except Exception as e:
+                    print(f"[BM25Index] No se pudo cargar {Path(path) / name}: {e}")
+            if postings is None or len(postings) != len(segment):
+                postings = SegmentPostings.build(segment)
+                tokenized += 1
+                if path:
+                    postings.save(Path(path) / name)
+            segments[name] = postings
+
+        index = cls.from_postings([segments[name] for name in log.segment_names])
+        index.segments = segments
+        index.tokenized = tokenized
+        index.key = cls.store_key(log)
+        if path:
+            # Los segmentos fusionados por una compactación ya no existen en el repositorio
+            for entry in Path(path).glob("seg_*"):
+                if not (log.path / entry.name).exists():
+                    shutil.rmtree(entry, ignore_errors=True)
+        print(f"[BM25Index] {index.num_docs} chunks en {len(segments)} segmento(s), {tokenized} tokenizado(s), "
+              f"{len(index.vocab)} términos ({time.perf_counter() - start:.2f}s)")
+        return index
+
+    # ==== Búsqueda ====
+
+    def scores(self, query: str) -> np.ndarray:
+        """Puntuación BM25 de `query` contra todos los chunks."""
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for token in set(tokenize(query)):
+            tid = self.vocab.get(token)
+            if tid is None:
+                continue
+            a, b = self.offsets[tid], self.offsets[tid + 1]
+            # Cada chunk aparece una sola vez por término, así que no hay índices repetidos
+            scores[self.doc_ids[a:b]] += self.weights[a:b]
+        return scores
+
+    def search(self, queries: list[str], top_k: int = 5):
+        """
+        Busca los `top_k` chunks con mayor puntuación BM25 para cada consulta.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Índices y puntuaciones (consultas x k), de mayor
+                                           a menor. Los chunks sin ningún término en común se
+                                           descartan y su hueco se rellena con -1.
+        """
+        indices = np.full((len(queries), top_k), -1, dtype=np.int64)
+        scores = np.zeros((len(queries), top_k), dtype=np.float32)
+        for q, query in enumerate(queries):
+            query_scores = self.scores(query)
+            best = top_k_indices(query_scores[None, :], top_k)[0]
+            best = best[query_scores[best] > 0]
+            indices[q, :len(best)] = best
+            scores[q, :len(best)] = query_scores[best]
+        return indices, scores
@@ -0,0 +1,134 @@
+import hashlib
+import numpy as np
+from embedding.embedding_cache import normalize_key
+
+_BIT_SHIFTS = np.arange(64, dtype=np.uint64)
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    Huella SimHash de 64 bits calculada sobre los shingles de `shingle_size` palabras.
+    Textos casi iguales producen huellas con muy pocos bits distintos.
+    """
+    words = normalize_key(text).split()
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+    hashes = np.array([_hash64(s) for s in shingles], dtype=np.uint64)
+    bits = ((hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)).astype(np.int32)
+    votes = (2 * bits - 1).sum(axis=0)
+    return int(np.sum((votes > 0).astype(np.uint64) << _BIT_SHIFTS))
+
+class ChunkDeduplicator:
+    """
+    Elimina chunks repetidos al indexar.
+
+    - Duplicados exactos: se detectan con un hash del texto normalizado.
+    - Casi duplicados: se comparan huellas SimHash; dos chunks con a lo sumo `max_distance`
+      bits distintos se consideran el mismo. Para no comparar contra todo el índice, la
+      huella se parte en `max_distance + 1` bandas: por el principio del palomar, dos
+      huellas a esa distancia coinciden exactamente en al menos una banda.
+
+    Cada chunk descartado se asocia al chunk conservado que lo representa, y se recuerdan
+    todos los archivos de origen de ese grupo.
+
+    Atributos:
+        sources (list[list[str]]): Archivos de origen de cada chunk conservado (el primero
+                                   es el del propio chunk).
+        total (int): Chunks vistos.
+        exact_duplicates (int): Chunks descartados por ser idénticos a otro.
+        near_duplicates (int): Chunks descartados por ser casi idénticos a otro.
+    """
+
+    def __init__(self, detect_near: bool = True, max_distance: int = 3, shingle_size: int = 3):
+        self.detect_near = detect_near
+        self.max_distance = max_distance
+        self.shingle_size = shingle_size
+        self.num_bands = max_distance + 1
+        self.band_bits = 64 // self.num_bands
+        self._exact = {}
+        self._fingerprints = []
+        self._bands = [dict() for _ in range(self.num_bands)]
+        self.sources = []
+        self.total = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def _band_keys(self, fingerprint: int):
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (b * self.band_bits)) & mask for b in range(self.num_bands)]
+
+    def _find_near(self, fingerprint: int):
+        seen = set()
+        for band, key in zip(self._bands, self._band_keys(fingerprint)):
+            for cid in band.get(key, ()):
+                if cid in seen:
+                    continue
+                seen.add(cid)
+                if bin(self._fingerprints[cid] ^ fingerprint).count("1") <= self.max_distance:
+                    return cid
+        return None
+
+    def add(self, chunk: str, source: str) -> tuple[int, bool]:
+        """
+        Registra un chunk.
+        Args:
+            chunk (str): Texto del chunk.
+            source (str): Archivo del que proviene.
+        Returns:
+            tuple[int, bool]: Identificador del chunk conservado que lo representa y si
+                              el chunk es nuevo (True) o colapsa en uno existente (False).
+        """
+        self.total += 1
+        key = hashlib.sha1(normalize_key(chunk).encode("utf-8")).digest()
+        cid = self._exact.get(key)
+        if cid is not None:
+            self.exact_duplicates += 1
+            self._add_source(cid, source)
+            return cid, False
+
+        fingerprint = simhash(chunk, self.shingle_size) if self.detect_near else 0
+        if self.detect_near:
+            cid = self._find_near(fingerprint)
+            if cid is not None:
+                self.near_duplicates += 1
+                self._exact[key] = cid
+                self._add_source(cid, source)
+                return cid, False
+
+        cid = len(self.sources)
+        self._exact[key] = cid
+        self._fingerprints.append(fingerprint)
+        if self.detect_near:
+            for band, band_key in zip(self._bands, self._band_keys(fingerprint)):
+                band.setdefault(band_key, []).append(cid)
+        self.sources.append([source])
+        return cid, True
+
+    def _add_source(self, cid: int, source: str):
+        if source not in self.sources[cid]:
+            self.sources[cid].append(source)
+
+    def aliases(self) -> dict[int, list[str]]:
+        """Fuentes adicionales (además de la propia) de cada chunk que absorbió duplicados."""
+        return {cid: srcs[1:] for cid, srcs in enumerate(self.sources) if len(srcs) > 1}
+
+    def stats(self) -> dict:
+        kept = len(self.sources)
+        return {
+            "total": self.total,
+            "kept": kept,
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+            "reduction": 1 - kept / self.total if self.total else 0.0,
+        }
+
+    def report(self):
+        """Imprime las estadísticas de reducción del índice."""
+        s = self.stats()
+        print(f"🧹 Deduplicación: {s['total']} chunks → {s['kept']} conservados "
+              f"({s['exact_duplicates']} exactos, {s['near_duplicates']} casi duplicados, "
+              f"reducción {s['reduction']:.1%})")
@@ -1,20 +1,53 @@
 import json
+import os
+import shutil
+import threading
+import time
 import requests
 import pickle
+import numpy as np
 from pathlib import Path
 from typing import List
-from sentence_transformers import SentenceTransformer
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from embedding.vector_store import VectorStore, VectorStoreWriter
+from embedding.segment_log import SegmentLog
+from embedding.embedding_cache import EmbeddingCache
+from embedding.dedup import ChunkDeduplicator
 
 # ==== Configuración ====
 # model_path = "C:/Users/ASUS/.cache/huggingface/hub/models--sentence-transformers--all-MiniLM-L6-v2/snapshots/c9745ed1d9f207416be6d2e6f8de32d1f16199bf"
 # model = SentenceTransformer(model_path)
-model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+
+# El modelo (y torch) se cargan en el primer uso, no al importar este módulo
+_model = None
+_model_lock = threading.Lock()
 
 DATA_DIR = Path("src/data")
-OUTPUT_FILE = Path("src/embedding/embeddings.pkl")
+STORE_DIR = Path("src/embedding/store")
+LEGACY_FILE = Path("src/embedding/embeddings.pkl")
+QUERY_CACHE_SIZE = 4096
+QUERY_CACHE_FILE = Path("src/embedding/query_cache.pkl")  # None desactiva la persistencia
+
+query_cache = EmbeddingCache(QUERY_CACHE_SIZE, QUERY_CACHE_FILE)
 
 # ==== Funciones ====
 
+def get_model():
+    """
+    Devuelve el modelo de embeddings, construyéndolo la primera vez que se pide.
+    Es seguro llamarla desde varios hilos: el modelo se construye una sola vez.
+    Returns:
+        SentenceTransformer: Modelo sentence-transformers/all-MiniLM-L6-v2.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(MODEL_NAME)
+    return _model
+
 def sliding_window_chunk(text: str, window_size: int = 100, stride: int = 60) -> List[str]:
     """
     Convierte el texto recibido en chunks(pedazos solapados de texto) 
@@ -37,19 +70,50 @@ def sliding_window_chunk(text: str, window_size: int = 100, stride: int = 60) ->
 
 def get_embedding(text:str):
     """ Computa un embedding para un texto dado utilizando el modelo sentence-transformers/all-MiniLM-L6-v2.
+    Los embeddings de consultas se guardan en `query_cache`.
     Args:
         text (str): Texto para el cual se desea generar un embedding.
     Returns:
         list: Embedding del texto dado.
     """
 
+    vector = query_cache.get(text)
+    if vector is not None:
+        return vector
     try:
-        vector = model.encode(text)
+        vector = get_model().encode(text)
+        query_cache.put(text, vector)
         return vector
     except requests.exceptions.RequestException as e:
         print(f"Error al obtener el embedding: {e}")
         return None
 
+def get_embeddings(texts: List[str]):
+    """ Computa los embeddings de varios textos en una única llamada al modelo.
+    Los textos que ya están en `query_cache` no se vuelven a codificar.
+    Args:
+        texts (List[str]): Textos para los cuales se desea generar un embedding.
+    Returns:
+        np.ndarray: Matriz con un embedding por fila, o None si ocurre un error.
+    """
+
+    vectors = [query_cache.get(text) for text in texts]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        try:
+            encoded = get_model().encode([texts[i] for i in missing])
+        except requests.exceptions.RequestException as e:
+            print(f"Error al obtener los embeddings: {e}")
+            return None
+        for i, vector in zip(missing, encoded):
+            vectors[i] = vector
+            query_cache.put(texts[i], vector)
+    return np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+def query_cache_stats() -> dict:
+    """Aciertos, fallos y tamaño de la caché de embeddings de consultas."""
+    return query_cache.stats()
+
 def preprocess_document(json_file: Path) -> str:
     """
     Recopila el contenido del json en un str
@@ -80,47 +144,237 @@ def preprocess_document(json_file: Path) -> str:
         print(f"❌ Error leyendo {json_file.name}: {e}")
         return ""
 
-def embed_all_documents():
-    """
-    Carga todos los documentos en data y genera el embedding
-    """
-    embeddings = []
-    for file in DATA_DIR.glob("*.json"):
-        print(f"📄 Procesando: {file.name}")
-        full_text = preprocess_document(file)
-        chunks = sliding_window_chunk(full_text)
-        for chunk in chunks:
-            vector = get_embedding(chunk)
-            if vector.any():
-                embeddings.append({
-                    "source": file.name,
-                    "chunk": chunk,
-                    "embedding": vector
-                })
-    with open(OUTPUT_FILE, "wb") as f:
-        pickle.dump(embeddings, f)
-    print(f"✅ Embeddings guardados en: {OUTPUT_FILE}")
+def read_and_chunk(json_file: Path) -> tuple[str, List[str]]:
+    """
+    Lee un documento y lo divide en chunks.
+    Args:
+        json_file (Path): Dirección del documento
+    Returns:
+        tuple[str, List[str]]: Nombre del archivo y sus chunks
+    """
+    return json_file.name, sliding_window_chunk(preprocess_document(json_file))
+
+def encode_chunks(chunks: List[str], encode_batch_size: int = 64) -> np.ndarray:
+    """
+    Codifica un lote de chunks con una sola llamada al modelo, aprovechando su batching interno.
+    Args:
+        chunks (List[str]): Textos a codificar
+        encode_batch_size (int): Tamaño de lote interno de `model.encode`
+    Returns:
+        np.ndarray: Matriz con un embedding por chunk
+    """
+    return get_model().encode(chunks, batch_size=encode_batch_size, convert_to_numpy=True)
+
+def embed_files(files: List[Path], writer, batch_size: int = 256, encode_batch_size: int = 64, read_workers: int = 8, label: str = "", dedup: ChunkDeduplicator = None) -> int:
+    """
+    Pipeline de indexado en streaming: lee y divide los archivos con un pool de hilos,
+    acumula los chunks en lotes de `batch_size`, los codifica con `model.encode` y escribe
+    cada lote en `writer` en cuanto está listo. El orden de los chunks es el de `files`.
+
+    Con `dedup`, los chunks repetidos (o casi repetidos) se descartan antes de pasar por el
+    modelo y sus archivos se guardan como fuentes alternativas del chunk conservado.
+
+    Args:
+        files (List[Path]): Documentos a indexar
+        writer (VectorStoreWriter): Destino de los embeddings
+        batch_size (int): Cantidad de chunks acumulados por llamada al modelo
+        encode_batch_size (int): Tamaño de lote interno de `model.encode`
+        read_workers (int): Hilos dedicados a leer y dividir documentos
+        label (str): Prefijo para los mensajes de progreso
+        dedup (ChunkDeduplicator): Deduplicador de chunks (None lo desactiva)
+    Returns:
+        int: Cantidad de chunks escritos
+    """
+    pending_chunks, pending_sources, pending_ids = [], [], []
+    rows = {}  # chunk conservado por el deduplicador -> fila del repositorio
+    written = 0
+    files_done = 0
+    start = time.perf_counter()
+
+    def flush(n):
+        nonlocal written
+        batch_chunks, batch_sources, batch_ids = pending_chunks[:n], pending_sources[:n], pending_ids[:n]
+        del pending_chunks[:n], pending_sources[:n], pending_ids[:n]
+        vectors = encode_chunks(batch_chunks, encode_batch_size)
+        keep = np.flatnonzero(np.any(vectors != 0, axis=1))
+        for row, i in enumerate(keep):
+            rows[batch_ids[i]] = writer.count + row
+        writer.add(vectors[keep], [batch_chunks[i] for i in keep], [batch_sources[i] for i in keep])
+        written += len(keep)
+        elapsed = time.perf_counter() - start
+        print(f"⏳ {label}{files_done}/{len(files)} archivos | {written} chunks | {written / elapsed:.1f} chunks/s")
+
+    with ThreadPoolExecutor(max_workers=read_workers) as pool:
+        # map conserva el orden de los archivos aunque se lean en paralelo
+        for name, chunks in pool.map(read_and_chunk, files):
+            files_done += 1
+            for chunk in chunks:
+                cid, is_new = dedup.add(chunk, name) if dedup else (None, True)
+                if is_new:
+                    pending_chunks.append(chunk)
+                    pending_sources.append(name)
+                    pending_ids.append(cid)
+            while len(pending_chunks) >= batch_size:
+                flush(batch_size)
+        if pending_chunks:
+            flush(len(pending_chunks))
+
+    if dedup:
+        for cid, row in rows.items():
+            writer.add_aliases(row, dedup.sources[cid][1:])
+    return written
+
+def _init_worker(threads_per_worker: int):
+    """
+    Inicializa un proceso de indexado: limita los hilos de torch para no sobresuscribir
+    la CPU y carga la copia del modelo propia de este proceso.
+    """
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+    get_model()
+
+def _embed_shard(shard_id: int, files: List[str], shard_dir: str, batch_size: int, encode_batch_size: int, read_workers: int) -> tuple[int, int, float]:
+    """
+    Indexa un fragmento disjunto del corpus dentro de un proceso trabajador.
+    Cada proceso usa su propia copia del modelo y escribe su propio repositorio temporal.
+    Returns:
+        tuple[int, int, float]: Identificador del fragmento, chunks escritos y segundos empleados.
+    """
+    start = time.perf_counter()
+    with VectorStoreWriter(shard_dir) as writer:
+        written = embed_files([Path(f) for f in files], writer, batch_size, encode_batch_size, read_workers, label=f"[shard {shard_id}] ")
+    return shard_id, written, time.perf_counter() - start
+
+def embed_sharded(files: List[Path], writer, workers: int, batch_size: int = 256, encode_batch_size: int = 64, read_workers: int = 2, dedup: ChunkDeduplicator = None) -> int:
+    """
+    Reparte los archivos en `workers` fragmentos contiguos, los indexa en procesos
+    separados y fusiona los resultados en `writer` en el orden de los fragmentos, de modo
+    que el repositorio final es idéntico al que produciría un único proceso.
+
+    La deduplicación se aplica al fusionar, en ese mismo orden, para que el chunk
+    conservado de cada grupo sea el mismo que en el indexado de un solo proceso.
+
+    Args:
+        files (List[Path]): Documentos a indexar (ya ordenados)
+        writer (VectorStoreWriter): Destino de los embeddings fusionados
+        workers (int): Cantidad de procesos
+        dedup (ChunkDeduplicator): Deduplicador de chunks (None lo desactiva)
+    Returns:
+        int: Cantidad de chunks escritos
+    """
+    shards = [list(map(str, shard)) for shard in np.array_split(np.array(files, dtype=object), workers) if len(shard)]
+    shards_dir = writer.path.with_name(writer.path.name + "_shards")
+    shutil.rmtree(shards_dir, ignore_errors=True)
+    threads = max(1, (os.cpu_count() or 1) // len(shards))
+
+    try:
+        with ProcessPoolExecutor(max_workers=len(shards), initializer=_init_worker, initargs=(threads,)) as pool:
+            futures = [
+                pool.submit(_embed_shard, i, shard, str(shards_dir / f"shard_{i:03d}"), batch_size, encode_batch_size, read_workers)
+                for i, shard in enumerate(shards)
+            ]
+            for future in as_completed(futures):
+                shard_id, written, elapsed = future.result()
+                print(f"🧩 Shard {shard_id} terminado: {written} chunks en {elapsed:.1f}s")
+
+        total = 0
+        rows = {}
+        for i in range(len(shards)):
+            store = VectorStore.open(shards_dir / f"shard_{i:03d}")
+            if dedup is None:
+                writer.add_store(store)
+                total += len(store)
+                continue
+            keep = []
+            for j in range(len(store)):
+                cid, is_new = dedup.add(store.chunk(j), store.source(j))
+                if is_new:
+                    rows[cid] = writer.count + len(keep)
+                    keep.append(j)
+            writer.add(store.rows(keep), [store.chunk(j) for j in keep], [store.source(j) for j in keep], normalized=True)
+            total += len(keep)
+            del store
+        for cid, row in rows.items():
+            writer.add_aliases(row, dedup.sources[cid][1:])
+        return total
+    finally:
+        shutil.rmtree(shards_dir, ignore_errors=True)
+
+def embed_all_documents(batch_size: int = 256, encode_batch_size: int = 64, read_workers: int = 8, workers: int = 1, files: List[Path] = None, store_dir: Path = None, dedup: bool = True):
+    """
+    Carga todos los documentos en data y genera el embedding.
+    El resultado sustituye a todos los segmentos previos del repositorio.
+
+    Args:
+        batch_size (int): Cantidad de chunks acumulados por llamada al modelo
+        encode_batch_size (int): Tamaño de lote interno de `model.encode`
+        read_workers (int): Hilos dedicados a leer y dividir documentos
+        workers (int): Procesos de indexado; con más de uno cada proceso carga su propio
+                       modelo y procesa un fragmento disjunto del corpus
+        files (List[Path]): Documentos a indexar (por defecto, todos los de `DATA_DIR`)
+        store_dir (Path): Carpeta del repositorio (por defecto, `STORE_DIR`)
+        dedup (bool): Descartar chunks duplicados y casi duplicados
+    Returns:
+        int: Cantidad de chunks indexados
+    """
+    files = sorted(files if files is not None else DATA_DIR.glob("*.json"))
+    store_dir = store_dir or STORE_DIR
+    deduplicator = ChunkDeduplicator() if dedup else None
+    start = time.perf_counter()
+    log = SegmentLog.open(store_dir)
+    with log.segment_writer(replace=True) as writer:
+        if workers > 1:
+            total = embed_sharded(files, writer, workers, batch_size, encode_batch_size, max(1, read_workers // workers), dedup=deduplicator)
+        else:
+            total = embed_files(files, writer, batch_size, encode_batch_size, read_workers, dedup=deduplicator)
+    if deduplicator:
+        deduplicator.report()
+    elapsed = time.perf_counter() - start
+    print(f"✅ {total} embeddings de {len(files)} archivos guardados en: {store_dir} "
+          f"({elapsed:.1f}s, {total / elapsed:.1f} chunks/s, {workers} proceso(s))")
+    return total
 
 def embed_new_document(path: Path):
-    """Toma el nuevo documento añadido a la base de datos y lo añade al repositorio vectorial."""
+    """
+    Toma el nuevo documento añadido a la base de datos y lo añade al repositorio vectorial.
+    Sólo se escribe un segmento nuevo con sus chunks; el resto del repositorio no se toca.
+    """
 
-    embeddings = []
     full_text = preprocess_document(path)
     chunks = sliding_window_chunk(full_text)
-    for chunk in chunks:
-        vector = get_embedding(chunk)
-        if vector.any():
-            embeddings.append({
-                "source": path.name,
-                "chunk": chunk,
-                "embedding": vector
-            })
+    if not chunks:
+        return
+
+    vectors = encode_chunks(chunks)
+    keep = np.flatnonzero(np.any(vectors != 0, axis=1))
+    if len(keep):
+        SegmentLog.open(STORE_DIR).append(vectors[keep], [chunks[i] for i in keep], [path.name] * len(keep))
+
+def convert_legacy_pickle(pickle_file: Path = LEGACY_FILE, store_dir: Path = STORE_DIR):
+    """Convierte el antiguo `embeddings.pkl` (lista de diccionarios) al formato columnar."""
 
-    with open(OUTPUT_FILE, 'rb') as f:
-        emb = pickle.load(f)
+    with open(pickle_file, "rb") as f:
+        records = pickle.load(f)
+    store = VectorStore.from_records(records)
+    with SegmentLog.open(store_dir).segment_writer(replace=True) as writer:
+        writer.add_store(store)
+    print(f"✅ {pickle_file} convertido a {store_dir}")
 
-    new_emb = emb + embeddings
+if __name__ == "__main__":
+    # Uso (desde src/): python -m embedding.embedder --workers 4
+    import argparse
 
-    with open(OUTPUT_FILE, 'wb') as f:
-        pickle.dump(new_emb, f)
+    parser = argparse.ArgumentParser(description="Reindexa todos los documentos de src/data.")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos de indexado (cada uno carga su propio modelo)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks acumulados por llamada al modelo")
+    parser.add_argument("--encode-batch-size", type=int, default=64, help="Tamaño de lote interno de model.encode")
+    parser.add_argument("--read-workers", type=int, default=8, help="Hilos de lectura de documentos")
+    parser.add_argument("--no-dedup", action="store_true", help="Conservar los chunks duplicados")
+    args = parser.parse_args()
 
+    ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    os.chdir(ROOT_DIR)
+    embed_all_documents(args.batch_size, args.encode_batch_size, args.read_workers, args.workers, dedup=not args.no_dedup)
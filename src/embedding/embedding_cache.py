@@ -0,0 +1,115 @@
+import atexit
+import os
+import pickle
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+def normalize_key(text: str) -> str:
+    """
+    Normaliza un texto para usarlo como clave de comparación (consultas en la caché,
+    chunks en la deduplicación): forma Unicode NFC, minúsculas y espacios colapsados.
+    """
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+class EmbeddingCache:
+    """
+    Caché LRU acotada de embeddings de consultas.
+
+    Las consultas generadas por el detector de intenciones se repiten mucho, así que se
+    guarda el embedding de cada consulta normalizada para no volver a ejecutar el modelo.
+    Opcionalmente se persiste en disco para conservar los aciertos entre reinicios.
+
+    Atributos:
+        maxsize (int): Cantidad máxima de consultas guardadas.
+        path (Path | None): Archivo de persistencia; None desactiva la persistencia.
+        hits (int): Consultas resueltas desde la caché.
+        misses (int): Consultas que tuvieron que pasar por el modelo.
+    """
+
+    def __init__(self, maxsize: int = 1024, path=None):
+        self.maxsize = maxsize
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loaded = False
+        if self.path:
+            atexit.register(self.save)
+
+    def _ensure_loaded(self):
+        """Carga la caché persistida la primera vez que se usa."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path or not self.path.exists():
+            return
+        try:
+            with open(self.path, "rb") as f:
+                entries = pickle.load(f)
+            for key, vector in entries[-self.maxsize:]:
+                self._entries[key] = vector
+        except Exception as e:
+            print(f"[EmbeddingCache] No se pudo cargar {self.path}: {e}")
+
+    def get(self, text: str):
+        """Devuelve el embedding guardado para `text` o None, actualizando los contadores."""
+        key = normalize_key(text)
+        with self._lock:
+            self._ensure_loaded()
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, text: str, vector):
+        """Guarda el embedding de `text`, descartando la entrada menos usada si hace falta."""
+        key = normalize_key(text)
+        with self._lock:
+            self._ensure_loaded()
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        """Escribe la caché en disco (de menos a más recientemente usada)."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._loaded:
+                return
+            entries = list(self._entries.items())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(entries, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Contadores para dimensionar la caché."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,148 @@
+import numpy as np
+from embedding.vector_store import normalize_rows, top_k_indices
+from embedding.segment_log import appended_segments
+
+SCORE_BLOCK = 1024  # Filas que se convierten a float32 a la vez al puntuar (caben en caché)
+
+class QuantizedIndex:
+    """
+    Búsqueda en dos pasos sobre una copia cuantizada de la matriz de vectores.
+
+    La matriz float32 del repositorio se representa en memoria como int8 (cuantización
+    escalar simétrica con una escala por dimensión) o como float16, lo que reduce 4x o 2x
+    la memoria residente. La primera pasada puntúa todo el repositorio con esa copia y
+    conserva `top_k * rerank_factor` candidatos; la segunda pasada los vuelve a puntuar
+    con los vectores float32 exactos, que se leen del repositorio (mapeado en disco) sólo
+    para esas filas.
+
+    Envuelve un repositorio (`VectorStore` o `SegmentLog`) y expone su misma interfaz de
+    búsqueda, así que `retrieve` puede usarlo sin cambios.
+
+    Atributos:
+        store: Repositorio vectorial con los vectores exactos.
+        dtype (str): "int8" o "float16".
+        rerank_factor (int): Multiplicador de candidatos que pasan a la segunda pasada.
+        codes (np.ndarray): Matriz cuantizada (N x d).
+        scale (np.ndarray): Escala por dimensión (sólo int8).
+        score_block (int): Filas convertidas a float32 a la vez en la primera pasada.
+    """
+
+    def __init__(self, store, dtype: str = "int8", rerank_factor: int = 4, block: int = 16384, score_block: int = SCORE_BLOCK):
+        if dtype not in ("int8", "float16"):
+            raise ValueError(f"Tipo de cuantización no soportado: {dtype}")
+        self.store = store
+        self.dtype = dtype
+        self.rerank_factor = rerank_factor
+        self.block = block
+        self.score_block = score_block
+        self.codes = None
+        self.scale = None
+        self.segment_names = []
+        self.build()
+
+    def _row_blocks(self, start: int, end: int):
+        for a in range(start, end, self.block):
+            yield a, self.store.rows(np.arange(a, min(a + self.block, end)))
+
+    def build(self):
+        """Cuantiza toda la matriz del repositorio, bloque a bloque."""
+        self.segment_names = list(getattr(self.store, "segment_names", ()))
+        n = len(self.store)
+        if self.dtype == "int8":
+            max_abs = None
+            for _, rows in self._row_blocks(0, n):
+                block_max = np.abs(rows).max(axis=0)
+                max_abs = block_max if max_abs is None else np.maximum(max_abs, block_max)
+            if max_abs is not None:
+                max_abs[max_abs == 0] = 1.0
+                self.scale = (max_abs / 127.0).astype(np.float32)
+        self.codes = self._quantize_range(0, n)
+
+    def _quantize_range(self, start: int, end: int) -> np.ndarray:
+        parts = [self._quantize(rows) for _, rows in self._row_blocks(start, end)]
+        if not parts:
+            dim = len(self.scale) if self.scale is not None else 0
+            return np.zeros((0, dim), dtype=self.dtype)
+        return np.concatenate(parts)
+
+    def _quantize(self, rows: np.ndarray) -> np.ndarray:
+        if self.dtype == "float16":
+            return rows.astype(np.float16)
+        return np.clip(np.rint(rows / self.scale), -127, 127).astype(np.int8)
+
+    def refresh(self) -> bool:
+        """
+        Propaga `refresh` al repositorio. Los vectores de los segmentos añadidos al final se
+        cuantizan con la escala existente; si el repositorio se reconstruyó o se compactó
+        (cambian los segmentos ya cuantizados), se vuelve a cuantizar todo.
+        """
+        refresh = getattr(self.store, "refresh", None)
+        if refresh is None or not refresh():
+            return False
+        n_old = len(self.codes)
+        if n_old > 0 and appended_segments(self.segment_names, self.store):
+            self.codes = np.concatenate([self.codes, self._quantize_range(n_old, len(self.store))])
+            self.segment_names = list(self.store.segment_names)
+        else:
+            self.build()
+        return True
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria ocupada por la representación cuantizada."""
+        return self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def __len__(self):
+        return len(self.store)
+
+    def chunk(self, i: int) -> str:
+        return self.store.chunk(i)
+
+    def source(self, i: int) -> str:
+        return self.store.source(i)
+
+    def sources_of(self, i: int) -> list[str]:
+        return self.store.sources_of(i)
+
+    def rows(self, indices) -> np.ndarray:
+        return self.store.rows(indices)
+
+    def approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Similitudes aproximadas (consultas x N) calculadas sobre la matriz cuantizada.
+
+        Los códigos se convierten a float32 de a `score_block` filas sobre un mismo búfer,
+        así que nunca se materializa la matriz completa en float32.
+        """
+        weighted = (queries * self.scale if self.dtype == "int8" else queries).astype(np.float32)
+        scores = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        buffer = np.empty((min(self.score_block, len(self.codes)), self.codes.shape[1]), dtype=np.float32)
+        for a in range(0, len(self.codes), self.score_block):
+            codes = self.codes[a:a + self.score_block]
+            rows = buffer[:len(codes)]
+            rows[...] = codes
+            np.matmul(weighted, rows.T, out=scores[:, a:a + len(codes)])
+        return scores
+
+    def search(self, query_vectors: np.ndarray, top_k: int = 5):
+        """
+        Busca los `top_k` vectores más similares: primera pasada cuantizada y
+        re-puntuación exacta de los mejores candidatos.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Índices y similitudes exactas (consultas x k).
+        """
+        queries = normalize_rows(query_vectors)
+        if len(self.codes) == 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        candidates = top_k_indices(self.approximate_scores(queries), top_k * self.rerank_factor)
+        k = min(top_k, candidates.shape[1])
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        for q, cand in enumerate(candidates):
+            exact = self.store.rows(cand) @ queries[q]
+            best = top_k_indices(exact[None, :], k)[0]
+            indices[q] = cand[best]
+            scores[q] = exact[best]
+        return indices, scores
@@ -1,32 +1,158 @@
-from embedding.embedder import get_embedding
 import numpy as np
+from embedding.embedder import get_embeddings
+from embedding.vector_store import VectorStore
 
-def retrieve(query_list: list[str], store_vectors, top_k=5):
+RRF_K = 60
+
+def retrieve(query_list: list[str], store_vectors, top_k=5, query_embeddings=None):
     """
     Recupera los k textos más cercanos a cada query según la distancia euclidiana.
 
+    Todas las queries se codifican en un único lote y se comparan contra la matriz
+    del repositorio con una sola multiplicación matricial. Como los vectores están
+    normalizados, ordenar por similitud coseno equivale a ordenar por distancia euclidiana.
+
     Args:
         query_list (List[str]): Lista de queries del usuario.
-        store_vectors (List[dict]): Cada embedding es un vector junto con su texto original y el archivo al que pertenece.
+        store_vectors (VectorStore | SegmentLog | IVFIndex | List[dict]): Repositorio vectorial
+            o índice construido sobre él. Por compatibilidad también acepta la lista de
+            diccionarios con el embedding, su texto y su archivo.
         top_k (int): Cantidad de textos a recuperar por cada query.
+        query_embeddings (np.ndarray): Embeddings ya calculados de las queries (una fila
+                                       por query); None los calcula con `get_embeddings`.
 
     Returns:
         List[str]: Conjunto total de textos más cercanos a todas las queries.
     """
+    if isinstance(query_list, str):
+        query_list = [query_list]
+    if not query_list:
+        return []
+
+    if isinstance(store_vectors, list):
+        store_vectors = VectorStore.from_records(store_vectors)
+
+    if query_embeddings is None:
+        query_embeddings = get_embeddings(list(query_list))
+    if query_embeddings is None:
+        return []
+
+    indices, _ = store_vectors.search(query_embeddings, top_k)
+
     results = []
+    for row in indices:
+        # Los índices aproximados marcan con -1 los huecos cuando hay menos de k candidatos
+        results.extend(store_vectors.chunk(int(i)) for i in row if i >= 0)
 
-    for query in query_list:
-        query_embedding = get_embedding(query)
-        if query_embedding is None:
-            continue
+    return results
+
+def fuse_rankings(indices: np.ndarray, scores: np.ndarray, method: str = "rrf", rrf_k: int = RRF_K) -> list[tuple[int, float]]:
+    """
+    Combina los rankings de varias queries en uno solo.
+
+    - "rrf" (reciprocal rank fusion): cada aparición suma 1 / (rrf_k + posición), así que
+      premia los chunks que aparecen bien situados para varias queries.
+    - "max": cada chunk conserva su mayor similitud coseno entre todas las queries.
+
+    Args:
+        indices (np.ndarray): Índices (queries x k) devueltos por `search`; -1 marca huecos.
+        scores (np.ndarray): Similitudes (queries x k) correspondientes.
+        method (str): "rrf" o "max".
+        rrf_k (int): Constante de suavizado de RRF.
+    Returns:
+        list[tuple[int, float]]: Pares (índice, puntuación fusionada) de mayor a menor.
+    """
+    if method not in ("rrf", "max"):
+        raise ValueError(f"Método de fusión no soportado: {method}")
+    fused = {}
+    for row_indices, row_scores in zip(indices, scores):
+        for rank, (i, score) in enumerate(zip(row_indices, row_scores)):
+            i = int(i)
+            if i < 0:
+                continue
+            if method == "rrf":
+                fused[i] = fused.get(i, 0.0) + 1.0 / (rrf_k + rank + 1)
+            else:
+                fused[i] = max(fused.get(i, -np.inf), float(score))
+    # A igualdad de puntuación se respeta el orden del repositorio, para que el resultado sea estable
+    return sorted(fused.items(), key=lambda item: (-item[1], item[0]))
 
-        distances = []
-        for item in store_vectors:
-            dist = np.linalg.norm(query_embedding - item["embedding"])
-            distances.append((dist, item["chunk"]))
+def _concat_rankings(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Apila dos rankings (queries x k) con distinta k, rellenando con -1 las columnas que faltan."""
+    k = max(a.shape[1], b.shape[1])
+    pad = lambda m: np.pad(m, ((0, 0), (0, k - m.shape[1])), constant_values=-1)
+    return np.concatenate([pad(a), pad(b)])
 
-        distances.sort(key=lambda x: x[0])
-        top_chunks = [chunk for _, chunk in distances[:top_k]]
-        results.extend(top_chunks)
+def retrieve_fused(query_list: list[str], store_vectors, top_k=5, method="rrf", per_query_k=None, lexical=None,
+                   query_embeddings=None):
+    """
+    Recuperación multi-query con fusión de resultados.
+
+    Todas las queries se codifican en un único lote y se buscan contra el repositorio en
+    una sola llamada; los rankings de cada query se fusionan (ver `fuse_rankings`) y se
+    devuelven hasta `top_k * len(query_list)` chunks distintos (como `retrieve`, `top_k`
+    por query), cada uno una sola vez aunque lo recuperen varias queries. Así el validador
+    no recibe (ni paga tokens por) chunks repetidos.
+
+    Con `lexical` la búsqueda es híbrida: los rankings BM25 de cada query se fusionan con
+    RRF junto a los densos, de modo que los nombres propios (cócteles, marcas) que el
+    embedding capta mal también suben en el resultado.
+
+    Args:
+        query_list (List[str]): Lista de queries del usuario.
+        store_vectors (VectorStore | SegmentLog | IVFIndex | QuantizedIndex | List[dict]):
+            Repositorio vectorial o índice construido sobre él.
+        top_k (int): Cantidad de chunks a devolver por cada query.
+        method (str): "rrf" (reciprocal rank fusion) o "max" (máxima similitud).
+        per_query_k (int): Candidatos recuperados por query antes de fusionar
+                           (por defecto, `top_k`).
+        lexical (BM25Index): Índice BM25 sobre los mismos chunks; None desactiva la
+                             búsqueda híbrida. Requiere `method="rrf"`, porque las
+                             puntuaciones BM25 y coseno no son comparables.
+        query_embeddings (np.ndarray): Embeddings ya calculados de las queries (una fila
+                                       por query); None los calcula con `get_embeddings`.
+
+    Returns:
+        List[dict]: Resultados de mayor a menor puntuación, con las claves
+                    "text" (chunk), "score" (puntuación fusionada), "source" (archivo) y
+                    "sources" (todos los archivos que contienen el chunk o un casi
+                    duplicado suyo, ver `sources_of`).
+    """
+    if lexical is not None and method != "rrf":
+        raise ValueError("La búsqueda híbrida sólo admite la fusión 'rrf'")
+    if isinstance(query_list, str):
+        query_list = [query_list]
+    if not query_list:
+        return []
+
+    if isinstance(store_vectors, list):
+        store_vectors = VectorStore.from_records(store_vectors)
+
+    if query_embeddings is None:
+        query_embeddings = get_embeddings(list(query_list))
+    if query_embeddings is None:
+        return []
+
+    indices, scores = store_vectors.search(query_embeddings, per_query_k or top_k)
+    if lexical is not None:
+        lex_indices, lex_scores = lexical.search(list(query_list), per_query_k or top_k)
+        indices = _concat_rankings(indices, lex_indices)
+        scores = _concat_rankings(scores, lex_scores)
+
+    limit = top_k * len(query_list)
+    results = []
+    by_text = {}
+    for i, score in fuse_rankings(indices, scores, method):
+        text = store_vectors.chunk(i)
+        sources = store_vectors.sources_of(i)
+        # Repositorios antiguos (sin deduplicar al indexar) pueden repetir el mismo texto en varias filas
+        if text in by_text:
+            known = by_text[text]["sources"]
+            known.extend(s for s in sources if s not in known)
+            continue
+        # Completo el resultado, el resto del ranking sólo aporta fuentes de los textos ya elegidos
+        if len(results) < limit:
+            by_text[text] = {"text": text, "score": round(float(score), 6), "source": sources[0], "sources": list(sources)}
+            results.append(by_text[text])
 
     return results
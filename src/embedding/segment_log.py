@@ -0,0 +1,318 @@
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+from embedding.vector_store import VectorStore, VectorStoreWriter
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "manifest.lock"
+MAX_SEGMENTS = 16
+
+@contextmanager
+def file_lock(path: Path):
+    """
+    Bloqueo exclusivo entre procesos sobre el archivo `path` (flock en POSIX, msvcrt en
+    Windows). Se libera al salir del bloque o si el proceso termina.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK se rinde tras unos 10 s de espera: se vuelve a intentar
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def appended_segments(previous: list[str], store) -> bool:
+    """
+    Indica si `store` sólo añadió segmentos al final de los `previous`: las filas ya vistas
+    siguen siendo las mismas y en el mismo orden. Un reindexado (`replace=True`) o una
+    compactación cambian los nombres de los segmentos; un repositorio sin segmentos
+    (`VectorStore`) nunca se considera ampliado.
+    """
+    current = list(getattr(store, "segment_names", ()))
+    return bool(previous) and len(current) > len(previous) and current[:len(previous)] == list(previous)
+
+class SegmentLog:
+    """
+    Repositorio vectorial formado por segmentos inmutables que sólo se añaden al final.
+
+    Cada segmento es un `VectorStore` columnar en su propia carpeta. El archivo
+    `manifest.json` lista los segmentos vivos y una generación que aumenta con cada
+    cambio; se reescribe de forma atómica (`os.replace`), así que un lector siempre ve
+    un estado completo. Cada lectura-modificación-escritura del manifiesto se hace con
+    `manifest.lock` bloqueado, de modo que varios procesos (el crawler indexando un
+    documento y un reindexado completo, por ejemplo) no pierden los cambios del otro. Añadir un documento sólo escribe un segmento pequeño, y cuando
+    hay demasiados segmentos se compactan en uno solo.
+
+    Ofrece la misma interfaz de búsqueda que `VectorStore` (`search`, `chunk`, `source`,
+    `__len__`), por lo que `retrieve` funciona igual sobre ambos.
+
+    Atributos:
+        path (Path): Carpeta del repositorio.
+        max_segments (int): Cantidad de segmentos a partir de la cual se compacta al añadir.
+        generation (int): Generación del manifiesto cargado actualmente.
+    """
+
+    def __init__(self, path, max_segments=MAX_SEGMENTS):
+        self.path = Path(path)
+        self.max_segments = max_segments
+        self.generation = -1
+        self.segment_names = []
+        self._segments = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._vectors = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def open(cls, path, max_segments=MAX_SEGMENTS) -> "SegmentLog":
+        """Abre (o crea vacío) el repositorio en `path` y carga el manifiesto actual."""
+        log = cls(path, max_segments)
+        log._migrate_single_store()
+        log.refresh()
+        return log
+
+    # ==== Manifiesto ====
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.path / MANIFEST_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"generation": 0, "next_id": 0, "segments": []}
+
+    @contextmanager
+    def _manifest_lock(self):
+        """Exclusión entre hilos (RLock) y entre procesos (`manifest.lock`) para modificar el manifiesto."""
+        with self._lock, file_lock(self.path / LOCK_FILE):
+            yield
+
+    def _write_manifest(self, manifest: dict):
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / (MANIFEST_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self.path / MANIFEST_FILE)
+
+    def _migrate_single_store(self):
+        """Convierte un repositorio de un solo bloque (sin manifiesto) en el segmento inicial."""
+        if (self.path / MANIFEST_FILE).exists() or not VectorStore.exists(self.path):
+            return
+        with self._manifest_lock():
+            if (self.path / MANIFEST_FILE).exists():
+                return  # Otro proceso lo migró mientras se esperaba el bloqueo
+            segment = self.path / "seg_000000"
+            segment.mkdir(parents=True, exist_ok=True)
+            for entry in list(self.path.iterdir()):
+                if entry.is_file() and entry.name != LOCK_FILE:
+                    os.replace(entry, segment / entry.name)
+            self._write_manifest({"generation": 1, "next_id": 1, "segments": [segment.name]})
+
+    def refresh(self) -> bool:
+        """
+        Recarga el manifiesto si cambió desde la última lectura.
+
+        Sólo se abren los segmentos nuevos; los que ya estaban abiertos se reutilizan.
+        Returns:
+            bool: True si se cargó una generación nueva.
+        """
+        with self._lock:
+            manifest = self._read_manifest()
+            if manifest["generation"] == self.generation:
+                return False
+
+            segments = {}
+            for name in manifest["segments"]:
+                if name in self._segments:
+                    segments[name] = self._segments[name]
+                else:
+                    segments[name] = VectorStore.open(self.path / name)
+            self._segments = segments
+            self.segment_names = list(manifest["segments"])
+            sizes = [len(segments[name]) for name in self.segment_names]
+            self._offsets = np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)])
+            self._vectors = None
+            self.generation = manifest["generation"]
+            return True
+
+    # ==== Escritura ====
+
+    @contextmanager
+    def segment_writer(self, replace: bool = False):
+        """
+        Escribe un segmento nuevo y lo publica en el manifiesto al salir del bloque `with`.
+
+        Args:
+            replace (bool): Si es True el segmento sustituye a todos los anteriores
+                            (reindexado completo); si no, se añade al final.
+        Yields:
+            VectorStoreWriter: Escritor del segmento.
+        """
+        with self._manifest_lock():
+            manifest = self._read_manifest()
+            name = f"seg_{manifest['next_id']:06d}"
+            manifest["next_id"] += 1
+            # Reservar el identificador antes de escribir para no reutilizarlo
+            self._write_manifest(manifest)
+
+        segment_dir = self.path / name
+        try:
+            with VectorStoreWriter(segment_dir) as writer:
+                yield writer
+        except BaseException:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+            raise
+
+        with self._manifest_lock():
+            manifest = self._read_manifest()
+            old = manifest["segments"] if replace else []
+            manifest["segments"] = [name] if replace else manifest["segments"] + [name]
+            manifest["generation"] += 1
+            self._write_manifest(manifest)
+            for dead in old:
+                shutil.rmtree(self.path / dead, ignore_errors=True)
+            needs_compaction = len(manifest["segments"]) > self.max_segments
+
+        if needs_compaction:
+            self.compact()
+
+    def append(self, vectors, chunks: list[str], sources: list[str]):
+        """Añade un lote de chunks como un segmento nuevo."""
+        if len(chunks) == 0:
+            return
+        with self.segment_writer() as writer:
+            writer.add(vectors, chunks, sources)
+
+    def compact(self):
+        """
+        Fusiona todos los segmentos vivos en uno solo y elimina los anteriores.
+
+        Los segmentos que se añadan mientras se compacta se conservan al final. Si mientras
+        tanto otro proceso reemplazó o compactó alguno de los segmentos fusionados, el
+        resultado ya no corresponde al manifiesto y se descarta.
+        """
+        with self._manifest_lock():
+            manifest = self._read_manifest()
+            merged = list(manifest["segments"])
+            if len(merged) <= 1:
+                return
+            name = f"seg_{manifest['next_id']:06d}"
+            manifest["next_id"] += 1
+            self._write_manifest(manifest)
+
+        try:
+            with VectorStoreWriter(self.path / name) as writer:
+                for segment in merged:
+                    writer.add_store(VectorStore.open(self.path / segment))
+        except FileNotFoundError:
+            # Un segmento desapareció a mitad de la copia: otro proceso ya lo sustituyó
+            shutil.rmtree(self.path / name, ignore_errors=True)
+            return
+
+        with self._manifest_lock():
+            manifest = self._read_manifest()
+            if not set(merged) <= set(manifest["segments"]):
+                shutil.rmtree(self.path / name, ignore_errors=True)
+                return
+            remaining = [s for s in manifest["segments"] if s not in merged]
+            manifest["segments"] = [name] + remaining
+            manifest["generation"] += 1
+            self._write_manifest(manifest)
+            for dead in merged:
+                shutil.rmtree(self.path / dead, ignore_errors=True)
+        print(f"🗜️ Compactados {len(merged)} segmentos en {name}")
+
+    # ==== Lectura ====
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    def _locate(self, i: int):
+        seg = int(np.searchsorted(self._offsets, i, side="right")) - 1
+        return self._segments[self.segment_names[seg]], i - int(self._offsets[seg])
+
+    def segment(self, name: str) -> VectorStore:
+        """Segmento `name` del manifiesto cargado."""
+        return self._segments[name]
+
+    def chunk(self, i: int) -> str:
+        store, local = self._locate(i)
+        return store.chunk(local)
+
+    def source(self, i: int) -> str:
+        store, local = self._locate(i)
+        return store.source(local)
+
+    def sources_of(self, i: int) -> list[str]:
+        store, local = self._locate(i)
+        return store.sources_of(local)
+
+    def rows(self, indices) -> np.ndarray:
+        """
+        Devuelve las filas pedidas (índices globales) leyendo de cada segmento,
+        sin concatenar la matriz completa.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        segs = np.searchsorted(self._offsets, indices, side="right") - 1
+        out = None
+        for seg in np.unique(segs):
+            mask = segs == seg
+            part = self._segments[self.segment_names[seg]].rows(indices[mask] - self._offsets[seg])
+            if out is None:
+                out = np.empty((len(indices), part.shape[1]), dtype=np.float32)
+            out[mask] = part
+        return out if out is not None else np.zeros((0, 0), dtype=np.float32)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Matriz completa (N x d) de todos los segmentos, concatenada bajo demanda."""
+        if self._vectors is None:
+            stores = [self._segments[name] for name in self.segment_names]
+            if len(stores) == 1:
+                self._vectors = stores[0].vectors
+            elif stores:
+                self._vectors = np.concatenate([s.vectors for s in stores])
+            else:
+                self._vectors = np.zeros((0, 0), dtype=np.float32)
+        return self._vectors
+
+    def search(self, query_vectors: np.ndarray, top_k: int = 5):
+        """
+        Busca en cada segmento y fusiona los `top_k` mejores resultados globales.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Índices globales y similitudes (consultas x k).
+        """
+        query_vectors = np.atleast_2d(query_vectors)
+        all_indices, all_scores = [], []
+        for name, offset in zip(self.segment_names, self._offsets[:-1]):
+            indices, scores = self._segments[name].search(query_vectors, top_k)
+            all_indices.append(indices + offset)
+            all_scores.append(scores)
+        if not all_indices:
+            empty = np.empty((query_vectors.shape[0], 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+        indices = np.concatenate(all_indices, axis=1)
+        scores = np.concatenate(all_scores, axis=1)
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+        return np.take_along_axis(indices, order, axis=1), np.take_along_axis(scores, order, axis=1)
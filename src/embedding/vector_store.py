@@ -0,0 +1,311 @@
+import json
+import os
+from pathlib import Path
+import numpy as np
+
+# ==== Formato en disco ====
+# Un repositorio es una carpeta con columnas independientes:
+#   meta.json          -> {"count": N, "dim": d, "dtype": "float32"}
+#   vectors.f32        -> matriz (N x d) float32 cruda, filas normalizadas
+#   chunk_offsets.npy  -> int64 (N + 1), posición de cada chunk dentro de chunks.bin
+#   chunks.bin         -> textos de los chunks concatenados en UTF-8
+#   source_ids.npy     -> int32 (N), índice de cada chunk en la tabla de fuentes
+#   sources.json       -> tabla de nombres de archivo sin repetir
+#   aliases.json       -> (opcional) {fila: [otras fuentes]} de los chunks que absorbieron duplicados
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.f32"
+OFFSETS_FILE = "chunk_offsets.npy"
+CHUNKS_FILE = "chunks.bin"
+SOURCE_IDS_FILE = "source_ids.npy"
+SOURCES_FILE = "sources.json"
+ALIASES_FILE = "aliases.json"
+STORE_FILES = (META_FILE, VECTORS_FILE, OFFSETS_FILE, CHUNKS_FILE, SOURCE_IDS_FILE, SOURCES_FILE, ALIASES_FILE)
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Normaliza cada fila de la matriz a norma 1 (las filas nulas se dejan en cero).
+    Args:
+        matrix (np.ndarray): Matriz de vectores (una fila por vector).
+    Returns:
+        np.ndarray: Matriz float32 contigua con filas normalizadas.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Obtiene, por cada fila de `scores`, los índices de los `top_k` valores más altos
+    ordenados de mayor a menor. Usa `argpartition` para no ordenar todas las columnas.
+    Args:
+        scores (np.ndarray): Matriz (consultas x documentos) de similitudes.
+        top_k (int): Cantidad de índices a devolver por fila.
+    Returns:
+        np.ndarray: Matriz (consultas x k) de índices.
+    """
+    n = scores.shape[1]
+    k = min(top_k, n)
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(n), (scores.shape[0], 1))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+class TextColumn:
+    """
+    Columna de textos almacenada como un blob UTF-8 más un arreglo de offsets.
+    Cada texto se decodifica sólo cuando se accede a él.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+class InternedColumn:
+    """
+    Columna de textos muy repetidos (por ejemplo, el archivo de origen de cada chunk),
+    guardada como índices enteros sobre una tabla de valores únicos.
+    """
+
+    def __init__(self, ids: np.ndarray, table: list[str]):
+        self.ids = ids
+        self.table = table
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> str:
+        return self.table[int(self.ids[i])]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+class VectorStoreWriter:
+    """
+    Escribe un repositorio vectorial en disco de forma incremental.
+
+    Los vectores y los textos se añaden al final de sus archivos a medida que llegan,
+    por lo que no es necesario mantener todo el corpus en memoria. Al cerrar se escriben
+    los offsets, la tabla de fuentes y los metadatos. Si el bloque `with` termina con una
+    excepción el repositorio no se da por completo: se borran los archivos escritos.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Un meta.json anterior describiría archivos que se van a sobrescribir
+        (self.path / META_FILE).unlink(missing_ok=True)
+        self._vectors = open(self.path / VECTORS_FILE, "wb")
+        self._chunks = open(self.path / CHUNKS_FILE, "wb")
+        self._offsets = [0]
+        self._source_ids = []
+        self._source_table = {}
+        self._aliases = {}
+        self.dim = None
+        self.count = 0
+
+    def add(self, vectors, chunks: list[str], sources: list[str], normalized: bool = False):
+        """
+        Añade un lote de chunks al repositorio.
+        Args:
+            vectors (np.ndarray): Embeddings del lote (una fila por chunk).
+            chunks (list[str]): Texto de cada chunk.
+            sources (list[str]): Archivo de origen de cada chunk.
+            normalized (bool): Si los vectores ya tienen norma 1.
+        """
+        if len(chunks) == 0:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32) if normalized else normalize_rows(vectors)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Dimensión {vectors.shape[1]} distinta de la del repositorio ({self.dim})")
+
+        self._vectors.write(vectors.tobytes())
+        for chunk, source in zip(chunks, sources):
+            data = chunk.encode("utf-8")
+            self._chunks.write(data)
+            self._offsets.append(self._offsets[-1] + len(data))
+            self._source_ids.append(self._source_table.setdefault(source, len(self._source_table)))
+        self.count += len(chunks)
+
+    def add_aliases(self, row: int, sources: list[str]):
+        """Registra otras fuentes que contienen el mismo chunk que la fila `row`."""
+        if sources:
+            self._aliases.setdefault(int(row), []).extend(s for s in sources if s not in self._aliases.get(int(row), []))
+
+    def add_store(self, store, block: int = 16384):
+        """Copia al final todos los chunks de otro repositorio, incluidas sus fuentes alternativas."""
+        offset = self.count
+        for start in range(0, len(store), block):
+            rows = range(start, min(start + block, len(store)))
+            self.add(store.rows(list(rows)), [store.chunk(i) for i in rows], [store.source(i) for i in rows], normalized=True)
+        for row, sources in store.aliases.items():
+            self.add_aliases(offset + row, sources)
+
+    def close(self):
+        """Cierra los archivos y escribe offsets, fuentes y metadatos."""
+        self._vectors.close()
+        self._chunks.close()
+        np.save(self.path / OFFSETS_FILE, np.asarray(self._offsets, dtype=np.int64))
+        np.save(self.path / SOURCE_IDS_FILE, np.asarray(self._source_ids, dtype=np.int32))
+        with open(self.path / SOURCES_FILE, "w", encoding="utf-8") as f:
+            json.dump(list(self._source_table), f, ensure_ascii=False)
+        if self._aliases:
+            with open(self.path / ALIASES_FILE, "w", encoding="utf-8") as f:
+                json.dump({str(row): srcs for row, srcs in self._aliases.items()}, f, ensure_ascii=False)
+        # meta.json se escribe al final: su presencia indica que el repositorio está completo
+        with open(self.path / META_FILE, "w", encoding="utf-8") as f:
+            json.dump({"count": self.count, "dim": self.dim or 0, "dtype": "float32"}, f)
+
+    def abort(self):
+        """Cierra los archivos sin escribir los metadatos y borra lo escrito hasta ahora."""
+        self._vectors.close()
+        self._chunks.close()
+        for name in STORE_FILES:
+            (self.path / name).unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            self.abort()
+
+class VectorStore:
+    """
+    Repositorio vectorial.
+
+    Guarda todos los embeddings en una única matriz float32 contigua con filas
+    normalizadas, junto con el texto de cada chunk y el archivo del que proviene.
+    Puede vivir en memoria (`from_records`) o abrirse desde disco (`open`).
+    Al estar normalizados los vectores, la distancia euclidiana y la similitud coseno
+    producen el mismo orden, por lo que la búsqueda se reduce a un producto matricial.
+
+    Atributos:
+        vectors (np.ndarray): Matriz (N x d) float32 con los embeddings normalizados.
+        chunks (list[str] | TextColumn): Texto de cada chunk.
+        sources (list[str] | InternedColumn): Archivo de origen de cada chunk.
+        aliases (dict[int, list[str]]): Otras fuentes de los chunks que absorbieron duplicados.
+    """
+
+    def __init__(self, vectors, chunks, sources, normalized=False, aliases=None):
+        self.vectors = vectors if normalized else normalize_rows(vectors)
+        self.chunks = chunks
+        self.sources = sources
+        self.aliases = aliases or {}
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> "VectorStore":
+        """
+        Construye el repositorio a partir de la lista de diccionarios
+        `{"source", "chunk", "embedding"}` generada por `embedder`.
+        """
+        records = [r for r in records if r.get("embedding") is not None]
+        if not records:
+            return cls(np.zeros((0, 0), dtype=np.float32), [], [])
+        vectors = np.stack([np.asarray(r["embedding"], dtype=np.float32) for r in records])
+        chunks = [r["chunk"] for r in records]
+        sources = [r["source"] for r in records]
+        return cls(vectors, chunks, sources)
+
+    @classmethod
+    def open(cls, path) -> "VectorStore":
+        """
+        Abre un repositorio guardado en disco sin cargarlo en memoria.
+
+        La matriz de vectores y el blob de textos se mapean con `np.memmap` en modo
+        lectura, de modo que el sistema operativo carga las páginas bajo demanda y
+        varios procesos que abren el mismo repositorio comparten esas páginas.
+        Args:
+            path (str | Path): Carpeta del repositorio.
+        Returns:
+            VectorStore: Repositorio respaldado por archivos.
+        """
+        path = Path(path)
+        with open(path / META_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        count, dim = meta["count"], meta["dim"]
+        with open(path / SOURCES_FILE, "r", encoding="utf-8") as f:
+            table = json.load(f)
+
+        offsets = np.load(path / OFFSETS_FILE, mmap_mode="r")
+        source_ids = np.load(path / SOURCE_IDS_FILE, mmap_mode="r")
+        if count == 0:
+            vectors = np.zeros((0, dim), dtype=np.float32)
+        else:
+            vectors = np.memmap(path / VECTORS_FILE, dtype=np.float32, mode="r", shape=(count, dim))
+        if os.path.getsize(path / CHUNKS_FILE) == 0:
+            blob = b""
+        else:
+            blob = np.memmap(path / CHUNKS_FILE, dtype=np.uint8, mode="r")
+
+        aliases = {}
+        if (path / ALIASES_FILE).exists():
+            with open(path / ALIASES_FILE, "r", encoding="utf-8") as f:
+                aliases = {int(row): srcs for row, srcs in json.load(f).items()}
+
+        return cls(vectors, TextColumn(offsets, blob), InternedColumn(source_ids, table), normalized=True, aliases=aliases)
+
+    @staticmethod
+    def exists(path) -> bool:
+        """Indica si en `path` hay un repositorio completo."""
+        return (Path(path) / META_FILE).exists()
+
+    def save(self, path):
+        """Guarda el repositorio en `path` con el formato columnar."""
+        with VectorStoreWriter(path) as writer:
+            writer.add_store(self)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def rows(self, indices) -> np.ndarray:
+        """Copia en memoria sólo las filas pedidas de la matriz de vectores."""
+        return np.asarray(self.vectors[np.asarray(indices, dtype=np.int64)])
+
+    def chunk(self, i: int) -> str:
+        return self.chunks[i]
+
+    def source(self, i: int) -> str:
+        return self.sources[i]
+
+    def sources_of(self, i: int) -> list[str]:
+        """Todos los archivos que contienen el chunk `i` (o un casi duplicado suyo)."""
+        return [self.sources[i]] + self.aliases.get(i, [])
+
+    def search(self, query_vectors: np.ndarray, top_k: int = 5):
+        """
+        Busca los `top_k` vectores más similares para cada consulta en una sola multiplicación.
+        Args:
+            query_vectors (np.ndarray): Matriz (consultas x d) de embeddings de consulta.
+            top_k (int): Cantidad de resultados por consulta.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Índices y similitudes (consultas x k), de mayor a menor.
+        """
+        queries = normalize_rows(query_vectors)
+        if len(self) == 0:
+            empty = np.empty((queries.shape[0], 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+        scores = queries @ self.vectors.T
+        indices = top_k_indices(scores, top_k)
+        return indices, np.take_along_axis(scores, indices, axis=1)
@@ -1,3 +1,9 @@
+import uuid
+
+def new_request_id() -> str:
+    """Genera un identificador único para una petición del usuario."""
+    return uuid.uuid4().hex[:12]
+
 class AgentSystem:
     """
     Clase que representa el sistema central de coordinación entre agentes.
@@ -7,6 +13,10 @@ class AgentSystem:
     Permite una arquitectura desacoplada, donde los agentes se comunican
     mediante colas internas sin conocerse directamente.
 
+    Cada mensaje lleva el identificador de la petición del usuario a la que pertenece
+    (`request_id`), de modo que varias conversaciones pueden atravesar a la vez las
+    mismas instancias de los agentes sin mezclar su estado.
+
     Atributos:
         agents (dict): Diccionario que mapea el nombre de cada agente a su instancia correspondiente.
     """
@@ -29,7 +39,7 @@ class AgentSystem:
 
         self.agents[agent.name] = agent
 
-    async def send_message(self, from_agent, to_agent, content):
+    async def send_message(self, from_agent, to_agent, content, request_id=None):
         """
         Envía un mensaje desde un agente emisor a un agente receptor registrado.
 
@@ -37,6 +47,8 @@ class AgentSystem:
             from_agent (str): Nombre del agente que envía el mensaje.
             to_agent (str): Nombre del agente destinatario.
             content (any): Contenido del mensaje a enviar. Puede ser texto, un objeto, etc.
+            request_id (str): Petición del usuario a la que pertenece el mensaje (None si no
+                              pertenece a ninguna, como los avisos internos).
 
         Comportamiento:
             - Si el agente de destino está registrado, el mensaje se coloca en su `inbox`.
@@ -47,6 +59,7 @@ class AgentSystem:
             await self.agents[to_agent].inbox.put({
                 "from": from_agent,
                 "to": to_agent,
+                "request_id": request_id,
                 "content": content
             })
         else:
@@ -0,0 +1,108 @@
+"""
+Servidor HTTP mínimo (sobre `asyncio.start_server`, sin dependencias externas) que expone
+el sistema multiagente a clientes remotos.
+
+Rutas:
+- `POST /query` con cuerpo JSON `{"text": "..."}`, o `GET /query?text=...` (para
+  `EventSource` en el navegador): responde con un flujo Server-Sent Events. Cada respuesta
+  del coordinador es un evento cuyo nombre es su intención ("await", "final", "error") y
+  cuyos datos son `{"content": ...}`; el flujo se cierra tras la respuesta definitiva.
+- `GET /health`: estado del servidor y cantidad de consultas en curso.
+"""
+import asyncio
+import json
+from urllib.parse import urlsplit, parse_qs
+
+MAX_BODY = 64 * 1024
+
+def sse_event(event: str, data: dict) -> bytes:
+    """Codifica un evento Server-Sent Events."""
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+def _response(writer, status: str, body: dict):
+    payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status}\r\nContent-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("utf-8") + payload
+    )
+
+async def _read_request(reader):
+    """Lee la línea de petición, las cabeceras y el cuerpo de una petición HTTP/1.1."""
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    if not request_line:
+        return None
+    parts = request_line.split(" ")
+    if len(parts) != 3:
+        raise ValueError(f"Línea de petición inválida: {request_line[:80]}")
+    method, target, _ = parts
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY:
+        raise ValueError("Cuerpo demasiado grande")
+    body = await reader.readexactly(length) if length else b""
+    return method, target, headers, body
+
+async def handle_client(reader, writer, gateway):
+    """Atiende una conexión HTTP: una petición por conexión."""
+    try:
+        try:
+            request = await _read_request(reader)
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            _response(writer, "400 Bad Request", {"error": str(e)})
+            return
+        if request is None:
+            return
+        method, target, _, body = request
+        url = urlsplit(target)
+
+        if url.path == "/health" and method == "GET":
+            _response(writer, "200 OK", {"status": "ok", "in_flight": len(gateway.streams)})
+            return
+        if url.path != "/query" or method not in ("GET", "POST"):
+            _response(writer, "404 Not Found", {"error": f"Ruta no encontrada: {method} {url.path}"})
+            return
+
+        try:
+            if method == "POST":
+                text = json.loads(body.decode("utf-8")).get("text", "")
+            else:
+                text = parse_qs(url.query).get("text", [""])[0]
+        except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+            _response(writer, "400 Bad Request", {"error": "Se esperaba un JSON con el campo 'text'"})
+            return
+        if not text.strip():
+            _response(writer, "400 Bad Request", {"error": "La consulta está vacía"})
+            return
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream; charset=utf-8\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+        async for response in gateway.submit(text):
+            writer.write(sse_event(response.get("intencion") or "error", {"content": response.get("content")}))
+            await writer.drain()
+    except ConnectionError:
+        pass  # El cliente cerró la conexión; su consulta se descarta
+    finally:
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+async def serve(gateway, host: str = "127.0.0.1", port: int = 8080):
+    """
+    Arranca el servidor HTTP sobre el agente de entrada `gateway`.
+    Returns:
+        asyncio.Server: Servidor en marcha (usar `serve_forever()` o `close()`).
+    """
+    server = await asyncio.start_server(lambda r, w: handle_client(r, w, gateway), host, port)
+    sockets = ", ".join(str(s.getsockname()[:2]) for s in server.sockets)
+    print(f"🌐 Servidor escuchando en {sockets}")
+    return server
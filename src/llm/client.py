@@ -0,0 +1,210 @@
+import ast
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from llm.prompt_cache import PromptCache, prompt_key
+
+DEFAULT_TIMEOUT = 60.0  # segundos por llamada al modelo
+
+class LLMResponse:
+    """Respuesta del modelo; expone `text` como las respuestas de Gemini."""
+
+    def __init__(self, text: str, cached: bool = False):
+        self.text = text
+        self.cached = cached
+
+class GeminiBackend:
+    """Backend de Google Gemini. El SDK se importa al construirlo, no al importar el módulo."""
+
+    def __init__(self, api_key: str, model_name: str = "gemini-1.5-flash"):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self._model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str) -> str:
+        output = self._model.generate_content(prompt)
+        return output.text if hasattr(output, "text") else str(output)
+
+    async def agenerate(self, prompt: str) -> str:
+        output = await self._model.generate_content_async(prompt)
+        return output.text if hasattr(output, "text") else str(output)
+
+class StubBackend:
+    """
+    Backend local y determinista para ejecutar y medir el sistema completo sin conexión.
+
+    Reconoce los prompts de cada agente y devuelve un JSON válido con la forma que ese
+    agente espera, tras `latency` segundos de espera (bloqueante en `generate`, como el
+    SDK síncrono; asíncrona en `agenerate`, como una llamada de red con el SDK asíncrono).
+    La respuesta final al usuario repite la consulta traducida, lo que permite comprobar
+    que cada petición recibe su propia respuesta.
+
+    Para medir prompts grandes, `latency_per_kchar` añade espera por cada 1000 caracteres
+    de respuesta (los modelos tardan en proporción a lo que generan), y `failure_rate` hace
+    que esa fracción de las respuestas de la matriz de cumplimiento llegue truncada.
+    """
+
+    model_name = "stub"
+
+    def __init__(self, latency: float = 0.0, latency_per_kchar: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.latency_per_kchar = latency_per_kchar
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.prompt_chars = 0
+        self._rng = random.Random(seed)
+
+    @staticmethod
+    def _user_text(prompt: str) -> str:
+        match = re.search(r"Dada esta consulta: ```(.*?)```", prompt, re.DOTALL)
+        if not match:
+            return ""
+        try:
+            query = ast.literal_eval(match.group(1))
+            return query.get("text", "") if isinstance(query, dict) else str(query)
+        except (ValueError, SyntaxError):
+            return match.group(1)
+
+    def _delay(self, text: str) -> float:
+        return self.latency + self.latency_per_kchar * len(text) / 1000
+
+    def generate(self, prompt: str) -> str:
+        text = self._respond(prompt)
+        if self._delay(text):
+            time.sleep(self._delay(text))
+        return text
+
+    async def agenerate(self, prompt: str) -> str:
+        text = self._respond(prompt)
+        if self._delay(text):
+            await asyncio.sleep(self._delay(text))
+        return text
+
+    def _respond(self, prompt: str) -> str:
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        if "preprocesar consultas" in prompt:
+            text = self._user_text(prompt)
+            return json.dumps({
+                "original_language": "en", "translated_prompt": text, "cocktail_mentioned": True,
+                "cocktails": [{"name": "Mojito", "fields_requested": [True] * 9}],
+                "flavors": "", "embedding_query": [text], "online": False,
+            })
+        if "Extrae las restricciones" in prompt:
+            return '{"fuertes": ["ingredientes"], "débiles": ["historia"], "conjuntas": []}'
+        if "lista de respuestas candidatas" in prompt:
+            return self._matrix(prompt)
+        if "Tengo una pregunta" in prompt:
+            return '{"suficiente": true, "expandida_suficiente": true, "razonamiento": "ok", "requiere_búsqueda_online": false}'
+        match = re.search(r'Query: "(.*?)"', prompt)
+        if match:
+            return match.group(1)
+        return f"stub-{hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:8]}"
+
+    def _matrix(self, prompt: str) -> str:
+        """Una fila por respuesta del prompt; cumple la primera restricción y no las demás."""
+        match = re.search(r"Respuestas:\s*(\[.*\])\s*Restricciones:\s*(\[.*\])", prompt, re.DOTALL)
+        respuestas, restricciones = (json.loads(match.group(1)), json.loads(match.group(2))) if match else ([], [])
+        cumple = ["sí"] + ["no"] * (len(restricciones) - 1) if restricciones else []
+        text = json.dumps([{"respuesta": r, "cumple": cumple} for r in respuestas], ensure_ascii=False)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            return text[: len(text) // 2]
+        return text
+
+class LLMClient:
+    """
+    Cliente del modelo de lenguaje usado por los agentes.
+
+    Ofrece el mismo método `generate_content(prompt)` que `genai.GenerativeModel`, así
+    que los agentes no dependen del proveedor: el backend (Gemini, el stub local, ...)
+    se elige al construir el cliente. Las respuestas se guardan en una `PromptCache`, de
+    modo que un prompt idéntico (una pregunta repetida) no vuelve a llamar al modelo.
+
+    `agenerate_content` es la versión asíncrona, con tiempo límite por llamada; es la que
+    usan los agentes para no bloquear el bucle de asyncio.
+
+    Ambos métodos aceptan `validate(text) -> bool`: una respuesta que no lo supera (un
+    JSON truncado, por ejemplo) no se guarda, y si ya estaba guardada se elimina y se
+    vuelve a pedir al modelo. Así un fallo puntual no se repite hasta que caduque.
+
+    Atributos:
+        backend: Objeto con `generate(prompt) -> str` y `model_name` (y, opcionalmente,
+                 `async agenerate(prompt) -> str`).
+        cache (PromptCache | None): Caché de respuestas; None la desactiva.
+        timeout (float | None): Segundos máximos por llamada asíncrona; None no limita.
+    """
+
+    def __init__(self, backend, cache: PromptCache = None, timeout: float = DEFAULT_TIMEOUT):
+        self.backend = backend
+        self.cache = cache
+        self.timeout = timeout
+
+    @staticmethod
+    def _cacheable(text: str, validate) -> bool:
+        return bool(text) and (validate is None or validate(text))
+
+    def generate_content(self, prompt: str, validate=None) -> LLMResponse:
+        """
+        Devuelve la respuesta del modelo para `prompt`, desde la caché si ya se generó.
+        Las respuestas vacías o que no superan `validate` no se guardan.
+        """
+        key = prompt_key(self.backend.model_name, prompt) if self.cache is not None else None
+        if key is not None:
+            text = self.cache.get(key)
+            if text is not None:
+                if self._cacheable(text, validate):
+                    return LLMResponse(text, cached=True)
+                self.cache.delete(key)
+        text = self.backend.generate(prompt)
+        if key is not None and self._cacheable(text, validate):
+            self.cache.put(key, text)
+        return LLMResponse(text)
+
+    async def agenerate_content(self, prompt: str, timeout: float = None, validate=None) -> LLMResponse:
+        """
+        Versión asíncrona de `generate_content`. Usa la API asíncrona del backend si la
+        tiene; si no, ejecuta la llamada síncrona en un hilo.
+        Args:
+            prompt (str): Prompt a enviar.
+            timeout (float): Segundos máximos de espera (por defecto, `self.timeout`).
+            validate (callable): `validate(text) -> bool`; las respuestas que no lo superan
+                                 no se guardan en la caché (y se eliminan si ya estaban).
+        Raises:
+            TimeoutError: Si el modelo no responde a tiempo. La llamada se cancela (con un
+                          backend síncrono el hilo termina por su cuenta y su resultado se
+                          descarta).
+        """
+        key = prompt_key(self.backend.model_name, prompt) if self.cache is not None else None
+        if key is not None:
+            text = await asyncio.to_thread(self.cache.get, key) if self.cache.path else self.cache.get(key)
+            if text is not None:
+                if self._cacheable(text, validate):
+                    return LLMResponse(text, cached=True)
+                await asyncio.to_thread(self.cache.delete, key) if self.cache.path else self.cache.delete(key)
+        if hasattr(self.backend, "agenerate"):
+            call = self.backend.agenerate(prompt)
+        else:
+            call = asyncio.to_thread(self.backend.generate, prompt)
+        text = await asyncio.wait_for(call, timeout if timeout is not None else self.timeout)
+        if key is not None and self._cacheable(text, validate):
+            # Con persistencia en SQLite la escritura toca disco: se hace fuera del bucle
+            await asyncio.to_thread(self.cache.put, key, text) if self.cache.path else self.cache.put(key, text)
+        return LLMResponse(text)
+
+async def agenerate(model, prompt: str, timeout: float = None, validate=None):
+    """
+    Llama al modelo de forma asíncrona sea cual sea su tipo: un `LLMClient` usa
+    `agenerate_content` (y `validate` decide qué respuestas se guardan en su caché);
+    cualquier otro objeto con `generate_content` (por ejemplo un `genai.GenerativeModel`)
+    se ejecuta en un hilo, con el mismo tiempo límite (por defecto, `DEFAULT_TIMEOUT`).
+    """
+    if hasattr(model, "agenerate_content"):
+        return await model.agenerate_content(prompt, timeout, validate)
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    return await asyncio.wait_for(asyncio.to_thread(model.generate_content, prompt), timeout)
@@ -0,0 +1,125 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+def prompt_key(model_name: str, prompt: str) -> str:
+    """Clave de caché direccionada por contenido: hash del modelo y del prompt exacto."""
+    return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()
+
+class PromptCache:
+    """
+    Caché de respuestas del modelo de lenguaje, indexada por el hash del prompt.
+
+    Tiene dos niveles: una LRU acotada en memoria y, opcionalmente, una base SQLite en
+    disco que conserva las respuestas entre reinicios. Las entradas caducan pasados `ttl`
+    segundos, para que el sistema no arrastre indefinidamente respuestas antiguas.
+
+    Atributos:
+        maxsize (int): Entradas máximas en memoria.
+        path (Path | None): Base SQLite; None desactiva la persistencia.
+        ttl (float | None): Segundos de vida de cada respuesta; None no caduca.
+        hits (int): Prompts resueltos desde la caché.
+        misses (int): Prompts que tuvieron que pasar por el modelo.
+    """
+
+    def __init__(self, maxsize: int = 1024, path=None, ttl: float = None):
+        self.maxsize = maxsize
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connection(self):
+        """Abre la base SQLite la primera vez que se usa."""
+        if self._db is None and self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, text TEXT NOT NULL, created REAL NOT NULL)")
+            self._db.commit()
+        return self._db
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key: str):
+        """Devuelve la respuesta guardada para `key` o None si no existe o caducó."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[1]):
+                del self._entries[key]
+                entry = None
+            if entry is None and self._connection():
+                row = self._db.execute("SELECT text, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and not self._expired(row[1]):
+                    entry = (row[0], row[1])
+                    self._remember(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, text: str):
+        """Guarda la respuesta `text` en memoria y en disco."""
+        entry = (text, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            if self._connection():
+                self._db.execute("INSERT OR REPLACE INTO responses (key, text, created) VALUES (?, ?, ?)", (key, *entry))
+                self._db.commit()
+
+    def delete(self, key: str):
+        """Elimina la respuesta de `key` (por ejemplo, una que resultó malformada)."""
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._connection():
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+
+    def _remember(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        """Elimina de disco las respuestas caducadas. Returns: cantidad eliminada."""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            if not self._connection():
+                return 0
+            cursor = self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+            self._db.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._connection():
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Contadores para dimensionar la caché."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
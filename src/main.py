@@ -1,8 +1,8 @@
 import os
 import asyncio
-import google.generativeai as genai
 from environment.agent_system import AgentSystem
 from agents.user_agent import UserAgent
+from agents.gateway_agent import GatewayAgent
 from agents.coordinator_agent import CoordinatorAgent
 from agents.ontology_agent import OntologyAgent
 from agents.embedding_agent import EmbeddingAgent
@@ -11,7 +11,11 @@ from agents.intent_detector_agent import IntentDetectorAgent
 from agents.validator_agent import ValidationAgent
 from agents.flavor_agent import Flavor_Agent
 from ontology.query_ontology import consultar_tragos
-from embedding.query_embedding import retrieve
+from embedding.query_embedding import retrieve_fused
+from utils.constraint_prefilter import ConstraintPrefilter, load_ingredients
+from environment.server import serve
+from llm.client import LLMClient, GeminiBackend, StubBackend
+from llm.prompt_cache import PromptCache
 from pathlib import Path
 
 """
@@ -19,7 +23,8 @@ Script principal para inicializar y ejecutar el sistema multiagente de bartender
 
 Este script realiza las siguientes tareas:
 - Carga el token de API desde un archivo local para autenticar la API de Google Generative AI.
-- Configura el modelo generativo Gemini 1.5 de Google.
+- Configura el cliente del modelo de lenguaje (Gemini 1.5 de Google, o un modelo local
+  simulado para ejecutar sin conexión) con una caché de respuestas en disco.
 - Crea una instancia del sistema de agentes (`AgentSystem`).
 - Inicializa los agentes necesarios, cada uno con sus responsabilidades específicas:
   * `UserAgent`: Agente que representa al usuario.
@@ -47,8 +52,14 @@ Requisitos:
 
 Ejemplo de ejecución:
     python src/main.py
+    python src/main.py --serve --port 8080   # servidor HTTP con respuestas por Server-Sent Events
+    python src/main.py --llm stub            # sin conexión, con el modelo simulado
 """
 
+LLM_CACHE_FILE = "src/llm/cache.sqlite3"
+LLM_CACHE_SIZE = 2048
+LLM_CACHE_TTL = 7 * 24 * 3600  # segundos
+
 def load_token(file_path="src/token.txt") -> str:
     try:
         token = Path(file_path).read_text(encoding="utf-8").strip()
@@ -60,33 +71,53 @@ def load_token(file_path="src/token.txt") -> str:
     except Exception as e:
         raise RuntimeError(f"❌ Error al leer el token: {e}")
 
-async def main():
+def build_llm(backend="gemini", cache_file=LLM_CACHE_FILE, ttl=LLM_CACHE_TTL) -> LLMClient:
+    """
+    Construye el cliente del modelo de lenguaje.
+    Args:
+        backend (str): "gemini" o "stub" (modelo local determinista, sin conexión).
+        cache_file (str): Base SQLite de la caché de respuestas; None la deja sólo en memoria.
+        ttl (float): Segundos de vida de cada respuesta en caché.
+    """
+    if backend == "stub":
+        llm_backend = StubBackend()
+    else:
+        TOKEN = load_token()
+
+        if TOKEN is None:
+            raise ValueError("❌ No se encontró el token. ¿Está definido en config.env?")
 
-    TOKEN = load_token()
+        print(f"🔐 Token cargado: {TOKEN[:5]}...")  # Nunca muestres el token completo
+        llm_backend = GeminiBackend(TOKEN, "gemini-1.5-flash")
+    return LLMClient(llm_backend, PromptCache(LLM_CACHE_SIZE, cache_file, ttl))
 
-    if TOKEN is None:
-        raise ValueError("❌ No se encontró el token. ¿Está definido en config.env?")
-    
-    print(f"🔐 Token cargado: {TOKEN[:5]}...")  # Nunca muestres el token completo
+async def main(serve_http=False, host="127.0.0.1", port=8080, llm="gemini"):
 
-    genai.configure(api_key=TOKEN)
-    gemini_model = genai.GenerativeModel("gemini-1.5-flash")
+    gemini_model = build_llm(llm)
 
     system = AgentSystem()
 
-    user = UserAgent("user", system)
+    # En modo servidor las consultas llegan por HTTP en lugar de por la terminal
+    user = GatewayAgent("user", system) if serve_http else UserAgent("user", system)
     coordinator = CoordinatorAgent("coordinator", system, gemini_model)
     ontology = OntologyAgent("ontology", system, consultar_tragos)
-    embedding = EmbeddingAgent("embedding", system, retrieve)
+    embedding = EmbeddingAgent("embedding", system, retrieve_fused, lexical=True)
     intent_detector = IntentDetectorAgent("intent_detector", system, gemini_model)
-    validator = ValidationAgent("validator", system, gemini_model)
+    # Las celdas evidentes de la matriz de cumplimiento se deciden localmente, sin el modelo.
+    # Sólo por ingredientes y vaso: la regla de similitud no está validada contra el modelo
+    prefilter = ConstraintPrefilter(load_ingredients())
+    validator = ValidationAgent("validator", system, gemini_model, prefilter=prefilter)
     crawler = Crawler_Agent("crawler", system)
     flavor = Flavor_Agent("flavor", system, consultar_tragos)
 
     for agent in [coordinator, ontology, user, intent_detector, embedding, validator, crawler, flavor]:
         system.register_agent(agent)
 
+    if serve_http:
+        server = await serve(user, host, port)
+
     await asyncio.gather(
+        *([server.serve_forever()] if serve_http else []),
         user.run(),
         coordinator.run(),
         ontology.run(),
@@ -98,6 +129,15 @@ async def main():
     )
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sistema multiagente de bartender.")
+    parser.add_argument("--serve", action="store_true", help="Atender consultas por HTTP en lugar de por la terminal")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección del servidor HTTP")
+    parser.add_argument("--port", type=int, default=8080, help="Puerto del servidor HTTP")
+    parser.add_argument("--llm", choices=["gemini", "stub"], default="gemini", help="Modelo de lenguaje a usar")
+    args = parser.parse_args()
+
     ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
     os.chdir(ROOT_DIR)
-    asyncio.run(main())
+    asyncio.run(main(args.serve, args.host, args.port, args.llm))
@@ -1,9 +1,24 @@
 from tests.test_ontology import run_ontology
 from tests.test_embedding import run_embedding
-from tests.test_flavor import run_flavor, generar_formulas
+from tests.test_ann import run_ann
+from tests.test_quantization import run_quantization
+from tests.test_hybrid import run_hybrid, run_fusion
+from tests.test_embedding_cache import run_embedding_cache
+from tests.test_flavor import run_flavor, run_flavor_evaluator, generar_formulas
 from agents.flavor_agent import Flavor_Agent
 from ontology.query_ontology import consultar_tragos
-from tests.test_metaheuristic import test_aco_vs_tabu_multiple_seeds
+from tests.test_metaheuristic import test_aco_vs_tabu_multiple_seeds, run_tabu_benchmark, run_exact_benchmark, run_aco_benchmark, run_portfolio_benchmark
+from tests.test_reindex import run_reindex_scaling
+from tests.test_segment_log import run_segment_log, run_bm25_segments
+from tests.test_dedup import run_dedup
+from tests.test_startup import run_startup
+from tests.test_async_embedding import run_async_embedding
+from tests.test_concurrency import run_concurrency
+from tests.test_server import run_server_load
+from tests.test_llm_cache import run_llm_cache, run_llm_cache_malformed
+from tests.test_llm_overlap import run_llm_overlap
+from tests.test_matrix_batching import run_matrix_batching
+from tests.test_prefilter import run_prefilter, run_prefilter_generic, run_prefilter_compound
 import json
 
 # Ejecutando búsqueda en la ontología con campos aleatorios para 1000 documentos aleatorios
@@ -12,6 +27,21 @@ run_ontology(1000)
 # Ejecutando búsqueda en el embedding con 100 documentos aleatorios, 5 fragmentos por documento de entre 15-20 palabras
 run_embedding(100, 10, 15, 20)
 
+# Comparando el índice aproximado IVF con la búsqueda exacta usando las mismas consultas de muestra
+run_ann(100, 10, 15, 20)
+
+# Comparando memoria, latencia y recall de la búsqueda cuantizada (int8/float16) con la exacta
+run_quantization(100, 10, 15, 20)
+
+# Comparando recall y latencia de la recuperación densa, BM25 e híbrida con fragmentos de 3-6 palabras de 200 chunks
+run_hybrid(200, 3, 6)
+
+# Comprobando la fusión de rankings y que la recuperación multi-query devuelve top-k chunks distintos por query
+run_fusion(4)
+
+# Comprobando la expulsión LRU, la persistencia y la tasa de aciertos de la caché de embeddings con 20000 consultas Zipf
+run_embedding_cache(20000)
+
 # Ejecutando test para agente de sabores
 # Crear agente
 agente = Flavor_Agent("flavor", None, consultar_tragos)
@@ -24,9 +54,69 @@ formulas = generar_formulas(30)  # puedes ajustar el número
 # Ejecutar evaluación del agente de sabor
 run_flavor(agente, formulas, flavor_vectors, k=5)
 
+# Comparando la evaluación cóctel por cóctel con el plan compilado sobre la matriz de sabores
+run_flavor_evaluator(agente, formulas, flavor_vectors)
+
 
 test_aco_vs_tabu_multiple_seeds()
 
+# Comparando la búsqueda tabú vectorizada con la original sobre 200 candidatos y 200 iteraciones
+run_tabu_benchmark(200)
+
+# Comparando la selección exacta con la búsqueda tabú en instancias pequeñas y de 200 candidatos
+run_exact_benchmark(200)
+
+# Midiendo el motor ACO por índices y comprobando que es reentrante con 16 búsquedas en 8 hilos
+run_aco_benchmark(200)
+
+# Comparando una búsqueda tabú con el portafolio Tabu/ACO en paralelo en 10 instancias de 16 restricciones
+run_portfolio_benchmark(10)
+
+# Midiendo el tiempo de arranque con carga perezosa del modelo frente a carga anticipada
+run_startup(3)
+
+# Midiendo cuánto bloquea el agente de embeddings al bucle de asyncio con 16 consultas simultáneas
+run_async_embedding(16)
+
+# Midiendo el rendimiento con 32 peticiones de usuario simultáneas y un modelo de lenguaje simulado
+run_concurrency(32)
+
+# Prueba de carga del servidor HTTP con 64 clientes simultáneos y un modelo de lenguaje simulado
+run_server_load(64)
+
+# Midiendo la caché de respuestas del modelo de lenguaje con 16 peticiones repetidas tras un reinicio
+run_llm_cache(16)
+
+# Comprobando que la caché de prompts no repite respuestas malformadas de la matriz tras un reinicio
+run_llm_cache_malformed(40)
+
+# Midiendo la latencia por petición al solapar la extracción de restricciones con la búsqueda en las fuentes
+run_llm_overlap(8)
+
+# Comparando la matriz de cumplimiento en un solo prompt frente a lotes concurrentes con 120 candidatos
+run_matrix_batching(120)
+
+# Midiendo cuántas celdas de la matriz de cumplimiento decide el prefiltro local sobre 120 candidatos
+run_prefilter(120)
+
+# Comprobando que el prefiltro deja al modelo las restricciones genéricas y las reseñas en texto libre
+run_prefilter_generic()
+
+# Comprobando que las negaciones se aplican a su término y que las restricciones compuestas quedan para el modelo
+run_prefilter_compound()
+
+# Midiendo el escalado del reindexado con 1 a 4 procesos sobre 400 documentos aleatorios
+run_reindex_scaling(4, 400)
+
+# Midiendo la deduplicación de chunks con copias exactas, con otro formato y casi duplicadas de 200 documentos
+run_dedup(200)
+
+# Comprobando el repositorio por segmentos con 4 procesos añadiendo documentos a la vez, compactación e índices tras reindexar
+run_segment_log(4)
+
+# Comprobando que el índice BM25 sólo tokeniza los segmentos nuevos tras añadir un documento o compactar
+run_bm25_segments(200)
+
 # ✅ ¿Por qué ACO siempre da 292?
 # 1. Fitness está altamente dominado por alpha
 # return alpha * num_fuertes + beta * debiles_cumplidas - gamma * len(solution)
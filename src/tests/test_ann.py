@@ -0,0 +1,38 @@
+import time
+import numpy as np
+from tests.test_embedding import muestrear_fragmentos
+from embedding.embedder import get_embeddings, STORE_DIR
+from embedding.segment_log import SegmentLog
+from embedding.ann_index import IVFIndex
+
+def run_ann(n, m, i, j, top_k=5, nprobes=(1, 2, 4, 8, 16, 32)):
+    """
+    Compara el índice IVF contra la búsqueda exacta sobre el repositorio vectorial.
+
+    Las consultas se generan como en `run_embedding`: n documentos aleatorios, m fragmentos
+    por documento de entre i y j palabras, y una pregunta por fragmento. Para cada `nprobe`
+    se reporta el recall@k respecto a la búsqueda exacta y la latencia media por consulta.
+    """
+    fragmentos, _ = muestrear_fragmentos(n, m, i, j)
+    preguntas = [f"What does the following text talk about: '{frag[:30]}...'" for frag in fragmentos]
+    query_vectors = get_embeddings(preguntas)
+
+    store = SegmentLog.open(STORE_DIR)
+
+    start = time.perf_counter()
+    exact, _ = store.search(query_vectors, top_k)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(preguntas)
+
+    start = time.perf_counter()
+    index = IVFIndex(store)
+    build_s = time.perf_counter() - start
+
+    print("\n\n✅ Índice aproximado (IVF) vs búsqueda exacta:")
+    print(f"🔎 Consultas: {len(preguntas)} | Vectores: {len(store)} | Listas: {len(index.centroids)} | Construcción: {build_s:.2f}s")
+    print(f"🎯 Exacta: recall@{top_k} 100.00% | {exact_ms:.3f} ms/consulta")
+    for nprobe in nprobes:
+        start = time.perf_counter()
+        approx, _ = index.search(query_vectors, top_k, nprobe=nprobe)
+        ms = (time.perf_counter() - start) * 1000 / len(preguntas)
+        recall = np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approx.tolist(), exact.tolist())])
+        print(f"📚 nprobe={nprobe:3d}: recall@{top_k} {recall:.2%} | {ms:.3f} ms/consulta")
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from tests.test_embedding import muestrear_fragmentos
+from environment.agent_system import AgentSystem
+from agents.base_agent import BaseAgent
+from agents.embedding_agent import EmbeddingAgent
+from embedding.embedder import query_cache
+from embedding.query_embedding import retrieve_fused
+
+class _Collector(BaseAgent):
+    """Ocupa el lugar del validador y sólo cuenta los resultados recibidos."""
+
+    def __init__(self, name, system, expected):
+        super().__init__(name, system)
+        self.expected = expected
+        self.received = 0
+        self.done = asyncio.Event()
+
+    async def handle(self, message):
+        self.received += 1
+        if self.received >= self.expected:
+            self.done.set()
+
+async def _heartbeat(interval, lags, stop):
+    """Mide cuánto se retrasa un `sleep` corto: es el tiempo que el bucle estuvo bloqueado."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def _run_once(executor, consultas):
+    system = AgentSystem()
+    agent = EmbeddingAgent("embedding", system, retrieve_fused, executor=executor)
+    collector = _Collector("validator", system, len(consultas))
+    for a in (agent, collector):
+        system.register_agent(a)
+    agent.data  # abrir el repositorio fuera de la medición
+    query_cache.clear()
+
+    tasks = [asyncio.create_task(a.run()) for a in (agent, collector)]
+    lags, stop = [], asyncio.Event()
+    monitor = asyncio.create_task(_heartbeat(0.001, lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(system.send_message("coordinator", "embedding", {"query": q}) for q in consultas))
+    await collector.done.wait()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    for task in tasks:
+        task.cancel()
+    if agent._pool is not None:
+        agent._pool.shutdown()
+    return elapsed, max(lags, default=0.0), agent.stats, query_cache.stats()
+
+def run_async_embedding(n=16, queries_per_message=3):
+    """
+    Envía `n` consultas simultáneas al agente de embeddings (cada una con
+    `queries_per_message` queries de muestra) y compara la ejecución dentro del bucle de
+    asyncio con la ejecución en un pool de hilos: tiempo total, lotes formados y el mayor
+    retraso observado por una tarea que late cada milisegundo. Como todas las queries
+    son distintas, la caché de embeddings no debe registrar ningún acierto.
+    """
+    # Muchos documentos no tienen textos largos, así que se muestrean de más
+    fragmentos, _ = muestrear_fragmentos(4 * n, queries_per_message, 15, 20)
+    preguntas = [f"What does the following text talk about: '{frag[:30]}...'" for frag in fragmentos]
+    consultas = [preguntas[k:k + queries_per_message] for k in range(0, len(preguntas), queries_per_message)][:n]
+
+    print("\n\n✅ Agente de embeddings: bucle bloqueado vs pool de hilos:")
+    print(f"🔎 Consultas simultáneas: {len(consultas)} ({queries_per_message} queries cada una)")
+    for executor in (None, "thread"):
+        elapsed, max_lag, stats, cache = asyncio.run(_run_once(executor, consultas))
+        nombre = executor or "en bucle"
+        print(f"⏱️ {nombre:8}: {elapsed * 1000:.1f} ms | {stats['batches']} lote(s) | "
+              f"retraso máximo del bucle {max_lag * 1000:.1f} ms | "
+              f"bloqueo medido {stats['loop_blocked_seconds'] * 1000:.1f} ms")
+        print(f"   {'✅' if cache['hits'] == 0 else '❌'} Caché de embeddings: {cache['hits']} aciertos, "
+              f"{cache['misses']} fallos (tasa de aciertos {cache['hit_rate']:.0%})")
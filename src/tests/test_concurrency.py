@@ -0,0 +1,84 @@
+import asyncio
+import time
+from environment.agent_system import AgentSystem
+from agents.base_agent import BaseAgent
+from agents.coordinator_agent import CoordinatorAgent
+from agents.gateway_agent import GatewayAgent
+from agents.intent_detector_agent import IntentDetectorAgent
+from agents.validator_agent import ValidationAgent
+from llm.client import LLMClient, StubBackend
+
+class _StubSource(BaseAgent):
+    """Fuente de conocimiento simulada (ontología, embedding o sabores)."""
+
+    def __init__(self, name, system, results, latency=0.005):
+        super().__init__(name, system)
+        self.results = results
+        self.latency = latency
+
+    async def handle(self, message):
+        await asyncio.sleep(self.latency)
+        await self.send("validator", {"source": self.name, "results": self.results, "type": "result"},
+                        request_id=message.get("request_id"))
+
+def build_stub_system(latency=0.02, cache=None, source_latency=0.005, prefetch_constraints=True):
+    """
+    Sistema multiagente con el coordinador, el validador y el detector de intenciones reales,
+    el modelo de lenguaje simulado (`StubBackend`) y fuentes de conocimiento simuladas que
+    tardan `source_latency` segundos en responder.
+    Returns:
+        tuple[AgentSystem, GatewayAgent, list[BaseAgent]]: Sistema, agente de entrada y agentes.
+    """
+    system = AgentSystem()
+    model = LLMClient(StubBackend(latency), cache)
+    gateway = GatewayAgent("user", system)
+    agents = [
+        gateway,
+        IntentDetectorAgent("intent_detector", system, model),
+        CoordinatorAgent("coordinator", system, model),
+        ValidationAgent("validator", system, model, prefetch_constraints=prefetch_constraints),
+        _StubSource("ontology", system, [{"Name": "Mojito", "Ingredients": ["Rum", "Mint"]}], source_latency),
+        _StubSource("embedding", system, ["Mojito: rum, mint, lime, sugar, soda."], source_latency),
+        _StubSource("flavor", system, [], source_latency),
+    ]
+    for agent in agents:
+        system.register_agent(agent)
+    return system, gateway, agents
+
+async def _run_sessions(total, concurrency, latency):
+    _, gateway, agents = build_stub_system(latency)
+    tasks = [asyncio.create_task(agent.run()) for agent in agents]
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, mismatches = [], 0
+
+    async def session(k):
+        nonlocal mismatches
+        async with semaphore:
+            text = f"How do I make drink number {k}"
+            start = time.perf_counter()
+            async for response in gateway.submit(text):
+                answer = response["content"]
+            latencies.append(time.perf_counter() - start)
+            mismatches += answer != text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(k) for k in range(total)))
+    elapsed = time.perf_counter() - start
+    for task in tasks:
+        task.cancel()
+    return elapsed, sorted(latencies), mismatches
+
+def run_concurrency(total=32, concurrencies=(1, 8, 32), latency=0.02):
+    """
+    Mide el rendimiento del sistema multiagente con `total` peticiones y distintos niveles
+    de concurrencia, usando un modelo de lenguaje simulado con `latency` segundos por
+    llamada y fuentes de conocimiento simuladas. Reporta peticiones por segundo, latencia
+    mediana por petición y cuántas respuestas llegaron a una petición equivocada.
+    """
+    print("\n\n✅ Conversaciones simultáneas en el sistema multiagente:")
+    print(f"🔎 Peticiones: {total} | Latencia simulada del modelo: {latency * 1000:.0f} ms por llamada")
+    for concurrency in concurrencies:
+        elapsed, latencies, mismatches = asyncio.run(_run_sessions(total, concurrency, latency))
+        print(f"⏱️ {concurrency:3} en curso: {total / elapsed:6.1f} peticiones/s | "
+              f"mediana {latencies[len(latencies) // 2] * 1000:.0f} ms | respuestas cruzadas {mismatches}")
@@ -0,0 +1,64 @@
+import random
+import time
+from embedding.embedder import DATA_DIR, preprocess_document, sliding_window_chunk
+from embedding.dedup import ChunkDeduplicator
+
+def _variantes(chunk, rng):
+    """Copias de un chunk: idéntica, con otro formato (mayúsculas y espacios) y con una palabra cambiada."""
+    words = chunk.split()
+    formato = "  ".join(words).upper()
+    cambiada = list(words)
+    cambiada[rng.randrange(len(cambiada))] = "xyzzy"
+    return {"exacto": chunk, "formato": formato, "casi": " ".join(cambiada)}
+
+def run_dedup(documentos=200, copias=0.2, distancias=(3, 6), seed=0):
+    """
+    Mide `ChunkDeduplicator` sobre chunks reales del corpus a los que se añade una
+    proporción `copias` de duplicados en otros archivos: idénticos, con otro formato
+    (deben colapsar como exactos tras normalizar) y con una palabra cambiada (casi
+    duplicados). Reporta qué proporción de cada tipo se detecta, si sus archivos quedan
+    registrados como fuentes del chunk conservado y el rendimiento, sin detección de casi
+    duplicados y con cada `max_distance` de `distancias`. Los "duplicados propios del
+    corpus" son chunks originales que colapsan entre sí: con distancias grandes incluyen
+    ventanas solapadas de un mismo documento, que no son duplicados.
+    """
+    rng = random.Random(seed)
+    json_files = sorted(DATA_DIR.glob("*.json"))
+    rng.shuffle(json_files)
+    originales = []
+    for file in json_files[:documentos]:
+        originales.extend((chunk, file.name) for chunk in sliding_window_chunk(preprocess_document(file)))
+
+    inyectados = []  # (tipo, texto, fuente, índice del original)
+    for k in rng.sample(range(len(originales)), int(copias * len(originales))):
+        chunk, _ = originales[k]
+        if len(chunk.split()) < 40:
+            continue  # En chunks cortos una palabra cambiada ya no es un casi duplicado
+        for tipo, texto in _variantes(chunk, rng).items():
+            inyectados.append((tipo, texto, f"copia_{tipo}_{k}.json", k))
+    rng.shuffle(inyectados)
+
+    print("\n\n✅ Deduplicación de chunks al indexar:")
+    print(f"📄 Documentos: {documentos} | Chunks originales: {len(originales)} | Copias añadidas: {len(inyectados)}")
+    configuraciones = [("sólo exactos", False, 0)] + [(f"casi duplicados, distancia {d}", True, d) for d in distancias]
+    for nombre, detect_near, max_distance in configuraciones:
+        dedup = ChunkDeduplicator(detect_near=detect_near, max_distance=max_distance or 3)
+        start = time.perf_counter()
+        ids = [dedup.add(chunk, source)[0] for chunk, source in originales]
+        colapsos = len(originales) - len(dedup.sources)  # Duplicados que ya traía el corpus
+        detectados = {tipo: 0 for tipo in ("exacto", "formato", "casi")}
+        con_fuente = 0
+        for tipo, texto, fuente, k in inyectados:
+            cid, is_new = dedup.add(texto, fuente)
+            if not is_new and cid == ids[k]:
+                detectados[tipo] += 1
+                con_fuente += fuente in dedup.sources[cid]
+        elapsed = time.perf_counter() - start
+        s = dedup.stats()
+        por_tipo = {tipo: sum(t == tipo for t, _, _, _ in inyectados) for tipo in detectados}
+        resumen = " | ".join(f"{tipo} {detectados[tipo]}/{por_tipo[tipo]}" for tipo in detectados)
+        print(f"⏱️ {nombre:30}: "
+              f"{s['total'] / elapsed:8.0f} chunks/s | conservados {s['kept']}/{s['total']} (reducción {s['reduction']:.1%}) | "
+              f"duplicados propios del corpus {colapsos}")
+        print(f"   🔍 Copias detectadas: {resumen} | con su archivo como fuente del original "
+              f"{con_fuente}/{sum(detectados.values())} | entradas con alias {len(dedup.aliases())}")
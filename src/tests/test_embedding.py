@@ -3,10 +3,11 @@ import random
 from pathlib import Path
 from sentence_transformers import SentenceTransformer, util
 
-def run_embedding(n, m, i, j):
-
-    # Cargar modelo de embedding
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+def muestrear_fragmentos(n, m, i, j):
+    """
+    Selecciona n documentos al azar de src/data y extrae m fragmentos de entre i y j palabras
+    por documento. Devuelve los fragmentos y el texto completo del que sale cada uno.
+    """
 
     # Paso 1: Seleccionar n documentos JSON al azar de src/data/
     DATA_DIR = Path("src/data")
@@ -37,6 +38,15 @@ def run_embedding(n, m, i, j):
         except Exception as e:
             print(f"⚠️ Error leyendo {file.name}: {e}")
 
+    return fragmentos, fuentes
+
+def run_embedding(n, m, i, j):
+
+    # Cargar modelo de embedding
+    model = SentenceTransformer('all-MiniLM-L6-v2')
+
+    fragmentos, fuentes = muestrear_fragmentos(n, m, i, j)
+
     # Paso 3: Generar preguntas en inglés con plantilla (simulación simple)
     preguntas = [f"What does the following text talk about: '{frag[:30]}...'" for frag in fragmentos]
 
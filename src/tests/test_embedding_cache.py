@@ -0,0 +1,76 @@
+import atexit
+import random
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from embedding.embedding_cache import EmbeddingCache
+
+def _vector(i, dim):
+    return np.random.default_rng(i).normal(size=dim).astype(np.float32)
+
+def _flujo_zipf(consultas, distintas, s, rng):
+    """Consultas con popularidad Zipf (`s`): unas pocas se repiten mucho, como las del detector de intenciones."""
+    pesos = [1 / (r + 1) ** s for r in range(distintas)]
+    return rng.choices(range(distintas), weights=pesos, k=consultas)
+
+def run_embedding_cache(consultas=20000, distintas=5000, tamaños=(64, 256, 1024), dim=384, seed=0):
+    """
+    Comprueba `EmbeddingCache`:
+
+    - Expulsión LRU: al superar `maxsize` sale la entrada usada hace más tiempo, no la
+      insertada primero.
+    - Normalización: la misma consulta con otras mayúsculas o espacios es un acierto.
+    - Persistencia: tras `save` otra caché sobre el mismo archivo recupera los mismos
+      vectores, y si es más pequeña conserva los más recientes.
+    - Tasa de aciertos y tiempo por consulta con un flujo Zipf de `consultas` consultas
+      sobre `distintas` textos, para cada tamaño de `tamaños`.
+    """
+    print("\n\n✅ Caché de embeddings de consultas:")
+
+    cache = EmbeddingCache(maxsize=4)
+    for i in range(4):
+        cache.put(f"consulta {i}", _vector(i, dim))
+    cache.get("consulta 0")
+    cache.put("consulta 4", _vector(4, dim))
+    quedan = [i for i in range(5) if cache.get(f"consulta {i}") is not None]
+    print(f"{'✅' if quedan == [0, 2, 3, 4] else '❌'} Expulsión LRU con maxsize 4: quedan {quedan} (esperado [0, 2, 3, 4])")
+
+    variantes = ["Consulta 2", "  consulta   2 ", "CONSULTA\t2"]
+    aciertos = sum(cache.get(v) is not None for v in variantes)
+    print(f"{'✅' if aciertos == len(variantes) else '❌'} Variantes de formato resueltas desde la caché: {aciertos}/{len(variantes)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "query_cache.pkl"
+        original = EmbeddingCache(maxsize=100, path=path)
+        for i in range(100):
+            original.put(f"consulta {i}", _vector(i, dim))
+        for i in range(10):
+            original.get(f"consulta {i}")  # Las diez primeras pasan a ser las más recientes
+        original.save()
+
+        recargada = EmbeddingCache(maxsize=100, path=path)
+        iguales = sum(np.array_equal(recargada.get(f"consulta {i}"), _vector(i, dim)) for i in range(100))
+        pequeña = EmbeddingCache(maxsize=20, path=path)
+        recientes = sum(pequeña.get(f"consulta {i}") is not None for i in list(range(10)) + list(range(90, 100)))
+        print(f"{'✅' if iguales == 100 else '❌'} Persistencia: {iguales}/100 vectores iguales tras recargar")
+        print(f"{'✅' if recientes == 20 and len(pequeña) == 20 else '❌'} Recarga con maxsize 20: "
+              f"{recientes}/20 de las más recientes, {len(pequeña)} entradas")
+        for c in (original, recargada, pequeña):
+            atexit.unregister(c.save)  # El archivo temporal ya no existirá al salir
+
+    flujo = _flujo_zipf(consultas, distintas, 1.0, random.Random(seed))
+    vectores = {q: _vector(q, dim) for q in set(flujo)}
+    ideal = 1 - len(vectores) / consultas  # Sólo falla la primera vez de cada consulta
+    print(f"📊 Flujo Zipf: {consultas} consultas, {len(vectores)} distintas | tasa de aciertos con caché ilimitada {ideal:.1%}")
+    for maxsize in tamaños:
+        cache = EmbeddingCache(maxsize=maxsize)
+        start = time.perf_counter()
+        for q in flujo:
+            texto = f"consulta {q}"
+            if cache.get(texto) is None:
+                cache.put(texto, vectores[q])
+        elapsed = time.perf_counter() - start
+        s = cache.stats()
+        print(f"⏱️ maxsize {maxsize:5d}: tasa de aciertos {s['hit_rate']:.1%} | {s['size']} entradas | "
+              f"{elapsed / consultas * 1e6:.1f} µs/consulta")
@@ -1,4 +1,6 @@
 import random
+import time
+import numpy as np
 
 def generar_ground_truth(flavor_vectors, formulas, agent):
     truth = {}
@@ -57,6 +59,60 @@ def run_flavor(agent, formulas, flavor_vectors, k=5):
     print(f"🎯 F1-score: {avg_f1:.2%}")
     print(f"📈 Cobertura: {coverage:.2%}")
 
+def run_flavor_evaluator(agent, formulas, flavor_vectors, repeticiones=3):
+    """
+    Compara el recorrido original (cóctel por cóctel, término por término) con el plan
+    compilado de `Flavor_Agent`, que evalúa cada fórmula sobre la matriz de sabores completa.
+
+    Args:
+        agent (Flavor_Agent): Agente de sabores ya construido.
+        formulas (list[str]): Fórmulas a evaluar.
+        flavor_vectors (dict): Vectores de sabor por cóctel.
+        repeticiones (int): Veces que se evalúa cada fórmula con el plan ya compilado.
+    """
+
+    def original(formula):
+        message_dnf = agent.query_to_dnf(formula)
+        valores = {}
+        for name, vector in flavor_vectors.items():
+            max_val = 0.0
+            for clause in agent.get_clauses(message_dnf):
+                min_val = 1.0
+                for term in agent.get_terms(clause):
+                    min_val = min(min_val, agent.evaluate_term(term, vector))
+                max_val = max(max_val, min_val)
+            valores[name] = max_val
+        return valores
+
+    start = time.perf_counter()
+    esperados = {formula: original(formula) for formula in formulas}
+    t_original = (time.perf_counter() - start) / len(formulas)
+
+    agent._plans.clear()
+    start = time.perf_counter()
+    for formula in formulas:
+        agent.evaluate_plan(agent.compile_query(formula))
+    t_compilado = (time.perf_counter() - start) / len(formulas)
+
+    start = time.perf_counter()
+    for _ in range(repeticiones):
+        obtenidos = {formula: agent.evaluate_plan(agent.compile_query(formula)) for formula in formulas}
+    t_plan = (time.perf_counter() - start) / (len(formulas) * repeticiones)
+
+    max_diff = 0.0
+    iguales = 0
+    for formula in formulas:
+        esperado = np.array([esperados[formula][name] for name in agent.names])
+        max_diff = max(max_diff, float(np.abs(esperado - obtenidos[formula]).max()))
+        iguales += set(np.flatnonzero(esperado >= 0.7)) == set(np.flatnonzero(obtenidos[formula] >= 0.7))
+
+    print(f"\n⚡ Evaluador de fórmulas de sabor ({len(agent.names)} cócteles, {len(formulas)} fórmulas):")
+    print(f"🐢 Recorrido original: {t_original * 1000:.2f} ms/fórmula")
+    print(f"🧮 Plan compilado (primera vez): {t_compilado * 1000:.2f} ms/fórmula ({t_original / t_compilado:.1f}x)")
+    print(f"🚀 Plan en caché: {t_plan * 1000:.3f} ms/fórmula ({t_original / t_plan:.1f}x)")
+    print(f"🔍 Diferencia máxima de pertenencia: {max_diff:.2e}")
+    print(f"✅ Resultados idénticos (umbral 0.7): {iguales}/{len(formulas)}")
+
 
 def generar_formulas(n=20):
     sabores = ["dulce", "salado", "amargo", "ácido", "picante"]
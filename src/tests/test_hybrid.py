@@ -0,0 +1,112 @@
+import random
+import tempfile
+import time
+import numpy as np
+from embedding import embedder
+from embedding.embedder import STORE_DIR
+from embedding.embedding_cache import EmbeddingCache
+from embedding.vector_store import VectorStore
+from embedding.segment_log import SegmentLog
+from embedding.bm25 import BM25Index
+from embedding.query_embedding import retrieve_fused, fuse_rankings
+
+def run_hybrid(n, i, j, top_ks=(3, 5, 10)):
+    """
+    Compara la recuperación densa, la léxica (BM25) y la híbrida (RRF de ambas).
+    Toma `n` chunks al azar del repositorio, usa como consulta un fragmento de entre
+    `i` y `j` palabras de cada uno y mide latencia por consulta y recall@k (el chunk de
+    origen aparece entre los k resultados). También reporta el costo de construir,
+    guardar y cargar el índice BM25.
+    """
+    store = SegmentLog.open(STORE_DIR)
+    if len(store) == 0:
+        print("⚠️ Repositorio vacío: ejecuta embed_all_documents primero.")
+        return
+
+    start = time.perf_counter()
+    bm25 = BM25Index.build(store)
+    build_s = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        bm25.save(tmp)
+        start = time.perf_counter()
+        bm25 = BM25Index.load(tmp)
+        load_ms = (time.perf_counter() - start) * 1000
+    postings_mib = (bm25.offsets.nbytes + bm25.doc_ids.nbytes + bm25.weights.nbytes) / 2**20
+
+    consultas, objetivos = [], []
+    for idx in random.sample(range(len(store)), min(n, len(store))):
+        words = store.chunk(idx).split()
+        if len(words) < i:
+            continue
+        length = random.randint(i, min(j, len(words)))
+        start_word = random.randint(0, len(words) - length)
+        consultas.append(" ".join(words[start_word:start_word + length]))
+        objetivos.append(store.chunk(idx))
+
+    print("\n\n✅ Recuperación densa vs BM25 vs híbrida:")
+    print(f"🔎 Consultas: {len(consultas)} | Chunks: {len(store)}")
+    print(f"📦 BM25: {len(bm25.vocab)} términos | postings {postings_mib:.2f} MiB | "
+          f"construcción {build_s:.2f}s | carga {load_ms:.1f} ms")
+
+    for top_k in top_ks:
+        for nombre, lexical, dense in (("densa  ", None, True), ("BM25   ", bm25, False), ("híbrida", bm25, True)):
+            hits = 0
+            start = time.perf_counter()
+            for consulta, objetivo in zip(consultas, objetivos):
+                if dense:
+                    results = [r["text"] for r in retrieve_fused([consulta], store, top_k, lexical=lexical)]
+                else:
+                    indices, _ = lexical.search([consulta], top_k)
+                    results = [store.chunk(int(x)) for x in indices[0] if x >= 0]
+                hits += objetivo in results
+            ms = (time.perf_counter() - start) * 1000 / len(consultas)
+            print(f"🎯 {nombre} top-{top_k:<2}: recall {hits / len(consultas):.2%} | {ms:.2f} ms/consulta")
+
+def run_fusion(consultas=4, top_k=5, dim=32, seed=0):
+    """
+    Comprueba la fusión de rankings y la deduplicación de `retrieve_fused` sin el modelo:
+    los embeddings de las consultas se precargan en una caché de embeddings temporal.
+
+    - `fuse_rankings` ignora los huecos (-1), premia con RRF los chunks que aparecen en
+      varias queries y con "max" conserva la mayor similitud.
+    - `retrieve_fused` devuelve `top_k` chunks por query (en total, `top_k * consultas`),
+      sin textos repetidos aunque el repositorio tenga filas duplicadas, incluye el mejor
+      chunk de cada query y reúne en "sources" los archivos de todas las copias.
+    """
+    indices = np.array([[0, 1, 2], [1, 3, -1]])
+    scores = np.array([[0.9, 0.8, 0.7], [0.95, 0.5, -np.inf]])
+    rrf = fuse_rankings(indices, scores, "rrf")
+    maximo = dict(fuse_rankings(indices, scores, "max"))
+
+    print("\n\n✅ Fusión de rankings y deduplicación de la recuperación multi-query:")
+    print(f"{'✅' if [i for i, _ in rrf] == [1, 0, 3, 2] else '❌'} RRF: orden {[i for i, _ in rrf]} (esperado [1, 0, 3, 2])")
+    print(f"{'✅' if maximo[1] == 0.95 and -1 not in maximo else '❌'} max: similitud del chunk 1 {maximo[1]} (esperada 0.95), huecos ignorados")
+
+    # Repositorio sintético: cada consulta tiene su propio grupo de chunks y cada texto aparece dos veces
+    rng = np.random.default_rng(seed)
+    centros = rng.normal(size=(consultas, dim)).astype(np.float32)
+    records = []
+    for q in range(consultas):
+        for c in range(3 * top_k):
+            vector = centros[q] + 0.3 * rng.normal(size=dim).astype(np.float32)
+            for copia in range(2):
+                records.append({"source": f"doc_{q}_{copia}.json", "chunk": f"chunk {q}-{c}", "embedding": vector})
+    store = VectorStore.from_records(records)
+    preguntas = [f"consulta de prueba {q}" for q in range(consultas)]
+
+    cache, embedder.query_cache = embedder.query_cache, EmbeddingCache(maxsize=consultas)
+    try:
+        for pregunta, centro in zip(preguntas, centros):
+            embedder.query_cache.put(pregunta, centro)
+        results = retrieve_fused(preguntas, store, top_k, per_query_k=2 * top_k)
+    finally:
+        embedder.query_cache = cache
+
+    textos = [r["text"] for r in results]
+    mejores, _ = store.search(centros, 1)
+    cubiertas = sum(store.chunk(int(i)) in textos for i in mejores[:, 0])
+    print(f"{'✅' if len(textos) == top_k * consultas else '❌'} Resultados: {len(textos)} (esperados {top_k} por query x {consultas})")
+    print(f"{'✅' if len(set(textos)) == len(textos) else '❌'} Textos repetidos: {len(textos) - len(set(textos))}")
+    print(f"{'✅' if cubiertas == consultas else '❌'} Queries con su mejor chunk en el resultado: {cubiertas}/{consultas}")
+    con_fuentes = sum(len(r["sources"]) == 2 for r in results)
+    print(f"{'✅' if con_fuentes == len(results) else '❌'} Resultados con las fuentes de sus dos copias: {con_fuentes}/{len(results)}")
@@ -0,0 +1,71 @@
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from llm.prompt_cache import PromptCache
+from tests.test_concurrency import build_stub_system
+
+async def _run_pass(cache, textos, latency):
+    _, gateway, agents = build_stub_system(latency, cache)
+    tasks = [asyncio.create_task(agent.run()) for agent in agents]
+    backend = agents[1].model.backend
+
+    async def ask(text):
+        async for response in gateway.submit(text):
+            answer = response["content"]
+        return answer == text
+
+    start = time.perf_counter()
+    correctas = sum(await asyncio.gather(*(ask(t) for t in textos)))
+    elapsed = time.perf_counter() - start
+    for task in tasks:
+        task.cancel()
+    return elapsed, backend.calls, correctas
+
+def run_llm_cache(peticiones=16, latency=0.05):
+    """
+    Ejecuta dos veces las mismas `peticiones` sobre el sistema con el modelo simulado y la
+    caché de prompts en SQLite: la primera pasada llena la caché y la segunda, con un
+    sistema nuevo (como tras un reinicio), la lee de disco. Reporta tiempo total, llamadas
+    reales al modelo y aciertos de la caché.
+    """
+    textos = [f"How do I make drink number {k}" for k in range(peticiones)]
+    print("\n\n✅ Caché de respuestas del modelo de lenguaje:")
+    print(f"🔎 Peticiones: {peticiones} | Latencia simulada del modelo: {latency * 1000:.0f} ms por llamada")
+    with tempfile.TemporaryDirectory() as tmp:
+        for nombre in ("en frío", "en caliente"):
+            cache = PromptCache(1024, Path(tmp) / "cache.sqlite3", ttl=3600)
+            elapsed, calls, correctas = asyncio.run(_run_pass(cache, textos, latency))
+            stats = cache.stats()
+            print(f"⏱️ {nombre:11}: {elapsed * 1000:.0f} ms | {calls} llamadas al modelo | "
+                  f"aciertos {stats['hits']}/{stats['hits'] + stats['misses']} | respuestas correctas {correctas}/{peticiones}")
+
+async def _matriz(cache, failure_rate, respuestas, restricciones):
+    from agents.validator_agent import ValidationAgent
+    from environment.agent_system import AgentSystem
+    from llm.client import LLMClient, StubBackend
+
+    backend = StubBackend(failure_rate=failure_rate, seed=0)
+    agent = ValidationAgent("validator", AgentSystem(), LLMClient(backend, cache), matrix_batch=5)
+    matriz = await agent.verifica_matriz(respuestas, restricciones)
+    return matriz, backend.calls
+
+def run_llm_cache_malformed(candidatos=40, failure_rate=0.5):
+    """
+    Comprueba que la caché de prompts no guarda las respuestas malformadas de la matriz
+    de cumplimiento: una primera pasada con un modelo que trunca `failure_rate` de sus
+    respuestas y una segunda, tras un "reinicio", con un modelo que responde bien sobre
+    la misma base SQLite. Si los fallos se hubieran guardado, la segunda pasada los
+    repetiría y marcaría esas celdas como incumplidas hasta que caducaran.
+    """
+    respuestas = [f"Cocktail {k}" for k in range(candidatos)]
+    restricciones = ["contains gin", "served cold", "not too sweet"]
+    print("\n\n✅ Caché de prompts con respuestas malformadas de la matriz:")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "cache.sqlite3"
+        for nombre, rate in (("modelo que falla", failure_rate), ("tras reiniciar", 0.0)):
+            matriz, calls = asyncio.run(_matriz(PromptCache(1024, path, ttl=3600), rate, respuestas, restricciones))
+            # El modelo simulado cumple sólo la primera restricción
+            correctas = int((matriz[:, 0] & ~matriz[:, 1:].any(axis=1)).sum())
+            ok = nombre == "modelo que falla" or correctas == candidatos
+            print(f"{'✅' if ok else '❌'} {nombre:16}: {calls} llamadas al modelo | filas correctas {correctas}/{candidatos}")
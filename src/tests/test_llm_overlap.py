@@ -0,0 +1,46 @@
+import asyncio
+import time
+from tests.test_concurrency import build_stub_system
+
+async def _latencies(peticiones, latency, source_latency, prefetch):
+    _, gateway, agents = build_stub_system(latency, source_latency=source_latency, prefetch_constraints=prefetch)
+    tasks = [asyncio.create_task(agent.run()) for agent in agents]
+    latencies, correctas = [], 0
+    # Peticiones de una en una: se mide la latencia de extremo a extremo, no el rendimiento
+    for k in range(peticiones):
+        text = f"How do I make drink number {k}"
+        start = time.perf_counter()
+        async for response in gateway.submit(text):
+            answer = response["content"]
+        latencies.append(time.perf_counter() - start)
+        correctas += answer == text
+    for task in tasks:
+        task.cancel()
+    return sorted(latencies), correctas, list(agents[3].traces)
+
+def _mediana(valores):
+    valores = sorted(valores)
+    return valores[len(valores) // 2]
+
+def run_llm_overlap(peticiones=8, latency=0.05, source_latency=0.05):
+    """
+    Compara la latencia de extremo a extremo de una petición con y sin adelantar la
+    extracción de restricciones del validador, usando un modelo de lenguaje simulado con
+    `latency` segundos por llamada y fuentes de conocimiento que tardan `source_latency`.
+    Con el adelanto, esa llamada al modelo se solapa con la búsqueda en las fuentes.
+
+    La traza del validador muestra, en ms desde la expectativa, cuándo respondieron todas
+    las fuentes, cuándo terminó la extracción y cuánto se esperó a las restricciones una
+    vez completos los candidatos (su coste en el camino crítico).
+    """
+    print("\n\n✅ Solapamiento de llamadas independientes al modelo de lenguaje:")
+    print(f"🔎 Peticiones: {peticiones} | Latencia simulada del modelo: {latency * 1000:.0f} ms por llamada | "
+          f"fuentes: {source_latency * 1000:.0f} ms")
+    for nombre, prefetch in (("secuencial", False), ("solapado", True)):
+        latencies, correctas, traces = asyncio.run(_latencies(peticiones, latency, source_latency, prefetch))
+        print(f"⏱️ {nombre:10}: mediana {_mediana(latencies) * 1000:.0f} ms | "
+              f"máx {latencies[-1] * 1000:.0f} ms | respuestas correctas {correctas}/{peticiones}")
+        print(f"   🧭 traza del validador (medianas): fuentes {_mediana(t['fuentes'] for t in traces):.0f} ms | "
+              f"restricciones {_mediana(t['restricciones'] for t in traces):.0f} ms | "
+              f"espera tras las fuentes {_mediana(t['restricciones_disponibles'] - t['fuentes'] for t in traces):.0f} ms | "
+              f"fin {_mediana(t['fin'] for t in traces):.0f} ms")
@@ -0,0 +1,41 @@
+import asyncio
+import random
+import time
+import numpy as np
+from environment.agent_system import AgentSystem
+from agents.validator_agent import ValidationAgent
+from llm.client import LLMClient, StubBackend
+
+def _candidatos(n, rng):
+    palabras = ["rum", "mint", "lime", "sugar", "soda", "gin", "tonic", "vodka", "orange", "bitters", "ice", "shake"]
+    return [f"Drink {k}: " + " ".join(rng.choice(palabras) for _ in range(16)) for k in range(n)]
+
+async def _evaluar(candidatos, restricciones, batch, concurrency, failure_rate, latency, latency_per_kchar):
+    backend = StubBackend(latency, latency_per_kchar, failure_rate, seed=1)
+    agent = ValidationAgent("validator", AgentSystem(), LLMClient(backend),
+                            matrix_batch=batch, matrix_concurrency=concurrency)
+    start = time.perf_counter()
+    matriz = await agent.verifica_matriz(candidatos, restricciones)
+    return time.perf_counter() - start, backend.calls, matriz
+
+def run_matrix_batching(candidatos=120, restricciones=6, failure_rate=0.2, latency=0.05, latency_per_kchar=0.02):
+    """
+    Compara la verificación de la matriz de cumplimiento en una sola consulta con la
+    verificación por lotes concurrentes, usando un modelo simulado cuya latencia crece con
+    la longitud de la respuesta y que trunca una fracción `failure_rate` de las salidas.
+    Reporta tiempo, llamadas al modelo y filas evaluadas correctamente (en el simulador la
+    fila correcta cumple sólo la primera restricción).
+    """
+    rng = random.Random(0)
+    textos = _candidatos(candidatos, rng)
+    nombres = [f"restricción {k}" for k in range(restricciones)]
+    esperada = np.zeros(restricciones, dtype=bool)
+    esperada[0] = True
+
+    print("\n\n✅ Matriz de cumplimiento por lotes concurrentes:")
+    print(f"🔎 Candidatos: {candidatos} | Restricciones: {restricciones} | "
+          f"Salidas truncadas: {failure_rate:.0%} | Latencia: {latency * 1000:.0f} ms + {latency_per_kchar * 1000:.0f} ms/1000 caracteres")
+    for nombre, batch, concurrency in (("un prompt", None, 1), ("lotes de 10 x 4", 10, 4), ("lotes de 10 x 8", 10, 8)):
+        elapsed, calls, matriz = asyncio.run(_evaluar(textos, nombres, batch, concurrency, failure_rate, latency, latency_per_kchar))
+        correctas = int((matriz == esperada).all(axis=1).sum())
+        print(f"⏱️ {nombre:16}: {elapsed * 1000:6.0f} ms | {calls:3} llamadas | filas correctas {correctas}/{candidatos} | forma {matriz.shape}")
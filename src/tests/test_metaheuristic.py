@@ -56,3 +56,183 @@ def test_aco_vs_tabu_multiple_seeds():
     print(f"Empates: {empate}")
     print(f"Promedio ACO:  {sum(scores_aco)/len(scores_aco):.2f}")
     print(f"Promedio Tabu: {sum(scores_tabu)/len(scores_tabu):.2f}")
+
+def run_tabu_benchmark(num_candidates=200, num_fuertes=4, num_debiles=4, max_iters=200, seeds=5):
+    """
+    Compara la búsqueda tabú vectorizada (puntuación incremental de todo el vecindario con
+    NumPy) con la evaluación original vecino a vecino, sobre matrices aleatorias. Con la
+    misma semilla ambas deben devolver la misma solución y puntuación.
+    """
+    import time
+
+    restrictions = {
+        "fuertes": [f"F{i}" for i in range(num_fuertes)],
+        "débiles": [f"D{i}" for i in range(num_debiles)],
+    }
+    candidates = [f"Cocktail_{i}" for i in range(num_candidates)]
+    tiempos = {False: 0.0, True: 0.0}
+    iguales = 0
+
+    for seed in range(seeds):
+        rng = random.Random(seed)
+        # Matriz dispersa: cada candidato cumple pocas restricciones, como en la práctica
+        matriz = [[rng.random() < 0.15 for _ in range(num_fuertes + num_debiles)] for _ in range(num_candidates)]
+        resultados = {}
+        for vectorized in (False, True):
+            random.seed(seed)
+            tabu = TabuSearchSelector(alpha=10, beta=1, gamma=2, max_iters=max_iters, vectorized=vectorized)
+            start = time.perf_counter()
+            resultados[vectorized] = tabu.select(candidates, restrictions, matriz)
+            tiempos[vectorized] += time.perf_counter() - start
+        iguales += resultados[False][0] == resultados[True][0] and resultados[False][1] == resultados[True][1]
+
+    print("\n\n✅ Búsqueda tabú vectorizada frente a la evaluación vecino a vecino:")
+    print(f"🔎 Candidatos: {num_candidates} | Restricciones: {num_fuertes} fuertes, {num_debiles} débiles | "
+          f"Iteraciones: {max_iters} | Semillas: {seeds}")
+    print(f"⏱️ Original:    {tiempos[False] / seeds * 1000:8.1f} ms por búsqueda")
+    print(f"⏱️ Vectorizada: {tiempos[True] / seeds * 1000:8.1f} ms por búsqueda "
+          f"({tiempos[False] / tiempos[True]:.0f}x) | mismo resultado en {iguales}/{seeds}")
+
+def run_exact_benchmark(seeds=200, num_candidates=200, num_fuertes=4, num_debiles=4):
+    """
+    Compara la selección exacta (programación dinámica sobre máscaras de cobertura) con la
+    búsqueda tabú de 200 iteraciones que usaba el validador. En las instancias pequeñas
+    (10 candidatos, como `test_aco_vs_tabu_multiple_seeds`) se comprueba además la
+    optimalidad contra la enumeración de todos los subconjuntos.
+    """
+    import time
+    from itertools import combinations
+    from utils.metaheuristic import ExactCoverSelector
+
+    print("\n\n✅ Selección exacta frente a la búsqueda tabú:")
+    casos = (("pequeñas", 10, 3, 2, 100, seeds), ("grandes", num_candidates, num_fuertes, num_debiles, 10, max(1, seeds // 20)))
+    for nombre, n, fuertes, debiles, alpha, repeticiones in casos:
+        restrictions = {"fuertes": [f"F{i}" for i in range(fuertes)], "débiles": [f"D{i}" for i in range(debiles)]}
+        candidates = [f"Cocktail_{i}" for i in range(n)]
+        tiempos = {"tabu": 0.0, "exacta": 0.0}
+        mejor_exacta = peor_exacta = no_optima = 0
+
+        for seed in range(repeticiones):
+            rng = random.Random(seed)
+            densidad = 0.5 if n <= 10 else 0.15
+            matriz = [[int(rng.random() < densidad) for _ in range(fuertes + debiles)] for _ in range(n)]
+
+            random.seed(seed)
+            tabu = TabuSearchSelector(alpha=alpha, beta=1, gamma=2, max_iters=200)
+            start = time.perf_counter()
+            _, score_tabu = tabu.select(candidates, restrictions, matriz)
+            tiempos["tabu"] += time.perf_counter() - start
+
+            exacta = ExactCoverSelector(alpha=alpha, beta=1, gamma=2)
+            start = time.perf_counter()
+            _, score_exacta = exacta.select(candidates, restrictions, matriz)
+            tiempos["exacta"] += time.perf_counter() - start
+
+            mejor_exacta += score_exacta > score_tabu
+            peor_exacta += score_exacta < score_tabu
+            if n <= 10:
+                optimo = max(tabu.evaluate(list(s), matriz, fuertes, debiles)
+                             for k in range(1, n + 1) for s in combinations(range(n), k))
+                no_optima += score_exacta != optimo
+
+        print(f"🔎 Instancias {nombre}: {repeticiones} | Candidatos: {n} | Restricciones: {fuertes} fuertes, {debiles} débiles")
+        print(f"⏱️ Tabu (200 iteraciones): {tiempos['tabu'] / repeticiones * 1000:7.2f} ms | "
+              f"Exacta: {tiempos['exacta'] / repeticiones * 1000:7.2f} ms")
+        print(f"   Exacta mejor que Tabu en {mejor_exacta}, peor en {peor_exacta}"
+              + (f" | distinta del óptimo por enumeración en {no_optima}" if n <= 10 else ""))
+
+def run_aco_benchmark(num_candidates=200, num_fuertes=4, num_debiles=4, busquedas=16):
+    """
+    Mide el motor ACO por índices sobre `busquedas` instancias aleatorias y comprueba que es
+    reentrante: ejecutadas a la vez en varios hilos, las búsquedas devuelven exactamente lo
+    mismo que una a una con la misma semilla.
+    """
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from utils.aco_metaheuristic import ACOSelector
+
+    restrictions = {"fuertes": [f"F{i}" for i in range(num_fuertes)], "débiles": [f"D{i}" for i in range(num_debiles)]}
+    instancias = []
+    for seed in range(busquedas):
+        rng = random.Random(seed)
+        candidates = [f"Cocktail_{seed}_{i}" for i in range(num_candidates)]
+        matriz = [[int(rng.random() < 0.3) for _ in range(num_fuertes + num_debiles)] for _ in range(num_candidates)]
+        instancias.append((seed, candidates, matriz))
+
+    def buscar(instancia):
+        seed, candidates, matriz = instancia
+        return ACOSelector(seed=seed).select(candidates, restrictions, matriz)
+
+    start = time.perf_counter()
+    secuenciales = [buscar(instancia) for instancia in instancias]
+    elapsed = time.perf_counter() - start
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        simultaneas = list(pool.map(buscar, instancias))
+    iguales = sum(a == b for a, b in zip(secuenciales, simultaneas))
+    validas = 0
+    for (_, candidates, matriz), (solucion, _) in zip(instancias, secuenciales):
+        filas = [matriz[candidates.index(c)] for c in solucion]
+        validas += all(any(fila[j] for fila in filas) for j in range(num_fuertes))
+
+    print("\n\n✅ ACO por índices:")
+    print(f"🔎 Búsquedas: {busquedas} | Candidatos: {num_candidates} | Restricciones: {num_fuertes} fuertes, {num_debiles} débiles")
+    print(f"⏱️ {elapsed / busquedas * 1000:.1f} ms por búsqueda | cubren todas las fuertes {validas}/{busquedas} | "
+          f"mismo resultado en 8 hilos simultáneos {iguales}/{busquedas}")
+
+def run_portfolio_benchmark(instancias=10, num_candidates=200, num_fuertes=8, num_debiles=8, budgets=(0.25, 0.02)):
+    """
+    Compara una sola búsqueda tabú (lo que hacía el validador) con el portafolio de
+    búsquedas Tabu/ACO en un pool de procesos, en instancias con demasiadas restricciones
+    para la selección exacta. Reporta puntaje medio, latencia máxima por selección, la
+    proporción de selecciones ganadas por cada estrategia y las búsquedas descartadas por
+    el límite de tiempo. También mide la primera selección con un pool nuevo que arranca
+    sus procesos con `spawn` (como en Windows y macOS): debe puntuar igual que con el pool
+    ya arrancado y sin descartes.
+    """
+    import time
+    import multiprocessing
+    from utils.portfolio import PortfolioRunner
+
+    restrictions = {"fuertes": [f"F{i}" for i in range(num_fuertes)], "débiles": [f"D{i}" for i in range(num_debiles)]}
+    candidates = [f"Cocktail_{i}" for i in range(num_candidates)]
+    matrices = []
+    for seed in range(instancias):
+        rng = random.Random(seed)
+        matrices.append([[int(rng.random() < 0.1) for _ in range(num_fuertes + num_debiles)] for _ in range(num_candidates)])
+
+    print("\n\n✅ Portafolio de metaheurísticas con arranques múltiples:")
+    print(f"🔎 Instancias: {instancias} | Candidatos: {num_candidates} | Restricciones: {num_fuertes} fuertes, {num_debiles} débiles")
+
+    scores, latencias = [], []
+    for seed, matriz in enumerate(matrices):
+        start = time.perf_counter()
+        scores.append(TabuSearchSelector(alpha=10, beta=1, gamma=2, max_iters=200, seed=seed).select(candidates, restrictions, matriz)[1])
+        latencias.append(time.perf_counter() - start)
+    print(f"⏱️ Tabu, un arranque        : puntaje medio {sum(scores) / instancias:6.2f} | latencia máx {max(latencias) * 1000:6.1f} ms")
+
+    for budget in budgets:
+        portfolio = PortfolioRunner(alpha=10, beta=1, gamma=2, budget=budget, seed=0)
+        portfolio.warm_up()  # Arranca los procesos fuera de la medición
+        scores, latencias = [], []
+        for matriz in matrices:
+            start = time.perf_counter()
+            scores.append(portfolio.select(candidates, restrictions, matriz)[1])
+            latencias.append(time.perf_counter() - start)
+        stats = portfolio.stats()
+        portfolio.shutdown()
+        ganadas = ", ".join(f"{s} {rate:.0%}" for s, rate in stats["win_rate"].items())
+        arranques = ", ".join(f"{s} {k}" for s, k in portfolio.last_plan.items())
+        print(f"⏱️ Portafolio x{portfolio.starts}, {budget * 1000:4.0f} ms: puntaje medio {sum(scores) / instancias:6.2f} | "
+              f"latencia máx {max(latencias) * 1000:6.1f} ms | ganadas: {ganadas} | últimos arranques: {arranques} | "
+              f"descartadas {stats['timeouts']}")
+
+    frio = PortfolioRunner(alpha=10, beta=1, gamma=2, budget=budgets[0], seed=0, mp_context=multiprocessing.get_context("spawn"))
+    start = time.perf_counter()
+    _, puntaje_frio = frio.select(candidates, restrictions, matrices[0])
+    latencia_frio = time.perf_counter() - start
+    descartes_frio = frio.stats()["timeouts"]
+    _, puntaje_caliente = frio.select(candidates, restrictions, matrices[0])
+    frio.shutdown()
+    ok = puntaje_frio >= puntaje_caliente - 1e-9 and descartes_frio == 0
+    print(f"{'✅' if ok else '❌'} Primera selección con spawn: {latencia_frio * 1000:6.1f} ms con el arranque | "
+          f"puntaje {puntaje_frio:.0f} (con el pool arrancado {puntaje_caliente:.0f}) | descartadas {descartes_frio}")
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+from environment.agent_system import AgentSystem
+from agents.validator_agent import ValidationAgent
+from llm.client import LLMClient, StubBackend
+from utils.constraint_prefilter import ConstraintPrefilter, load_ingredients
+
+RESTRICCIONES = ["contains gin", "without rum", "served in a coupe", "uses lime"]
+
+def _candidatos(n, agent):
+    """Mitad fichas de la ontología (nombre, vaso, ingredientes), mitad reseñas en texto libre."""
+    DATA_DIR = Path("src/data")
+    json_files = list(DATA_DIR.glob("*.json"))
+    random.Random(0).shuffle(json_files)
+    candidatos = []
+    for file in json_files[:n // 2]:
+        with open(file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        candidatos.append(agent.stringify_candidate({k: data.get(k) for k in ("Name", "Glass", "Ingredients")}))
+        candidatos.append(f"{data.get('Name')}: {data.get('Review') or data.get('History') or ''}")
+    return candidatos
+
+async def _evaluar(candidatos, prefilter, latency, latency_per_kchar):
+    backend = StubBackend(latency, latency_per_kchar)
+    agent = ValidationAgent("validator", AgentSystem(), LLMClient(backend), prefilter=prefilter)
+    start = time.perf_counter()
+    known = values = None
+    if prefilter is not None:
+        known, values = prefilter.prefill(candidatos, RESTRICCIONES)
+        keep = prefilter.keep(known, values)
+        candidatos = [candidatos[i] for i in keep]
+        known, values = known[keep], values[keep]
+    matriz = await agent.verifica_matriz(candidatos, RESTRICCIONES, known, values)
+    elapsed = time.perf_counter() - start
+    decididas = int(known.sum()) if known is not None else 0
+    return elapsed, backend.calls, backend.prompt_chars, matriz.shape[0], decididas
+
+def run_prefilter(candidatos=120, latency=0.05, latency_per_kchar=0.02):
+    """
+    Compara la matriz de cumplimiento con y sin el prefiltro local (sólo la comprobación por
+    ingredientes de la ontología, sin embeddings) sobre fichas y reseñas de tragos reales,
+    con un modelo simulado cuya latencia crece con la longitud de la respuesta. Reporta
+    tiempo, llamadas y caracteres enviados al modelo, candidatos evaluados y celdas
+    decididas localmente.
+    """
+    agent = ValidationAgent("validator", AgentSystem(), None)
+    textos = _candidatos(candidatos, agent)
+    prefilter = ConstraintPrefilter(load_ingredients())
+    celdas = len(textos) * len(RESTRICCIONES)
+
+    print("\n\n✅ Prefiltro local de la matriz de cumplimiento:")
+    print(f"🔎 Candidatos: {len(textos)} | Restricciones: {RESTRICCIONES}")
+    for nombre, filtro in (("sin prefiltro", None), ("con prefiltro", prefilter)):
+        elapsed, calls, chars, filas, decididas = asyncio.run(_evaluar(textos, filtro, latency, latency_per_kchar))
+        print(f"⏱️ {nombre:13}: {elapsed * 1000:5.0f} ms | {calls:2} llamadas | {chars:6} caracteres de prompt | "
+              f"candidatos {filas}/{len(textos)} | celdas decididas localmente {decididas}/{celdas}")
+
+GENERICAS = ["a refreshing drink", "something with fruit", "spirit forward", "a sour cocktail", "not too sweet"]
+ESPECIFICAS = ["contains gin", "sin ron", "served in a coupe"]
+
+def run_prefilter_generic():
+    """
+    Comprueba que el prefiltro no decide celdas que no le corresponden: restricciones
+    genéricas que no nombran ningún ingrediente ni vaso, y reseñas en texto libre que
+    mencionan un ingrediente sin contenerlo. Las fichas de la ontología sí se deciden.
+    """
+    prefilter = ConstraintPrefilter(load_ingredients())
+    ficha = "Name: Mojito | Glass: Collins glass | Ingredients: White rum, Lime, Sugar syrup, Mint, Soda water"
+    daiquiri = "Name: Daiquiri | Glass: Coupe glass | Ingredients: White rum, Lime juice, Sugar syrup"
+    resena = "Gin Basil Smash: unlike gin cocktails of the old school it has no juniper, just rum and basil"
+
+    known, values = prefilter.prefill([ficha, resena], GENERICAS)
+    print("\n\n✅ Prefiltro con restricciones genéricas y texto libre:")
+    print(f"{'✅' if not known.any() else '❌'} Celdas decididas con restricciones genéricas: {int(known.sum())}/{known.size}")
+    print(f"{'✅' if len(prefilter.keep(known, values)) == 2 else '❌'} Candidatos conservados: {len(prefilter.keep(known, values))}/2")
+
+    known, values = prefilter.prefill([ficha, daiquiri, resena], ESPECIFICAS)
+    # Ninguno lleva gin, ambos llevan ron y sólo el daiquiri se sirve en copa
+    esperado = [[False, False, False], [False, False, True]]
+    obtenido = [[bool(v) for v in fila] for fila in values[:2]]
+    ok_fichas = bool(known[:2].all()) and obtenido == esperado
+    print(f"{'✅' if ok_fichas else '❌'} Fichas decididas por ingredientes y vaso: {obtenido} (esperado {esperado})")
+    print(f"{'✅' if not known[2].any() else '❌'} Celdas decididas en la reseña: {int(known[2].sum())}/{len(ESPECIFICAS)}")
+
+# (restricción, valor esperado para el gimlet o None si debe quedar para el modelo)
+COMPUESTAS = [
+    ("Contains gin, not vodka", None),
+    ("Should contain gin and not be too sweet", None),
+    ("Contains gin and vermouth", None),
+    ("Debe llevar ginebra y vermut", None),
+    ("gin served in a coupe", None),
+    ("not without gin", None),
+    ("Does not contain vodka", True),
+    ("Must not contain any gin", False),
+    ("gin-free", False),
+    ("Debe llevar ginebra", True),
+    ("Sin vermut", True),
+]
+
+def run_prefilter_compound():
+    """
+    Comprueba que cada negación se aplica al término que gobierna y que las restricciones
+    con varios términos o con otras exigencias quedan inciertas, sobre una ficha de Gimlet
+    (gin y lima). Una celda decidida por error nunca llega al modelo y puede descartar al
+    candidato con `keep`.
+    """
+    prefilter = ConstraintPrefilter(load_ingredients())
+    gimlet = "Name: Gimlet | Glass: Cocktail glass | Ingredients: Gin, Lime juice"
+    restricciones = [r for r, _ in COMPUESTAS]
+    known, values = prefilter.prefill([gimlet], restricciones)
+
+    print("\n\n✅ Prefiltro con negaciones y restricciones compuestas:")
+    correctas = 0
+    for j, (restriccion, esperado) in enumerate(COMPUESTAS):
+        obtenido = bool(values[0, j]) if known[0, j] else None
+        correctas += obtenido == esperado
+        print(f"{'✅' if obtenido == esperado else '❌'} {restriccion!r}: {obtenido} (esperado {esperado})")
+    print(f"{'✅' if correctas == len(COMPUESTAS) else '❌'} Celdas correctas: {correctas}/{len(COMPUESTAS)}")
@@ -0,0 +1,35 @@
+import time
+import numpy as np
+from tests.test_embedding import muestrear_fragmentos
+from embedding.embedder import get_embeddings, STORE_DIR
+from embedding.segment_log import SegmentLog
+from embedding.quantization import QuantizedIndex
+
+def run_quantization(n, m, i, j, top_k=5, rerank_factors=(1, 4)):
+    """
+    Compara la búsqueda exacta float32 con la búsqueda cuantizada (int8 y float16) más
+    re-puntuación exacta. Reporta memoria de la matriz, latencia por consulta y recall@k
+    respecto a la búsqueda exacta, usando las mismas consultas de muestra que `run_embedding`.
+    """
+    fragmentos, _ = muestrear_fragmentos(n, m, i, j)
+    preguntas = [f"What does the following text talk about: '{frag[:30]}...'" for frag in fragmentos]
+    query_vectors = get_embeddings(preguntas)
+
+    store = SegmentLog.open(STORE_DIR)
+    float_bytes = len(store) * store.rows([0]).shape[1] * 4 if len(store) else 0
+
+    start = time.perf_counter()
+    exact, _ = store.search(query_vectors, top_k)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(preguntas)
+
+    print("\n\n✅ Búsqueda cuantizada vs búsqueda exacta:")
+    print(f"🔎 Consultas: {len(preguntas)} | Vectores: {len(store)}")
+    print(f"🎯 float32 exacta   : {float_bytes / 2**20:7.2f} MiB | {exact_ms:.3f} ms/consulta | recall@{top_k} 100.00%")
+    for dtype in ("int8", "float16"):
+        for factor in rerank_factors:
+            index = QuantizedIndex(store, dtype, rerank_factor=factor)
+            start = time.perf_counter()
+            approx, _ = index.search(query_vectors, top_k)
+            ms = (time.perf_counter() - start) * 1000 / len(preguntas)
+            recall = np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approx.tolist(), exact.tolist())])
+            print(f"📦 {dtype:7} x{factor} rerank: {index.nbytes / 2**20:7.2f} MiB | {ms:.3f} ms/consulta | recall@{top_k} {recall:.2%}")
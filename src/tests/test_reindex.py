@@ -0,0 +1,33 @@
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from embedding.embedder import embed_all_documents, DATA_DIR
+
+def run_reindex_scaling(max_workers=4, docs=400):
+    """
+    Mide cómo escala el reindexado del corpus al repartirlo entre 1..max_workers procesos.
+    Cada configuración indexa los mismos `docs` documentos aleatorios en un repositorio temporal.
+    """
+    json_files = sorted(DATA_DIR.glob("*.json"))
+    random.shuffle(json_files)
+    json_files = json_files[:docs]
+
+    workers_list = sorted({1, *[w for w in (2, 4, 8, 16) if w <= max_workers], max_workers})
+    resultados = []
+    for workers in workers_list:
+        store_dir = Path(tempfile.mkdtemp()) / "store"
+        start = time.perf_counter()
+        chunks = embed_all_documents(files=json_files, workers=workers, store_dir=store_dir)
+        elapsed = time.perf_counter() - start
+        resultados.append((workers, chunks, elapsed))
+        shutil.rmtree(store_dir.parent, ignore_errors=True)
+
+    base = resultados[0][2]
+    print("\n\n✅ Escalado del reindexado por procesos:")
+    print(f"📄 Documentos: {len(json_files)}")
+    for workers, chunks, elapsed in resultados:
+        speedup = base / elapsed
+        print(f"⚙️ {workers:2d} proceso(s): {elapsed:6.1f}s | {chunks / elapsed:7.1f} chunks/s | "
+              f"aceleración x{speedup:.2f} | eficiencia {speedup / workers:.0%}")
@@ -0,0 +1,138 @@
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from embedding.segment_log import SegmentLog
+from embedding.ann_index import IVFIndex
+from embedding.quantization import QuantizedIndex
+from embedding.bm25 import BM25Index
+
+DIM = 16
+
+def _lote(proceso, documento, chunks):
+    rng = np.random.default_rng(1000 * proceso + documento)
+    textos = [f"p{proceso}-d{documento}-c{c}" for c in range(chunks)]
+    return rng.normal(size=(chunks, DIM)).astype(np.float32), textos, [f"doc_{proceso}_{documento}.json"] * chunks
+
+def _indexar(path, proceso, documentos, chunks, max_segments):
+    """Un proceso que indexa sus documentos uno a uno, como `embed_new_document`."""
+    log = SegmentLog(path, max_segments)
+    for documento in range(documentos):
+        log.append(*_lote(proceso, documento, chunks))
+    return documentos * chunks
+
+def run_segment_log(procesos=4, documentos=20, chunks=5, max_segments=4):
+    """
+    Comprueba el repositorio por segmentos con varios procesos escribiendo a la vez:
+
+    - `procesos` procesos añaden `documentos` segmentos cada uno sobre el mismo manifiesto,
+      con compactaciones frecuentes (`max_segments`); al final no debe faltar ningún chunk.
+    - Un lector abierto antes de las escrituras ve todo tras `refresh`.
+    - `compact` deja un solo segmento con los mismos chunks en el mismo orden.
+    - Tras un reindexado completo del mismo tamaño (`replace=True`), `refresh` de los
+      índices IVF y cuantizado da lo mismo que construirlos desde cero; tras añadir un
+      segmento, sólo se extienden.
+    """
+    with tempfile.TemporaryDirectory() as path:
+        lector = SegmentLog.open(path)
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            esperados = sum(pool.map(_indexar, [path] * procesos, range(procesos), [documentos] * procesos,
+                                     [chunks] * procesos, [max_segments] * procesos))
+        elapsed = time.perf_counter() - start
+
+        lector.refresh()
+        textos = [lector.chunk(i) for i in range(len(lector))]
+        faltan = {f"p{p}-d{d}-c{c}" for p in range(procesos) for d in range(documentos) for c in range(chunks)} - set(textos)
+
+        print("\n\n✅ Repositorio por segmentos con escritores concurrentes:")
+        print(f"🔎 Procesos: {procesos} | Segmentos añadidos: {procesos * documentos} | Compactación a partir de {max_segments} segmentos")
+        print(f"⏱️ Escritura: {elapsed * 1000:.0f} ms | segmentos vivos {len(lector.segment_names)} | generación {lector.generation}")
+        print(f"{'✅' if len(textos) == esperados and not faltan else '❌'} Chunks tras refresh del lector: {len(textos)}/{esperados} "
+              f"| perdidos {len(faltan)} | repetidos {len(textos) - len(set(textos))}")
+
+        lector.compact()
+        lector.refresh()
+        compactados = [lector.chunk(i) for i in range(len(lector))]
+        print(f"{'✅' if len(lector.segment_names) == 1 and compactados == textos else '❌'} Compactación: "
+              f"{len(lector.segment_names)} segmento(s), mismos chunks en el mismo orden: {compactados == textos}")
+
+        # Cada índice envuelve su propio repositorio, como en el agente de embeddings
+        ivf = IVFIndex(SegmentLog.open(path))
+        quantized = QuantizedIndex(SegmentLog.open(path), "int8")
+        escritor = SegmentLog.open(path)
+        with escritor.segment_writer(replace=True) as writer:
+            writer.add(*_lote(procesos, 0, len(lector)))
+        ivf.refresh()
+        quantized.refresh()
+        ivf_ok = np.array_equal(ivf.assignments, ivf._assign(np.asarray(ivf.vectors)))
+        codes_ok = np.array_equal(quantized.codes, QuantizedIndex(SegmentLog.open(path), "int8").codes)
+        print(f"{'✅' if ivf_ok and codes_ok else '❌'} Índices tras reindexado del mismo tamaño: "
+              f"asignaciones IVF al día {ivf_ok} | códigos int8 al día {codes_ok}")
+
+        escritor.append(*_lote(procesos, 1, chunks))
+        ivf.refresh()
+        quantized.refresh()
+        total = len(SegmentLog.open(path))
+        extendidos = len(ivf.assignments) == len(quantized.codes) == total
+        print(f"{'✅' if extendidos else '❌'} Índices tras añadir un segmento: {len(ivf.assignments)} asignaciones, "
+              f"{len(quantized.codes)} códigos, {total} chunks")
+
+def _iguales(a, b):
+    return (a.vocab == b.vocab and a.num_docs == b.num_docs and np.array_equal(a.offsets, b.offsets)
+            and np.array_equal(a.doc_ids, b.doc_ids) and np.allclose(a.weights, b.weights))
+
+def run_bm25_segments(documentos=200, chunks=10, palabras=40, seed=0):
+    """
+    Comprueba el índice BM25 por segmentos sobre `documentos` segmentos de `chunks` chunks
+    de texto aleatorio:
+
+    - Tras añadir un documento sólo se tokeniza su segmento, y el índice resultante es
+      idéntico al construido desde cero; se compara el tiempo de ambos.
+    - Otro proceso (sin índice previo en memoria) carga los términos de disco sin tokenizar.
+    - Tras compactar se tokeniza sólo el segmento compactado y se borran de disco los
+      términos de los segmentos fusionados.
+    """
+    rng = random.Random(seed)
+    vocabulario = [f"w{k}" for k in range(5000)]
+
+    def lote():
+        textos = [" ".join(rng.choices(vocabulario, k=palabras)) for _ in range(chunks)]
+        vectores = np.random.default_rng(rng.getrandbits(32)).normal(size=(chunks, DIM)).astype(np.float32)
+        return vectores, textos, ["doc.json"] * chunks
+
+    with tempfile.TemporaryDirectory() as path:
+        log = SegmentLog(path, max_segments=documentos + 1)
+        for _ in range(documentos):
+            log.append(*lote())
+        log.refresh()
+        bm25_dir = Path(path) / "bm25"
+        indice = BM25Index.for_store(log, bm25_dir)
+
+        log.append(*lote())
+        log.refresh()
+        start = time.perf_counter()
+        incremental = BM25Index.for_store(log, bm25_dir, previous=indice)
+        t_incremental = time.perf_counter() - start
+        start = time.perf_counter()
+        completo = BM25Index.build(log)
+        t_completo = time.perf_counter() - start
+        desde_disco = BM25Index.for_store(log, bm25_dir)
+
+        print("\n\n✅ Índice BM25 por segmentos:")
+        print(f"🔎 Segmentos: {len(log.segment_names)} | Chunks: {len(log)}")
+        print(f"{'✅' if incremental.tokenized == 1 and _iguales(incremental, completo) else '❌'} Tras añadir un documento: "
+              f"{incremental.tokenized} segmento(s) tokenizado(s) en {t_incremental * 1000:.0f} ms "
+              f"(desde cero {t_completo * 1000:.0f} ms) | idéntico al índice completo {_iguales(incremental, completo)}")
+        print(f"{'✅' if desde_disco.tokenized == 0 and _iguales(desde_disco, completo) else '❌'} Otro proceso: "
+              f"{desde_disco.tokenized} segmento(s) tokenizado(s), términos leídos de disco")
+
+        log.compact()
+        log.refresh()
+        compactado = BM25Index.for_store(log, bm25_dir, previous=incremental)
+        en_disco = sorted(p.name for p in bm25_dir.glob("seg_*"))
+        ok = compactado.tokenized == 1 and en_disco == log.segment_names and _iguales(compactado, BM25Index.build(log))
+        print(f"{'✅' if ok else '❌'} Tras compactar: {compactado.tokenized} segmento(s) tokenizado(s) | "
+              f"segmentos con términos en disco {len(en_disco)}")
@@ -0,0 +1,54 @@
+import asyncio
+import json
+import time
+from environment.server import serve
+from tests.test_concurrency import build_stub_system
+
+async def _query(port, text):
+    """Cliente HTTP mínimo: envía la consulta y lee el flujo de eventos hasta que se cierra."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps({"text": text}).encode("utf-8")
+    writer.write(b"POST /query HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 + f"Content-Length: {len(body)}\r\n\r\n".encode("utf-8") + body)
+    await writer.drain()
+    start = time.perf_counter()
+    events = []
+    raw = (await reader.read()).decode("utf-8")
+    for block in raw.split("\r\n\r\n", 1)[1].split("\n\n"):
+        if block.startswith("event:"):
+            event_line, data_line = block.split("\n", 1)
+            events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])["content"]))
+    writer.close()
+    return events, time.perf_counter() - start
+
+async def _run_load(clientes, latency):
+    _, gateway, agents = build_stub_system(latency)
+    tasks = [asyncio.create_task(agent.run()) for agent in agents]
+    server = await serve(gateway, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    start = time.perf_counter()
+    textos = [f"What goes into cocktail number {k}" for k in range(clientes)]
+    respuestas = await asyncio.gather(*(_query(port, t) for t in textos))
+    elapsed = time.perf_counter() - start
+
+    server.close()
+    await server.wait_closed()
+    for task in tasks:
+        task.cancel()
+    correctas = sum(events[-1] == ("final", t) for t, (events, _) in zip(textos, respuestas))
+    latencias = sorted(l for _, l in respuestas)
+    return elapsed, latencias, correctas
+
+def run_server_load(clientes=64, latency=0.02):
+    """
+    Prueba de carga del servidor HTTP: `clientes` conexiones simultáneas envían una
+    consulta cada una y leen el flujo de eventos hasta la respuesta final. El modelo de
+    lenguaje y las fuentes de conocimiento son simulados (ver `build_stub_system`).
+    """
+    elapsed, latencias, correctas = asyncio.run(_run_load(clientes, latency))
+    print("\n\n✅ Prueba de carga del servidor HTTP (Server-Sent Events):")
+    print(f"🔎 Clientes simultáneos: {clientes} | Latencia simulada del modelo: {latency * 1000:.0f} ms")
+    print(f"⏱️ {clientes / elapsed:.1f} consultas/s | mediana {latencias[len(latencias) // 2] * 1000:.0f} ms | "
+          f"p95 {latencias[int(len(latencias) * 0.95) - 1] * 1000:.0f} ms")
+    print(f"🎯 Respuestas finales correctas: {correctas}/{clientes}")
@@ -0,0 +1,54 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Lo que hacía `embedding.embedder` al importarse antes de la carga perezosa
+CARGA_ANTICIPADA = ("from sentence_transformers import SentenceTransformer; "
+                    "SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')")
+
+# (módulo, sentencia con carga perezosa, sentencia con la carga anticipada de antes)
+CASOS = [
+    ("embedding.embedder", "import embedding.embedder", f"{CARGA_ANTICIPADA}; import embedding.embedder"),
+    ("main", "import main", f"{CARGA_ANTICIPADA}; import main"),
+]
+
+def medir_proceso(sentencia, repeticiones):
+    """
+    Ejecuta `python -c sentencia` en un intérprete nuevo y devuelve los segundos de reloj
+    que tarda cada proceso completo, como `time python -c "..."`.
+    """
+    rutas = [os.path.abspath("src"), os.environ.get("PYTHONPATH", "")]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(r for r in rutas if r))
+    tiempos = []
+    for _ in range(repeticiones):
+        start = time.perf_counter()
+        salida = subprocess.run([sys.executable, "-c", sentencia], capture_output=True, text=True, env=env)
+        tiempos.append(time.perf_counter() - start)
+        if salida.returncode != 0:
+            return None, salida.stderr.strip().splitlines()[-1]
+    return tiempos, None
+
+def run_startup(repeticiones=3):
+    """
+    Compara el arranque con el modelo de embeddings cargado de forma perezosa (importar el
+    módulo tal como está) con la carga anticipada de antes (importar `sentence_transformers`
+    y construir el modelo antes del módulo, como hacía `embedding.embedder` al importarse).
+    Ambas versiones se miden como procesos nuevos completos, para no reutilizar módulos
+    ya importados.
+    """
+    print("\n\n✅ Tiempo de arranque (mediana de procesos nuevos):")
+    for modulo, perezosa, anticipada in CASOS:
+        medidas = {}
+        for nombre, sentencia in (("carga perezosa", perezosa), ("carga anticipada", anticipada)):
+            tiempos, error = medir_proceso(sentencia, repeticiones)
+            if error:
+                print(f"❌ import {modulo:18} | {nombre:16}: {error}")
+                continue
+            medidas[nombre] = statistics.median(tiempos)
+            print(f"⏱️ import {modulo:18} | {nombre:16}: {medidas[nombre]:.3f}s")
+        if len(medidas) == 2:
+            ahorro = medidas["carga anticipada"] - medidas["carga perezosa"]
+            print(f"🚀 import {modulo:18} | ahorro          : {ahorro:.3f}s "
+                  f"({medidas['carga anticipada'] / medidas['carga perezosa']:.1f}x)")
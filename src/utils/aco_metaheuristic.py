@@ -1,137 +1,115 @@
 import random
-
-all_candidates = []
-max_iters = 20
-num_ants = 10
-alpha = 100
-beta = 1
-gamma = 2
-
-def ant_colony_optimization(candidates, restrictions, matriz):
-    global all_candidates, max_iters, num_ants, alpha, beta, gamma
-    all_candidates = candidates  # ✅ Asignamos para uso global en esta instancia
-
-    pheromones = [1.0] * len(candidates)
-    best_solution = None
-    best_score = float("-inf")
-    seen_keys = set()
-
-    try:
-        for _ in range(max_iters):
-            for _ in range(num_ants):
-                solution = construct_solution(candidates, pheromones)
-
-                # ⚠️ Normalizamos la solución: orden y sin repeticiones
-                solution = sorted(set(solution), key=lambda x: str(x))
-                key = tuple(solution)
-
-                if key in seen_keys:
-                    continue
-
-                seen_keys.add(key)
-                score = evaluate_fitness(solution, restrictions, matriz)
-
-                if score > best_score:
-                    best_score = score
-                    best_solution = solution
-
-            pheromones = update_pheromones(
-                [([s for s in best_solution], best_score)] if best_solution else [],
-                pheromones
-            )
-
-        if best_solution:
-            return best_solution, best_score
-        else:
-            raise ValueError("No se encontró solución óptima")
-
-    except Exception as e:
-        print(f"[WARNING] Error en ACO: {e}")
-
-        # Buscar un candidato que cumpla la mayoría de restricciones
+import time
+import numpy as np
+
+MIN_FEROMONA = 1e-6  # Las feromonas nunca llegan a cero (la ruleta necesita pesos positivos)
+
+class ACOSelector:
+    """
+    Colonia de hormigas para seleccionar el subconjunto de candidatos.
+
+    Cada hormiga elige hasta `solution_size` candidatos distintos por ruleta proporcional a
+    las feromonas (por defecto, tantos como restricciones: un cubrimiento nunca necesita
+    más). Cada prefijo de esa secuencia es una solución, puntuada con la misma función
+    objetivo que `TabuSearchSelector` (alpha * fuertes cubiertas + beta * débiles cubiertas
+    - gamma * tamaño), y la hormiga se queda con el mejor. Tras cada iteración las feromonas
+    se evaporan y la mejor solución encontrada deposita `score / 100` en sus candidatos.
+
+    Todo el estado vive en la instancia y los candidatos se manejan por índice: la misma
+    clase puede usarse en varias peticiones a la vez. Las feromonas son un vector NumPy y
+    las hormigas de una iteración se construyen y evalúan juntas, con una ruleta sobre las
+    sumas acumuladas de cada hormiga.
+
+    Con `deadline` (un instante de `time.monotonic()`) la búsqueda se detiene al alcanzarlo,
+    tras completar al menos una iteración.
+
+    Misma interfaz que `TabuSearchSelector.select`.
+    """
+
+    def __init__(self, alpha=100, beta=1, gamma=2, num_ants=10, max_iters=20, decay=0.3, solution_size=None, seed=None, deadline=None):
+        self.alpha = alpha  # Peso restricciones fuertes
+        self.beta = beta    # Peso restricciones débiles
+        self.gamma = gamma  # Penalización por tamaño de solución
+        self.num_ants = num_ants
+        self.max_iters = max_iters
+        self.decay = decay
+        self.solution_size = solution_size
+        self.rng = np.random.default_rng(seed)
+        self.deadline = deadline
+
+    def construct_solutions(self, pheromones, k):
+        """
+        Construye una secuencia por hormiga: `k` índices distintos elegidos por ruleta, sin
+        reposición.
+        Returns:
+            np.ndarray: Índices elegidos, de forma (hormigas x k).
+        """
+        n = len(pheromones)
+        pesos = np.tile(pheromones, (self.num_ants, 1))
+        hormigas = np.arange(self.num_ants)
+        soluciones = np.empty((self.num_ants, k), dtype=np.int64)
+        for paso in range(k):
+            acumuladas = np.cumsum(pesos, axis=1)
+            # r en (0, total]: el elegido es el primero cuya suma acumulada alcanza r
+            r = (1.0 - self.rng.random(self.num_ants)) * acumuladas[:, -1]
+            elegidos = np.minimum((acumuladas < r[:, None]).sum(axis=1), n - 1)
+            soluciones[:, paso] = elegidos
+            pesos[hormigas, elegidos] = 0.0  # Sin reposición
+        return soluciones
+
+    def evaluate_fitness(self, soluciones, matriz, num_fuertes):
+        """
+        Puntúa todos los prefijos de la secuencia de cada hormiga y elige el mejor (el más
+        corto, a igualdad de puntaje).
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Mejor puntaje por hormiga y tamaño del prefijo que
+                                           lo obtiene.
+        """
+        cubiertas = np.logical_or.accumulate(matriz[soluciones], axis=1)  # (hormigas x prefijo x restricción)
+        fuertes = cubiertas[:, :, :num_fuertes].sum(axis=2)
+        debiles = cubiertas[:, :, num_fuertes:].sum(axis=2)
+        puntajes = self.alpha * fuertes + self.beta * debiles - self.gamma * np.arange(1, soluciones.shape[1] + 1)
+        mejores = np.argmax(puntajes, axis=1)
+        return puntajes[np.arange(len(puntajes)), mejores].astype(np.float64), mejores + 1
+
+    def update_pheromones(self, pheromones, solucion, score):
+        """Evapora las feromonas y refuerza los candidatos de `solucion` con `score / 100`."""
+        pheromones = pheromones * (1 - self.decay)
+        pheromones[solucion] += max(score, 0.0) / 100.0
+        return np.maximum(pheromones, MIN_FEROMONA)
+
+    def select(self, candidates, restrictions, matriz):
+        if not candidates:
+            raise ValueError("No hay candidatos para seleccionar")
         num_fuertes = len(restrictions["fuertes"])
-        mejor_idx = None
-        mejor_score = float("-inf")
-
-        for idx, vector in enumerate(matriz):
-            fuertes_cumplidas = sum(vector[:num_fuertes])
-            debiles_cumplidas = sum(vector[num_fuertes:])
-            score = alpha * fuertes_cumplidas + beta * debiles_cumplidas - gamma * 1
+        num_debiles = len(restrictions["débiles"])
+        n = len(candidates)
+        matriz = np.asarray(matriz, dtype=bool).reshape(n, -1)[:, :num_fuertes + num_debiles]
+        k = min(self.solution_size or max(1, num_fuertes + num_debiles), n)
 
-            if score > mejor_score:
-                mejor_score = score
-                mejor_idx = idx
+        pheromones = np.ones(n, dtype=np.float64)
+        best_solution = None
+        best_score = float("-inf")
 
-        if mejor_idx is not None:
-            return [candidates[mejor_idx]], mejor_score
-        else:
-            # Si ni siquiera eso se puede, devuelve el primero
-            return [candidates[0]], -10000
-
-def construct_solution(candidates, pheromones):
-    num_to_select = min(5, len(candidates))
-    total_pheromones = sum(pheromones)
-    selected_indices = set()
-
-    while len(selected_indices) < num_to_select:
-        # Recalcular el total de feromonas solo de los disponibles
-        available_indices = [i for i in range(len(candidates)) if i not in selected_indices]
-        if not available_indices:
-            break  # ya no hay más para seleccionar
-
-        total_pheromones = sum(pheromones[i] for i in available_indices)
-        r = random.uniform(0, total_pheromones)
-        cumulative = 0.0
-
-        for i in available_indices:
-            cumulative += pheromones[i]
-            if cumulative >= r:
-                selected_indices.add(i)
+        for _ in range(self.max_iters):
+            if best_solution is not None and self.deadline is not None and time.monotonic() >= self.deadline:
                 break
-
-    return [candidates[i] for i in selected_indices]
-
-def evaluate_fitness(solution, restrictions, matriz):
-    fuertes = restrictions["fuertes"]
-    debiles = restrictions["débiles"]
-
-    # Índices de restricciones
-    num_fuertes = len(fuertes)
-    num_debiles = len(debiles)
-
-    # Inicializamos vectores de cumplimiento conjunto
-    cumples_f = [False] * num_fuertes
-    cumples_d = [False] * num_debiles
-
-    for cand in solution:
-        try:
-            idx = next((i for i, c in enumerate(all_candidates) if str(c) == str(cand)), None)
-            if idx is None:
-                continue
-            vector = matriz[idx]
-            for i in range(num_fuertes):
-                cumples_f[i] = cumples_f[i] or vector[i]
-            for j in range(num_debiles):
-                cumples_d[j] = cumples_d[j] or vector[num_fuertes + j]
-        except ValueError:
-            continue  # Si por alguna razón el candidato no está
-
-    # Ponderación: penaliza si no cumple todas las fuertes
-    if not all(cumples_f):
-        return -10000
-
-    debiles_cumplidas = sum(cumples_d)
-    return alpha * num_fuertes + beta * debiles_cumplidas - gamma * len(solution)
-
-def update_pheromones(solutions, pheromones):
-    decay = 0.3
-    pheromones = [p * (1 - decay) for p in pheromones]
-
-    for solution, score in solutions:
-        for c in solution:
-            try:
-                idx = all_candidates.index(c)
-                pheromones[idx] += score / 100.0
-            except ValueError:
-                pass
-    return pheromones
+            soluciones = self.construct_solutions(pheromones, k)
+            puntajes, tamanos = self.evaluate_fitness(soluciones, matriz, num_fuertes)
+            mejor = int(np.argmax(puntajes))
+            if puntajes[mejor] > best_score:
+                best_score = float(puntajes[mejor])
+                best_solution = np.sort(soluciones[mejor, :tamanos[mejor]])
+            pheromones = self.update_pheromones(pheromones, best_solution, best_score)
+
+        return [candidates[i] for i in best_solution], best_score
+
+def ant_colony_optimization(candidates, restrictions, matriz, seed=None):
+    """
+    Ejecuta `ACOSelector` con los parámetros por defecto. Sin `seed`, la semilla se toma
+    del generador de `random`, de modo que `random.seed(...)` sigue haciendo reproducible
+    la búsqueda.
+    """
+    if seed is None:
+        seed = random.getrandbits(32)
+    return ACOSelector(seed=seed).select(candidates, restrictions, matriz)
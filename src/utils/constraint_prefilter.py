@@ -0,0 +1,222 @@
+import json
+import re
+import unicodedata
+from pathlib import Path
+import numpy as np
+
+INGREDIENTS_FILE = Path("src/flavor_space/ingredient_flavor_vectors.json")
+LOW_SIMILARITY = 0.1  # Por debajo de esta similitud coseno la restricción no trata del candidato
+NEGATIONS = {"no", "not", "without", "sin", "free", "exclude", "excluding", "avoid", "except", "non", "ni"}
+# Núcleos de nombre que identifican un ingrediente concreto ("london dry gin" -> "gin"). Los
+# demás ("juice", "water", "liqueur", "white"...) son palabras genéricas que aparecen en
+# restricciones que no tratan de ningún ingrediente ("a refreshing drink", "spirit forward")
+INGREDIENT_HEADS = {
+    "gin", "rum", "vodka", "tequila", "mezcal", "whisky", "whiskey", "bourbon", "scotch", "brandy",
+    "cognac", "calvados", "pisco", "cachaca", "vermouth", "sherry", "amaro", "absinthe", "pastis",
+    "aquavit", "akvavit", "sambuca", "chartreuse", "campari", "aperol", "champagne", "prosecco",
+    "sake", "beer", "ale", "lager", "stout", "cider", "bitters", "lime", "lemon", "orange",
+    "grapefruit", "pineapple", "honey", "coffee", "milk", "egg", "cucumber", "mint", "ginger",
+}
+# Nombres completos de la ontología demasiado genéricos para decidir una celda
+GENERIC_TERMS = {"drink", "fruit", "juice", "spirit", "water", "soda", "white"}
+# Una restricción sólo se compara con el vaso si habla de cómo se sirve ("a sour cocktail" no)
+GLASS_CONTEXT = {"glass", "served", "serve", "vaso", "copa", "servido"}
+# Palabras que sólo dan forma a la restricción. Una celda se decide únicamente si, además
+# del ingrediente (o vaso) y de una negación, la restricción no dice nada más: "contains gin
+# and is not too sweet" o "gin served in a coupe" piden algo que el prefiltro no comprueba
+FILLER_WORDS = {
+    "a", "an", "the", "any", "some", "of", "it", "is", "be", "must", "should", "does", "do",
+    "contain", "contains", "containing", "include", "includes", "including", "use", "uses",
+    "using", "with", "has", "have", "having", "made", "drink", "cocktail", "served", "serve",
+    "in", "glass", "un", "una", "el", "la", "de", "que", "con", "debe", "deberia", "llevar",
+    "lleva", "tener", "tiene", "usar", "usa", "contener", "contiene", "incluir", "incluye",
+    "hecho", "trago", "coctel", "servido", "en", "vaso", "copa",
+}
+# Ingredientes en español, traducidos al vocabulario (en inglés) de la ontología
+ALIASES = {
+    "ron": "rum", "ginebra": "gin", "lima": "lime", "limon": "lemon", "naranja": "orange",
+    "pomelo": "grapefruit", "pina": "pineapple", "miel": "honey", "cafe": "coffee", "leche": "milk",
+    "huevo": "egg", "pepino": "cucumber", "menta": "mint", "jengibre": "ginger", "cerveza": "beer",
+    "sidra": "cider", "vermut": "vermouth", "jerez": "sherry",
+}
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin acentos y con cualquier signo de puntuación convertido en espacio."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+def load_ingredients(path=INGREDIENTS_FILE) -> set:
+    """
+    Vocabulario de ingredientes de la ontología (las claves del espacio de sabores).
+    Además del nombre completo ("london dry gin") incluye el núcleo del nombre ("gin") si
+    está en `INGREDIENT_HEADS`, para reconocer restricciones como "contains gin". Los
+    términos de `GENERIC_TERMS` se omiten.
+    Returns:
+        set[str]: Términos normalizados; vacío si el archivo no existe.
+    """
+    path = Path(path)
+    if not path.exists():
+        print(f"[ConstraintPrefilter] No se encontró {path}; se omite la comprobación por ingredientes")
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        names = json.load(f)
+    terms = set()
+    for name in names:
+        name = normalize_text(name)
+        if not name:
+            continue
+        if name not in GENERIC_TERMS:
+            terms.add(name)
+        head = name.split()[-1]
+        if head in INGREDIENT_HEADS:
+            terms.add(head)
+    return terms
+
+def _contains(text: str, term: str) -> bool:
+    """`term` aparece en `text` como palabras completas (ambos normalizados)."""
+    return f" {term} " in f" {text} "
+
+def _translate(text: str) -> str:
+    """Reemplaza los ingredientes en español por su nombre en la ontología."""
+    return " ".join(ALIASES.get(word, word) for word in text.split())
+
+def _single_term(restriction: str, terms: list):
+    """
+    Si la restricción trata de un solo término, devuelve `(término, negado)`; si no, None.
+
+    La negación tiene que gobernar al término: ir antes que él, con sólo palabras de
+    relleno en medio ("without rum", "does not contain any gin", "sin ron"), o ser "free"
+    justo después ("gin free"). Cualquier otra palabra, un segundo término o una
+    negación en otro sitio dejan la restricción para el modelo.
+    """
+    if len(terms) != 1:
+        return None
+    words, term_words = restriction.split(), terms[0].split()
+    starts = [k for k in range(len(words)) if words[k:k + len(term_words)] == term_words]
+    if len(starts) != 1:
+        return None
+    before, after = words[:starts[0]], words[starts[0] + len(term_words):]
+    if after == ["free"]:
+        after, before = [], before + ["free"]
+    if any(w not in FILLER_WORDS for w in after):
+        return None
+    negations = [w for w in before if w in NEGATIONS]
+    if len(negations) > 1 or any(w not in FILLER_WORDS and w not in NEGATIONS for w in before):
+        return None
+    return terms[0], bool(negations)
+
+class ConstraintPrefilter:
+    """
+    Evaluación local y barata de la matriz de cumplimiento, antes de consultar al modelo.
+
+    Decide sólo las celdas evidentes:
+    - Ingredientes y vaso: si la restricción nombra un ingrediente conocido ("contains gin",
+      "sin ron") o, al hablar de cómo se sirve, un vaso de los candidatos ("served in a
+      coupe") y el candidato es una ficha de la ontología, se mira su lista de ingredientes
+      (o su vaso): si lo incluye cumple la restricción (o la incumple, si está negada) y si
+      no, al revés. Sólo se decide si la restricción nombra un único término y no pide
+      nada más (`_single_term`): "contains gin and vermouth" o "gin, not vodka" quedan
+      para el modelo. En el texto libre una mención no prueba nada ("unlike gin
+      cocktails..."), así que las reseñas quedan siempre para el modelo.
+    - Similitud: si el embedding del candidato está muy lejos del de una restricción no
+      negada (similitud < `low_similarity`), el candidato no la cumple. Está desactivada por
+      defecto: no se ha medido cuántas celdas que sí se cumplen marcaría como incumplidas.
+
+    Las demás celdas quedan como inciertas y se consultan al modelo. Los candidatos que
+    incumplen con seguridad todas las restricciones se pueden descartar (`keep`).
+
+    Atributos:
+        ingredients (list[str]): Términos de ingredientes normalizados, de más largo a más corto.
+        embed_fn (callable | None): `embed_fn(textos) -> np.ndarray` con un embedding por
+                                    texto; None (por defecto) desactiva la comprobación por similitud.
+        low_similarity (float): Umbral de similitud coseno por debajo del cual se descarta.
+    """
+
+    def __init__(self, ingredients=(), embed_fn=None, low_similarity: float = LOW_SIMILARITY):
+        self.ingredients = sorted({normalize_text(i) for i in ingredients if i}, key=len, reverse=True)
+        self.embed_fn = embed_fn
+        self.low_similarity = low_similarity
+
+    def _terms(self, restriction: str) -> list:
+        """Ingredientes nombrados en la restricción, sin los contenidos en otro más largo."""
+        terms = []
+        for term in self.ingredients:
+            if _contains(restriction, term) and not any(_contains(t, term) for t in terms):
+                terms.append(term)
+        return terms
+
+    @staticmethod
+    def _field(candidate: str, name: str):
+        """Campo `name` normalizado de una ficha "clave: valor | ...", o None si no lo tiene (o está vacío)."""
+        match = re.search(rf"(?:^|\|)\s*{name}:\s*(.*?)\s*(?:\||$)", candidate, re.DOTALL)
+        return (normalize_text(match.group(1)) or None) if match else None
+
+    @staticmethod
+    def _matches(term, field, negated):
+        """Valor de la celda según el campo de la ficha, o None si el candidato no lo tiene."""
+        if field is None:
+            return None
+        return _contains(field, term) != negated
+
+    def prefill(self, candidates, restrictions):
+        """
+        Decide las celdas evidentes de la matriz candidatos x restricciones.
+        Args:
+            candidates (list of str): Candidatos normalizados.
+            restrictions (list of str): Restricciones fuertes y débiles.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: `known` (celda decidida) y `values` (su valor),
+                                           ambas booleanas de forma (candidatos x restricciones).
+        """
+        n, m = len(candidates), len(restrictions)
+        known = np.zeros((n, m), dtype=bool)
+        values = np.zeros((n, m), dtype=bool)
+        if not n or not m:
+            return known, values
+
+        ingredients = [self._field(c, "Ingredients") for c in candidates]
+        glasses = [self._field(c, "Glass") for c in candidates]
+        # Los vasos se aprenden de las propias fichas ("Coupe glass" -> "coupe")
+        glass_terms = {w for g in glasses if g for w in g.split() if len(w) >= 3 and w != "glass"}
+        negated = np.zeros(m, dtype=bool)
+
+        for j, restriction in enumerate(restrictions):
+            restriction = _translate(normalize_text(restriction))
+            negated[j] = bool(NEGATIONS.intersection(restriction.split()))
+            terms = self._terms(restriction)
+            fields = ingredients
+            if not terms and GLASS_CONTEXT.intersection(restriction.split()):
+                terms = [t for t in glass_terms if _contains(restriction, t)]
+                fields = glasses
+            single = _single_term(restriction, terms)
+            if single is None:
+                continue
+            term, term_negated = single
+            for i in range(n):
+                value = self._matches(term, fields[i], term_negated)
+                if value is not None:
+                    known[i, j], values[i, j] = True, value
+
+        uncertain = ~known & ~negated
+        if self.embed_fn is not None and uncertain.any():
+            vectors = self.embed_fn(list(restrictions) + list(candidates))
+            if vectors is not None:
+                vectors = np.asarray(vectors, dtype=np.float32)
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+                similarity = vectors[m:] @ vectors[:m].T
+                far = uncertain & (similarity < self.low_similarity)
+                known |= far
+
+        return known, values
+
+    @staticmethod
+    def keep(known, values):
+        """
+        Índices de los candidatos que vale la pena evaluar: los que no incumplen con
+        seguridad todas las restricciones. Si se descartarían todos, se conservan todos.
+        """
+        discard = known.all(axis=1) & ~values.any(axis=1)
+        if discard.all():
+            return list(range(len(known)))
+        return [int(i) for i in np.flatnonzero(~discard)]
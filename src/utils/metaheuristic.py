@@ -1,28 +1,54 @@
 import random
+import time
 from collections import deque
+import numpy as np
+
+EXACT_MAX_RESTRICTIONS = 12  # Hasta aquí la selección exacta (2^m coberturas posibles) es más rápida que Tabu
 
 class TabuSearchSelector:
-    def __init__(self, alpha=10, beta=1, gamma=1, max_iters=100, tenure=10):
+    """
+    Búsqueda tabú del subconjunto de candidatos que mejor cubre las restricciones.
+
+    Por defecto (`vectorized=True`) la matriz de cumplimiento se empaqueta en una matriz
+    NumPy y se mantiene, para la solución actual, cuántos candidatos cubren cada
+    restricción; así los movimientos de agregar y quitar se puntúan por diferencia, todo
+    el vecindario en una sola operación vectorizada. `vectorized=False` conserva la
+    evaluación original, vecino a vecino; ambas recorren la misma trayectoria y devuelven
+    el mismo resultado.
+
+    Con `seed` la búsqueda usa su propio generador; sin ella usa el módulo `random`. Con
+    `deadline` (un instante de `time.monotonic()`) la búsqueda se detiene al alcanzarlo y
+    devuelve la mejor solución encontrada hasta entonces.
+    """
+
+    def __init__(self, alpha=10, beta=1, gamma=1, max_iters=100, tenure=10, vectorized=True, seed=None, deadline=None):
         self.alpha = alpha  # Peso restricciones fuertes
         self.beta = beta    # Peso restricciones débiles
         self.gamma = gamma  # Penalización por tamaño de solución
         self.max_iters = max_iters
         self.tenure = tenure
+        self.vectorized = vectorized
+        self.rng = random.Random(seed) if seed is not None else random
+        self.deadline = deadline
         self.all_candidates = []
 
     def select(self, candidates, restrictions, matriz):
         self.all_candidates = candidates
         num_fuertes = len(restrictions["fuertes"])
         num_debiles = len(restrictions["débiles"])
+        if self.vectorized:
+            return self._select_vectorized(candidates, matriz, num_fuertes, num_debiles)
 
         # Estado inicial: uno aleatorio
-        current = [random.randint(0, len(candidates)-1)]
+        current = [self.rng.randint(0, len(candidates)-1)]
         best = list(current)
         best_score = self.evaluate(current, matriz, num_fuertes, num_debiles)
 
         tabu_list = deque(maxlen=self.tenure)
 
         for _ in range(self.max_iters):
+            if self._expired():
+                break
             neighborhood = self.generate_neighbors(current, len(candidates))
             best_neighbor = None
             best_neighbor_score = float("-inf")
@@ -48,6 +74,77 @@ class TabuSearchSelector:
 
         return [candidates[i] for i in best], best_score
 
+    def _select_vectorized(self, candidates, matriz, num_fuertes, num_debiles):
+        n = len(candidates)
+        matriz = np.asarray(matriz, dtype=bool).reshape(n, -1)[:, :num_fuertes + num_debiles]
+        filas = matriz.astype(np.int32)
+        pesos = np.concatenate([np.full(num_fuertes, self.alpha, dtype=np.float64),
+                                np.full(num_debiles, self.beta, dtype=np.float64)])
+
+        # Estado inicial: uno aleatorio
+        current = [self.rng.randint(0, n-1)]
+        in_current = np.zeros(n, dtype=bool)
+        in_current[current] = True
+        # Cuántos candidatos de la solución actual cumplen cada restricción
+        cobertura = filas[current[0]].copy()
+        best = list(current)
+        best_score = float((cobertura > 0) @ pesos) - self.gamma
+
+        tabu_list = deque(maxlen=self.tenure)
+
+        for _ in range(self.max_iters):
+            if self._expired():
+                break
+            k = len(current)
+            cubiertas = cobertura > 0
+
+            # Agregar un nuevo índice no presente: la restricción queda cubierta si ya lo estaba o si él la cumple
+            agregables = np.flatnonzero(~in_current)
+            scores_agregar = (matriz[agregables] | cubiertas) @ pesos - self.gamma * (k + 1)
+
+            # Quitar uno existente (si quedan al menos 1): sigue cubierta si la cumple algún otro
+            removibles = np.array(current if k > 1 else [], dtype=np.int64)
+            scores_quitar = ((cobertura - filas[removibles]) > 0) @ pesos - self.gamma * (k - 1)
+
+            # Los vecinos tabú se descartan
+            actual = set(current)
+            for key in tabu_list:
+                if len(key) == k + 1 and actual.issubset(key):
+                    (agregado,) = set(key) - actual
+                    scores_agregar[np.searchsorted(agregables, agregado)] = -np.inf
+                elif len(key) == k - 1 and actual.issuperset(key) and removibles.size:
+                    (quitado,) = actual - set(key)
+                    scores_quitar[current.index(quitado)] = -np.inf
+
+            scores = np.concatenate([scores_agregar, scores_quitar])
+            if not scores.size:
+                continue
+            j = int(np.argmax(scores))  # Ante empates, el primero (mismo orden que generate_neighbors)
+            best_neighbor_score = float(scores[j])
+            if best_neighbor_score == -np.inf:
+                continue
+
+            if j < len(agregables):
+                i = int(agregables[j])
+                current = current + [i]
+                cobertura += filas[i]
+                in_current[i] = True
+            else:
+                i = int(removibles[j - len(agregables)])
+                current = [x for x in current if x != i]
+                cobertura -= filas[i]
+                in_current[i] = False
+            tabu_list.append(tuple(sorted(current)))
+
+            if best_neighbor_score > best_score:
+                best = current
+                best_score = best_neighbor_score
+
+        return [candidates[i] for i in best], best_score
+
+    def _expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
     def evaluate(self, indices, matriz, num_fuertes, num_debiles):
         if not indices:
             return float("-inf")
@@ -84,3 +181,84 @@ class TabuSearchSelector:
 
         return neighbors
 
+class ExactCoverSelector:
+    """
+    Selección exacta del subconjunto de candidatos, para instancias con pocas restricciones.
+
+    El problema es un recubrimiento ponderado: maximizar
+    alpha * fuertes cubiertas + beta * débiles cubiertas - gamma * |S|. Como la puntuación
+    sólo depende de qué restricciones quedan cubiertas, basta con conocer, para cada
+    cobertura posible (una máscara de bits sobre las m restricciones), cuántos candidatos
+    hacen falta como mínimo para lograrla. Eso se calcula con programación dinámica sobre
+    las 2^m máscaras, usando sólo una fila por máscara distinta y descartando las filas
+    dominadas (contenidas en otra): cambiar una por la que la contiene nunca empeora la
+    solución, siempre que alpha y beta no sean negativos.
+
+    Misma interfaz que `TabuSearchSelector.select`, pero con resultado óptimo y determinista.
+    """
+
+    def __init__(self, alpha=10, beta=1, gamma=1):
+        self.alpha = alpha  # Peso restricciones fuertes
+        self.beta = beta    # Peso restricciones débiles
+        self.gamma = gamma  # Penalización por tamaño de solución
+
+    def select(self, candidates, restrictions, matriz):
+        num_fuertes = len(restrictions["fuertes"])
+        num_debiles = len(restrictions["débiles"])
+        m = num_fuertes + num_debiles
+        if m > EXACT_MAX_RESTRICTIONS:
+            raise ValueError(f"Demasiadas restricciones para la selección exacta: {m} > {EXACT_MAX_RESTRICTIONS}")
+        if not candidates:
+            raise ValueError("No hay candidatos para seleccionar")
+
+        n = len(candidates)
+        filas = np.asarray(matriz, dtype=bool).reshape(n, -1)[:, :m]
+        mascaras = filas.astype(np.int64) @ (1 << np.arange(m, dtype=np.int64))
+
+        # Un representante (el primero) por cada máscara distinta no vacía
+        representante = {}
+        for i, mascara in enumerate(mascaras.tolist()):
+            representante.setdefault(mascara, i)
+        distintas = np.array([u for u in representante if u], dtype=np.int64)
+        if not distintas.size:
+            return [candidates[0]], -self.gamma
+
+        # Dominancia: se descarta u si está contenida en otra máscara v
+        contenida = (distintas[:, None] & distintas[None, :]) == distintas[:, None]
+        np.fill_diagonal(contenida, False)
+        maximales = distintas[~contenida.any(axis=1)]
+
+        # minimos[s]: menor cantidad de candidatos cuya unión cubre exactamente s
+        estados = np.arange(1 << m, dtype=np.int64)
+        sin_alcanzar = n + 1
+        minimos = np.full(estados.size, sin_alcanzar, dtype=np.int64)
+        minimos[0] = 0
+        previo = np.zeros(estados.size, dtype=np.int64)
+        ultima = np.full(estados.size, -1, dtype=np.int64)
+        for k, u in enumerate(maximales.tolist()):
+            origen = estados[minimos < sin_alcanzar]
+            destino = origen | u
+            cantidad = minimos[origen] + 1
+            mejora = cantidad < minimos[destino]
+            origen, destino, cantidad = origen[mejora], destino[mejora], cantidad[mejora]
+            # Con destinos repetidos gana la última asignación: se ordena para que sea la menor cantidad
+            orden = np.argsort(-cantidad, kind="stable")
+            minimos[destino[orden]] = cantidad[orden]
+            previo[destino[orden]] = origen[orden]
+            ultima[destino[orden]] = k
+
+        pesos = np.concatenate([np.full(num_fuertes, self.alpha, dtype=np.float64),
+                                np.full(num_debiles, self.beta, dtype=np.float64)])
+        cubiertas = (estados[:, None] >> np.arange(m, dtype=np.int64)) & 1
+        puntajes = cubiertas @ pesos - self.gamma * minimos
+        puntajes[(minimos == sin_alcanzar) | (estados == 0)] = -np.inf
+        mejor = int(np.argmax(puntajes))
+
+        # Reconstruir la solución siguiendo las máscaras usadas hasta la cobertura vacía
+        seleccion = []
+        estado = mejor
+        while estado:
+            seleccion.append(representante[int(maximales[ultima[estado]])])
+            estado = int(previo[estado])
+        seleccion.sort()
+        return [candidates[i] for i in seleccion], float(puntajes[mejor])
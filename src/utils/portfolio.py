@@ -0,0 +1,213 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+import numpy as np
+from utils.metaheuristic import TabuSearchSelector
+from utils.aco_metaheuristic import ACOSelector
+
+STRATEGIES = ("tabu", "aco")
+PORTFOLIO_STARTS = 8  # Búsquedas independientes por selección
+PORTFOLIO_BUDGET = 0.25  # Segundos de reloj que se espera a las búsquedas
+PORTFOLIO_GRACE = 0.01  # Margen para recoger las búsquedas que se detienen en el límite
+
+def _build_selector(strategy: str, seed: int, deadline: float, alpha, beta, gamma):
+    if strategy == "tabu":
+        return TabuSearchSelector(alpha=alpha, beta=beta, gamma=gamma, max_iters=200, seed=seed, deadline=deadline)
+    if strategy == "aco":
+        return ACOSelector(alpha=alpha, beta=beta, gamma=gamma, seed=seed, deadline=deadline)
+    raise ValueError(f"Estrategia no soportada: {strategy}")
+
+def _warm_worker(delay: float) -> int:
+    """Tarea vacía para arrancar un proceso del pool; la espera evita que otro la tome."""
+    time.sleep(delay)
+    return os.getpid()
+
+def _run_start(strategy: str, seed: int, deadline: float, weights: tuple, restrictions: dict, matriz: np.ndarray):
+    """
+    Una búsqueda del portafolio. Trabaja sobre índices para no enviar los textos de los
+    candidatos a otro proceso, y se detiene en `deadline` (`time.monotonic()`, común a
+    todos los procesos de la máquina).
+    Returns:
+        list[int] | None: Índices de la solución encontrada; None si empezó fuera de plazo.
+    """
+    if time.monotonic() >= deadline:
+        return None
+    selector = _build_selector(strategy, seed, deadline, *weights)
+    indices, _ = selector.select(list(range(len(matriz))), restrictions, matriz)
+    return indices
+
+class PortfolioRunner:
+    """
+    Portafolio de metaheurísticas con arranques múltiples.
+
+    Lanza `starts` búsquedas independientes (Tabu y ACO, cada una con su semilla) en un pool
+    de procesos. Los arranques se reparten según la tasa de victorias suavizada de cada
+    estrategia en las selecciones anteriores (al principio, a partes iguales), con al menos
+    uno por estrategia para seguir midiéndolas. Cada búsqueda se detiene por su cuenta al agotarse `budget`
+    segundos y devuelve lo mejor que encontró; el portafolio se queda con la mejor. Todas las soluciones se puntúan con la misma función objetivo
+    (alpha * fuertes cubiertas + beta * débiles cubiertas - gamma * tamaño), así que las
+    estrategias son comparables; `stats()` informa qué proporción de selecciones ganó cada
+    una. Las búsquedas que no llegan a empezar a tiempo se descartan; si no hay ninguna, se
+    devuelve el candidato que más restricciones cumple por sí solo.
+
+    Los procesos del pool se arrancan (`warm_up`) antes de fijar el plazo de la primera
+    selección: con `spawn` (Windows, macOS) cada uno tarda más que `budget` en importar
+    los módulos, y ese tiempo no debe descontarse a las búsquedas ni contar como descartes.
+
+    Misma interfaz que `TabuSearchSelector.select`.
+
+    Atributos:
+        strategies (tuple[str]): Estrategias que se alternan entre los arranques.
+        starts (int): Búsquedas por selección.
+        budget (float): Segundos máximos de espera.
+        executor (str): "process" o "thread".
+        max_workers (int): Procesos o hilos del pool (por defecto, `starts` sin superar
+                           los núcleos de la máquina).
+        wins (dict[str, int]): Selecciones ganadas por cada estrategia (los empates cuentan para todas).
+        last_plan (dict[str, int]): Arranques asignados a cada estrategia en la última selección.
+        selections (int): Selecciones resueltas.
+        timeouts (int): Búsquedas descartadas por no empezar o no terminar a tiempo.
+    """
+
+    def __init__(self, alpha=10, beta=1, gamma=2, strategies=STRATEGIES, starts=PORTFOLIO_STARTS,
+                 budget=PORTFOLIO_BUDGET, executor="process", max_workers=None, seed=None, mp_context=None):
+        self.weights = (alpha, beta, gamma)
+        self.strategies = tuple(strategies)
+        self.starts = starts
+        self.budget = budget
+        self.executor = executor
+        self.max_workers = max_workers or min(os.cpu_count() or 1, starts)
+        self.mp_context = mp_context
+        self.rng = random.Random(seed)
+        self.wins = {strategy: 0 for strategy in self.strategies}
+        self.selections = 0
+        self.timeouts = 0
+        self.last_plan = {}
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        """Pool donde se ejecutan las búsquedas, creado y arrancado en la primera selección."""
+        if self._pool is None:
+            self.warm_up()
+        return self._pool
+
+    def warm_up(self) -> float:
+        """
+        Crea el pool y espera a que arranquen todos sus procesos, de modo que la primera
+        selección disponga de todo su `budget`. Se puede llamar de antemano (al iniciar el
+        agente, por ejemplo) para no pagar el arranque en la primera petición.
+        Returns:
+            float: Segundos que tardó el arranque (0 si el pool ya existía).
+        """
+        with self._lock:
+            if self._pool is not None:
+                return 0.0
+            start = time.perf_counter()
+            if self.executor == "process":
+                pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.mp_context)
+                wait([pool.submit(_warm_worker, 0.05) for _ in range(self.max_workers)])
+            elif self.executor == "thread":
+                pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="portfolio")
+            else:
+                raise ValueError(f"Tipo de executor no soportado: {self.executor}")
+            self._pool = pool
+            return time.perf_counter() - start
+
+    def plan_starts(self) -> list:
+        """
+        Estrategia de cada arranque: uno por estrategia y el resto en proporción a sus
+        victorias + 1 (suavizado de Laplace), repartido por restos mayores.
+        """
+        if self.starts <= len(self.strategies):
+            return list(self.strategies[:self.starts])
+        with self._lock:
+            pesos = [self.wins[s] + 1 for s in self.strategies]
+        libres = self.starts - len(self.strategies)
+        cuotas = [libres * p / sum(pesos) for p in pesos]
+        extra = [int(c) for c in cuotas]
+        for i in sorted(range(len(cuotas)), key=lambda i: extra[i] - cuotas[i])[:libres - sum(extra)]:
+            extra[i] += 1
+        return [s for s, e in zip(self.strategies, extra) for _ in range(1 + e)]
+
+    def score(self, indices, matriz: np.ndarray, num_fuertes: int) -> float:
+        """Función objetivo común a todas las estrategias."""
+        if not len(indices):
+            return float("-inf")
+        alpha, beta, gamma = self.weights
+        cubiertas = matriz[list(indices)].any(axis=0)
+        return float(alpha * cubiertas[:num_fuertes].sum() + beta * cubiertas[num_fuertes:].sum() - gamma * len(indices))
+
+    def select(self, candidates, restrictions, matriz):
+        if not candidates:
+            raise ValueError("No hay candidatos para seleccionar")
+        num_fuertes = len(restrictions["fuertes"])
+        n = len(candidates)
+        matriz = np.asarray(matriz, dtype=bool).reshape(n, -1)[:, :num_fuertes + len(restrictions["débiles"])]
+
+        plan = self.plan_starts()
+        with self._lock:
+            seeds = [self.rng.getrandbits(32) for _ in plan]
+            self.last_plan = {s: plan.count(s) for s in self.strategies}
+        pool = self.pool  # Arranca el pool antes de fijar el plazo
+        deadline = time.monotonic() + self.budget
+        futures = {
+            pool.submit(_run_start, strategy, seed, deadline, self.weights, restrictions, matriz): strategy
+            for strategy, seed in zip(plan, seeds)
+        }
+        done, pending = wait(futures, timeout=self.budget + PORTFOLIO_GRACE)
+        for future in pending:
+            future.cancel()  # Las que ya empezaron se detienen solas en el plazo
+
+        resultados = []
+        for future in done:
+            try:
+                indices = future.result()
+            except Exception as e:
+                print(f"[Portfolio] Error en una búsqueda {futures[future]}: {e}")
+                continue
+            if indices is None:
+                pending.add(future)
+                continue
+            resultados.append((self.score(indices, matriz, num_fuertes), futures[future], sorted(indices)))
+
+        if not resultados:
+            # Ninguna búsqueda terminó a tiempo: el candidato que más cumple por sí solo
+            individuales = [self.score([i], matriz, num_fuertes) for i in range(n)]
+            mejor = int(np.argmax(individuales))
+            with self._lock:
+                self.selections += 1
+                self.timeouts += len(pending)
+            return [candidates[mejor]], individuales[mejor]
+
+        best_score = max(score for score, _, _ in resultados)
+        best = min(indices for score, _, indices in resultados if score == best_score)
+        with self._lock:
+            self.selections += 1
+            self.timeouts += len(pending)
+            for strategy in {strategy for score, strategy, _ in resultados if score == best_score}:
+                self.wins[strategy] += 1
+        return [candidates[i] for i in best], best_score
+
+    def stats(self) -> dict:
+        """Proporción de selecciones ganadas por cada estrategia y búsquedas descartadas."""
+        with self._lock:
+            return {
+                "selections": self.selections,
+                "timeouts": self.timeouts,
+                "win_rate": {s: (w / self.selections if self.selections else 0.0) for s, w in self.wins.items()},
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.wins = {strategy: 0 for strategy in self.strategies}
+            self.selections = 0
+            self.timeouts = 0
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None